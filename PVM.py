@@ -36,21 +36,27 @@ from __future__ import annotations
 __version__ = "6.2.4"
 
 import argparse
+import codecs
+import hashlib
 import json
 import logging
 import math
 import os
 import platform
 import re
+import shutil
+import sqlite3
 import subprocess
 import sys
 import time
 import unicodedata
 import warnings
-from dataclasses import asdict, dataclass, replace
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass, field, replace
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 
 _WINDOWS_UTF8_REEXEC_MARKER = "_PVM_WINDOWS_UTF8_REEXEC"
@@ -106,7 +112,7 @@ if __name__ == "__main__":
 import numpy as np
 import pandas as pd
 from numpy.linalg import LinAlgError
-from sklearn.decomposition import FastICA, PCA
+from sklearn.decomposition import FastICA, IncrementalPCA, PCA
 from sklearn.exceptions import ConvergenceWarning
 from sklearn.metrics import adjusted_rand_score, calinski_harabasz_score, davies_bouldin_score, silhouette_score
 from sklearn.preprocessing import StandardScaler
@@ -148,7 +154,31 @@ LEGACY_SCHEMA_VERSION = "1.1"
 SCRIPT_VERSION = f"PVM-standard-{__version__}"
 DEFAULT_EMBEDDING_PREFIX = "トピック: "
 DEFAULT_MAX_LEN = 8192
+EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx")
+DEFAULT_EMBEDDING_BACKEND = "torch"
+# fp32 の torch と ONNX Runtime は同じ重みで誤差程度しか違わないため同じ系統とみなす。
+# int8 量子化は embedding 空間がずれるので fp32 の baseline とは混在させない。
+EMBEDDING_BACKEND_FAMILY = {"torch": "fp32", "onnx": "fp32", "torch-int8": "int8"}
 DEFAULT_BATCH = 8
+DEFAULT_EMBEDDING_CACHE_MAX_MB = 2048
+# 容量超過時は上限の90%まで古い順に削除し、毎回の小刻みな削除を避ける。
+EMBEDDING_CACHE_EVICT_TARGET = 0.90
+DEFAULT_EMBED_PREFETCH = 2
+DEFAULT_SERVE_ADDRESS = "127.0.0.1:8765"
+# --lock-chunk-rows 時に AI_解釈依頼.md 用として無作為抽出で保持する行数。
+DEFAULT_STREAM_SAMPLE_ROWS = 20000
+# --pca-solver incremental で scaler / IncrementalPCA に一度に渡す行数。
+DEFAULT_PCA_BATCH_ROWS = 10000
+# 結果スコアの出力形式。parquet / arrow は pyarrow が必要。
+RUN_SCORE_FORMATS = ("csv", "parquet", "arrow")
+# 実行指紋に含める CLI 引数（結果を変えるものだけ。batch や cache 等の実行方式は含めない）。
+RUN_FINGERPRINT_ARGS = (
+    "text_col", "id_col", "embedding_model", "max_len", "embedding_backend", "chunk_tokens", "chunk_overlap",
+    "pca_var", "pca_solver", "pca_batch_rows", "k_min", "k_max", "random_state", "search_budget", "ica_max_attempts", "ica_timeout_sec",
+    "ica_shared_whitening",
+    "show_candidates", "use_plan", "unlock", "unlock_q", "unlock_add_k", "unlock_min_points",
+    "max_ic_cols", "include_ica1_cols", "output_format", "lock_chunk_rows",
+)
 DEFAULT_UNLOCK_Q = 0.95
 DEFAULT_EXTRA_REL_ADV = 0.90
 DEFAULT_EXTRA_RADIUS_MULT = 1.10
@@ -169,6 +199,8 @@ DEFAULT_BASELINE_REVIEW_EXTRA_RATE = 0.15
 # Column autodetection uses a simple heuristic: prefer long text-like columns,
 # while penalizing URL-heavy columns and ID-like token columns.
 AUTODETECT_SAMPLE_SIZE = 200
+# 列の自動検出用に先頭だけ読む行数。dtype 判定が全件読み込みとずれにくいよう標本より多めに取る。
+AUTODETECT_HEAD_ROWS = 1000
 AUTODETECT_URL_PENALTY = 30.0
 AUTODETECT_IDLIKE_PENALTY = 10.0
 
@@ -256,14 +288,42 @@ class IcaRetryConfig:
     # effective dimension. Canonical validation disables this so ARI is never
     # computed across mixed dimensions.
     allow_dim_fallback: bool = True
+    # 2以上なら、最初の試行が失敗した後は後続の候補をこのプロセス数で先行して
+    # fit する。採否は候補グリッドの順に確定させる（worker は BLAS スレッド数が異なるため、
+    # 独立成分の一致は浮動小数点の許容誤差内）。
+    parallel_workers: int = 1
+    # True なら PCA 座標の白色化を試行・seed 間で共有し、各試行は fixed-point 反復だけを行う。
+    # 独立成分の符号・順序が FastICA 自身の白色化と変わりうるため既定では使わない。
+    shared_whitening: bool = False
+
+
+PCA_SOLVERS = ("full", "randomized", "incremental")
+
+
+@dataclass(frozen=True)
+class PcaConfig:
+    # full: 従来どおり max_pcs 成分の完全分解。
+    # randomized: initial_components から倍々に randomized SVD を取り直し、
+    #             累積寄与率が pca_var に届いた時点で止める。
+    # incremental: batch_rows 行ずつ scaler と IncrementalPCA を partial_fit し、
+    #              標準化済み行列を全件では持たない（memmap の埋め込みを前提）。
+    solver: str = "full"
+    initial_components: int = 32
+    batch_rows: int = DEFAULT_PCA_BATCH_ROWS
 
 
 CANDIDATE_SCORING = CandidateScoringConfig()
 UNLOCK_SCORING = UnlockScoringConfig()
 DEFAULT_ICA_RETRY = IcaRetryConfig()
+DEFAULT_PCA_CONFIG = PcaConfig()
 
 
-def build_ica_retry_config(max_attempts: int = 0, max_seconds: float = 0.0) -> IcaRetryConfig:
+def build_ica_retry_config(
+    max_attempts: int = 0,
+    max_seconds: float = 0.0,
+    workers: int = 1,
+    shared_whitening: bool = False,
+) -> IcaRetryConfig:
     """CLI 指定を反映した ICA retry 設定を返す。
 
     グローバル状態は書き換えず、main() から探索/fit 系へ明示的に渡す。
@@ -274,14 +334,27 @@ def build_ica_retry_config(max_attempts: int = 0, max_seconds: float = 0.0) -> I
         DEFAULT_ICA_RETRY,
         max_attempts=max(0, int(max_attempts or 0)),
         max_seconds=max(0.0, float(max_seconds or 0.0)),
+        parallel_workers=max(1, int(workers or 1)),
+        shared_whitening=bool(shared_whitening),
     )
 
 
+def build_pca_config(solver: str = "full", batch_rows: int = DEFAULT_PCA_BATCH_ROWS) -> PcaConfig:
+    """CLI 指定を反映した PCA 設定を返す。ICA retry 設定と同様に明示的に渡す。"""
+    if solver not in PCA_SOLVERS:
+        raise PVMUserError(f"--pca-solver は {', '.join(PCA_SOLVERS)} のいずれかを指定してください: {solver}")
+    if int(batch_rows) < 1:
+        raise PVMUserError(f"--pca-batch-rows は1以上を指定してください: {batch_rows}")
+    return replace(DEFAULT_PCA_CONFIG, solver=str(solver), batch_rows=int(batch_rows))
+
+
 def ica_retry_cache_key(config: IcaRetryConfig) -> Tuple[Any, ...]:
     """ICA retry 設定を cache key 化する。
 
     呼び出し側で DEFAULT_ICA_RETRY への解決を済ませる前提にして、
     None と明示 config の扱いを曖昧にしない。
+    parallel_workers は実行方式で候補の採否順を変えないため含めない。
+    shared_whitening は採用される独立成分を変えうるため含める。
     """
     return (
         int(config.max_attempts),
@@ -291,9 +364,19 @@ def ica_retry_cache_key(config: IcaRetryConfig) -> Tuple[Any, ...]:
         tuple(str(x) for x in config.algorithms),
         tuple((int(mi), float(tol)) for mi, tol in config.configs),
         bool(config.allow_dim_fallback),
+        bool(config.shared_whitening),
     )
 
 
+def pca_config_cache_key(config: PcaConfig) -> Tuple[Any, ...]:
+    """PCA 設定を cache key 化する。full では成長用パラメータを無視する。"""
+    if config.solver == "full":
+        return ("full",)
+    if config.solver == "incremental":
+        return ("incremental", int(config.batch_rows))
+    return (str(config.solver), int(config.initial_components))
+
+
 # ---------------------------------------------------------------------------
 # logging
 # ---------------------------------------------------------------------------
@@ -345,14 +428,35 @@ def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
 def normalize_text(s: Any) -> str:
     s = "" if s is None else str(s)
     s = unicodedata.normalize("NFKC", s)
     s = s.replace("\n", " ").replace("\r", " ")
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _WHITESPACE_RE.sub(" ", s).strip()
     return s
 
 
+def normalize_text_series(values: pd.Series) -> pd.Series:
+    """Series 全体に normalize_text() を適用する（欠損は空文字）。結果は1件ずつ適用した場合と同一。
+
+    同じ値は1回だけ正規化し、pandas の文字列メソッドでまとめて処理する。
+    Arrow compute の正規表現は \\s が ASCII 空白だけなので使わない。
+    """
+    # 先に文字列化してから同値判定する（1 と 1.0 と True を同じ値として扱わないため）。
+    text = values.where(values.notna(), "").astype(str)
+    codes, uniques = pd.factorize(text, sort=False)
+    normalized = (
+        pd.Series(uniques, dtype=object)
+        .str.normalize("NFKC")
+        .str.replace(_WHITESPACE_RE, " ", regex=True)
+        .str.strip()
+    )
+    return pd.Series(normalized.to_numpy(dtype=object)[codes], index=values.index, dtype=object)
+
+
 def resolve_embedding_prefix(value: Optional[str]) -> str:
     """CLI指定を実際に付与する embedding prefix に解決する。
 
@@ -373,11 +477,18 @@ def resolve_embedding_prefix(value: Optional[str]) -> str:
     return raw
 
 
-def validate_embedding_compat(meta_raw: Dict[str, Any], embedding_model: str, embedding_prefix: str, max_len: int) -> None:
-    """baseline と現在実行の embedding 設定が一致するか検査する。
+def _embedding_compat_problems(
+    meta_raw: Dict[str, Any],
+    embedding_model: str,
+    embedding_prefix: str,
+    max_len: int,
+    embedding_backend: str = DEFAULT_EMBEDDING_BACKEND,
+    chunk_tokens: int = 0,
+    chunk_overlap: int = 0,
+) -> List[str]:
+    """記録済みの embedding 設定（meta_raw）と現在の設定の食い違いを列挙する。
 
-    prefix や max_len が違うと、同じモデル・同じ次元でも embedding 空間が
-    変わり、lock/unlock の比較可能性が崩れるため停止する。
+    chunk_tokens / chunk_overlap は記録が無ければ 0（窓分割なし）とみなす。
     """
     checks = [
         ("embedding_model", meta_raw.get("embedding_model"), embedding_model),
@@ -387,7 +498,7 @@ def validate_embedding_compat(meta_raw: Dict[str, Any], embedding_model: str, em
     problems: List[str] = []
     for name, expected, current in checks:
         if expected is None:
-            problems.append(f"baseline に {name} が記録されていません")
+            problems.append(f"{name} が記録されていません")
             continue
         if name == "max_len":
             try:
@@ -397,7 +508,38 @@ def validate_embedding_compat(meta_raw: Dict[str, Any], embedding_model: str, em
         else:
             ok = str(expected) == str(current)
         if not ok:
-            problems.append(f"{name}: baseline={expected!r} / current={current!r}")
+            problems.append(f"{name}: 記録={expected!r} / current={current!r}")
+    recorded_backend = str(meta_raw.get("embedding_backend") or DEFAULT_EMBEDDING_BACKEND)
+    if EMBEDDING_BACKEND_FAMILY.get(recorded_backend) != EMBEDDING_BACKEND_FAMILY.get(str(embedding_backend)):
+        problems.append(f"embedding_backend: 記録={recorded_backend!r} / current={str(embedding_backend)!r}")
+    recorded_chunk = (int(meta_raw.get("chunk_tokens") or 0), int(meta_raw.get("chunk_overlap") or 0))
+    current_chunk = (int(chunk_tokens), int(chunk_overlap) if chunk_tokens else 0)
+    if recorded_chunk[0] == 0:
+        recorded_chunk = (0, 0)
+    if recorded_chunk != current_chunk:
+        problems.append(f"chunk_tokens/chunk_overlap: 記録={recorded_chunk!r} / current={current_chunk!r}")
+    return problems
+
+
+def validate_embedding_compat(
+    meta_raw: Dict[str, Any],
+    embedding_model: str,
+    embedding_prefix: str,
+    max_len: int,
+    embedding_backend: str = DEFAULT_EMBEDDING_BACKEND,
+    chunk_tokens: int = 0,
+    chunk_overlap: int = 0,
+) -> None:
+    """baseline と現在実行の embedding 設定が一致するか検査する。
+
+    prefix や max_len が違うと、同じモデル・同じ次元でも embedding 空間が
+    変わり、lock/unlock の比較可能性が崩れるため停止する。backend は
+    EMBEDDING_BACKEND_FAMILY の系統（fp32 / int8）が同じなら混在を許す。
+    記録の無い旧 baseline は torch とみなす。
+    """
+    problems = _embedding_compat_problems(
+        meta_raw, embedding_model, embedding_prefix, max_len, embedding_backend, chunk_tokens, chunk_overlap,
+    )
     if problems:
         detail = "、".join(problems)
         legacy_hint = "v5.6以前の旧baselineは、現行のPVM Standard 6系では安全のため流用できません。初回実行でbaselineを再作成してください。"
@@ -422,30 +564,175 @@ def cosine_distance_to_centroids(Xn: np.ndarray, Cn: np.ndarray) -> np.ndarray:
 
 def autodetect_input() -> Tuple[Path, str]:
     here = Path(".")
-    for name in ["入力.xlsx", "入力.csv"]:
+    for name in ["入力.xlsx", "入力.csv", "入力.parquet"]:
         p = here / name
         if p.exists():
             return p.resolve(), p.suffix.lower().lstrip(".")
-    cands = sorted(list(here.glob("*.xlsx")) + list(here.glob("*.csv")), key=lambda p: p.stat().st_mtime, reverse=True)
+    cands = sorted(
+        list(here.glob("*.xlsx")) + list(here.glob("*.csv")) + list(here.glob("*.parquet")),
+        key=lambda p: p.stat().st_mtime, reverse=True,
+    )
     if not cands:
-        raise FileNotFoundError("入力ファイルが見つかりません（入力.xlsx / 入力.csv / *.xlsx / *.csv）")
+        raise FileNotFoundError("入力ファイルが見つかりません（入力.xlsx / 入力.csv / 入力.parquet / *.xlsx / *.csv / *.parquet）")
     p = cands[0]
     return p.resolve(), p.suffix.lower().lstrip(".")
 
 
-def read_table(path: Path, ext: str) -> pd.DataFrame:
+def read_table(path: Path, ext: str, usecols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """入力表を読む。usecols を渡すと CSV / Parquet はその列だけを解析する。"""
+    cols = list(usecols) if usecols is not None else None
     if ext == "xlsx":
         try:
-            return pd.read_excel(path)
+            df = pd.read_excel(path)
         except ImportError as e:
             raise RuntimeError("Excel読み込みには openpyxl が必要です。pip install openpyxl") from e
+        # Excel は数値の見出しを位置指定と区別できないため、読んでから列を絞る。
+        return df if cols is None else df[cols]
+    if ext == "parquet":
+        try:
+            return pd.read_parquet(path, columns=cols)
+        except ImportError as e:
+            raise RuntimeError("Parquet読み込みには pyarrow が必要です。pip install pyarrow") from e
     try:
         # utf-8-sig は BOM 無しの UTF-8 も読めるため、常に先頭 BOM を安全に処理できる。
         # 素の utf-8 で先に読むと、BOM 付き CSV の先頭列名に ﻿ が残ることがある。
-        return pd.read_csv(path, encoding="utf-8-sig")
+        return pd.read_csv(path, encoding="utf-8-sig", usecols=cols)
     except UnicodeDecodeError:
         log.warning("UTF-8で読めませんでした。CP932（Shift_JIS系）で再試行します。")
-        return pd.read_csv(path, encoding="cp932")
+        return pd.read_csv(path, encoding="cp932", usecols=cols)
+
+
+def _require_pyarrow(purpose: str) -> Any:
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise RuntimeError(f"{purpose}には pyarrow が必要です。pip install pyarrow") from e
+    return pyarrow
+
+
+def read_table_head(path: Path, ext: str, nrows: int = AUTODETECT_HEAD_ROWS) -> pd.DataFrame:
+    """列の自動検出用に入力表の先頭 nrows 行だけを読む（全列）。"""
+    nrows = max(1, int(nrows))
+    if ext == "xlsx":
+        try:
+            return pd.read_excel(path, nrows=nrows)
+        except ImportError as e:
+            raise RuntimeError("Excel読み込みには openpyxl が必要です。pip install openpyxl") from e
+    if ext == "parquet":
+        _require_pyarrow("Parquet読み込み")
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        first = next(pf.iter_batches(batch_size=nrows), None)
+        return first.to_pandas() if first is not None else pf.schema_arrow.empty_table().to_pandas()
+    try:
+        return pd.read_csv(path, encoding="utf-8-sig", nrows=nrows)
+    except UnicodeDecodeError:
+        return pd.read_csv(path, encoding="cp932", nrows=nrows)
+
+
+def _csv_encoding(path: Path, prefix_bytes: int = 1 << 20) -> str:
+    """CSV の先頭 prefix_bytes だけを UTF-8 として復号してみて、使う encoding を返す。
+
+    先頭より後ろで UTF-8 として読めなかった場合は iter_table_chunks() が CP932 で読み直す。
+    """
+    with open(path, "rb") as f:
+        head = f.read(prefix_bytes)
+    try:
+        # 末尾で切れた多バイト文字はエラーにしない（final=False）。
+        codecs.getincrementaldecoder("utf-8-sig")().decode(head, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        log.warning("UTF-8で読めませんでした。CP932（Shift_JIS系）で読み込みます。")
+        return "cp932"
+
+
+def _as_text_column(values: pd.Series) -> pd.Series:
+    """欠損は欠損のまま、それ以外を str にした object 列を返す。"""
+    return values.where(values.isna(), values.astype(str))
+
+
+def iter_table_chunks(
+    path: Path,
+    ext: str,
+    chunk_rows: int,
+    usecols: Optional[Sequence[str]] = None,
+    str_cols: Sequence[str] = (),
+) -> Iterator[pd.DataFrame]:
+    """入力表を chunk_rows 行ずつ返す。
+
+    CSV は C エンジンの分割読み込み、Parquet は row group 単位のバッチ読み込みで、
+    どちらも usecols の列だけを解析する。Excel は全体を読んでから分割する。
+    str_cols の列は文字列として読む（chunk ごとの型推定で列型がぶれないようにする）。
+    """
+    chunk_rows = max(1, int(chunk_rows))
+    cols = list(usecols) if usecols is not None else None
+    str_cols = [c for c in str_cols if c is not None]
+    if ext == "xlsx":
+        log.info("Excel は分割読み込みできないため、全体を読んでから %d 行ずつ処理します。", chunk_rows)
+        df = read_table(path, ext, usecols=cols)
+        for c in str_cols:
+            df[c] = _as_text_column(df[c])
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+    if ext == "parquet":
+        _require_pyarrow("Parquet読み込み")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=cols):
+            table = pa.Table.from_batches([batch])
+            for c in str_cols:
+                i = table.schema.get_field_index(c)
+                table = table.set_column(i, c, table.column(i).cast(pa.string()))
+            yield table.to_pandas()
+        return
+    dtype = {c: str for c in str_cols} or None
+    encoding = _csv_encoding(path)
+    yielded = 0
+    try:
+        with pd.read_csv(path, encoding=encoding, chunksize=chunk_rows, usecols=cols, dtype=dtype) as reader:
+            for chunk in reader:
+                yielded += len(chunk)
+                yield chunk
+        return
+    except UnicodeDecodeError:
+        if encoding == "cp932":
+            raise
+        log.warning(
+            "UTF-8で読めない箇所が %d 行より後にありました。先頭から CP932（Shift_JIS系）で読み直し、続きの行から処理します。",
+            yielded,
+        )
+    # 渡し済みの行は読み飛ばし、同じ行を二度返さない。
+    skip = yielded
+    with pd.read_csv(path, encoding="cp932", chunksize=chunk_rows, usecols=cols, dtype=dtype) as reader:
+        for chunk in reader:
+            if skip >= len(chunk):
+                skip -= len(chunk)
+                continue
+            yield chunk.iloc[skip:]
+            skip = 0
+
+
+def iter_input_batches(
+    path: Path,
+    ext: str,
+    text_col: str,
+    id_col: Optional[str],
+    chunk_rows: int,
+) -> Iterator[Tuple[pd.DataFrame, int]]:
+    """本文列と ID 列だけを chunk_rows 行ずつ読み、prepare_input_dataframe() 済みの表と除外件数を返す。
+
+    ID 列が無い場合の自動付番は chunk をまたいで入力全体の行番号になる。
+    ID 列は文字列として読み、chunk ごとに数値・文字列の推定が分かれないようにする。
+    """
+    usecols = [c for c in [id_col, text_col] if c is not None]
+    offset = 0
+    for raw in iter_table_chunks(path, ext, chunk_rows, usecols=usecols, str_cols=[id_col]):
+        df, excluded = prepare_input_dataframe(raw, text_col, id_col, id_start=offset)
+        offset += len(raw)
+        yield df, excluded
 
 
 def autodetect_columns(df: pd.DataFrame, text_col: Optional[str], id_col: Optional[str]) -> Tuple[str, Optional[str]]:
@@ -488,23 +775,27 @@ def prepare_input_dataframe(
     df0: pd.DataFrame,
     text_col: str,
     id_col: Optional[str],
+    id_start: int = 0,
 ) -> Tuple[pd.DataFrame, int]:
-    """入力列を標準化し、欠損または空の本文を除外する。"""
+    """入力列を標準化し、欠損または空の本文を除外する。
+
+    ID列が無い場合の自動付番は id_start から始める（chunk 読み込みで通し番号にするため）。
+    """
     df = df0[[c for c in [id_col, text_col] if c is not None]].copy()
     if id_col is None:
         # テキスト列を先に "text" へ寄せてから採番する。
         # 逆順だと、テキスト列名が "id" のとき採番が本文を上書きしてしまう。
         df.rename(columns={text_col: "text"}, inplace=True)
-        df["id"] = np.arange(len(df))
+        df["id"] = np.arange(id_start, id_start + len(df))
     else:
         df.rename(columns={text_col: "text", id_col: "id"}, inplace=True)
 
-    raw_text = df["text"]
-    df["text"] = raw_text.where(raw_text.notna(), "").astype(str).map(normalize_text)
+    df["text"] = normalize_text_series(df["text"])
     empty_mask = df["text"].eq("")
     excluded_count = int(empty_mask.sum())
     if excluded_count:
-        df = df.loc[~empty_mask].copy()
+        # reset_index() が新しい表を返すので、ここで .copy() はしない。
+        df = df.loc[~empty_mask]
     return df.reset_index(drop=True), excluded_count
 
 
@@ -532,7 +823,91 @@ def ensure_ruri() -> None:
         raise RuntimeError(f"Ruri埋め込みには torch / transformers が必要です。詳細: {e}")
 
 
-def compute_embeddings(texts: Sequence[str], model_name: str, batch: int, max_len: int, embedding_prefix: str = DEFAULT_EMBEDDING_PREFIX) -> Tuple[np.ndarray, str]:
+@dataclass
+class EmbeddingModel:
+    tokenizer: Any
+    model: Any
+    device: str
+    backend: str
+    load_seconds: float
+
+
+class _OnnxEncoder:
+    """ONNX Runtime の session を transformers のモデル呼び出しと同じ形で使うための薄い wrapper。"""
+
+    def __init__(self, path: Path):
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def __call__(self, **inputs: Any) -> Any:
+        import torch
+
+        feeds = {k: inputs[k].cpu().numpy().astype(np.int64) for k in self.input_names if k in inputs}
+        hidden = self.session.run(["last_hidden_state"], feeds)[0]
+        return SimpleNamespace(last_hidden_state=torch.from_numpy(hidden))
+
+
+def _onnx_model_path(model_name: str) -> Path:
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+    return Path.home() / ".cache" / "pvm" / "onnx" / f"{safe}.onnx"
+
+
+def _export_onnx_model(model: Any, tok: Any, path: Path) -> None:
+    import torch
+
+    class _LastHidden(torch.nn.Module):
+        def __init__(self, inner: Any):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids: Any, attention_mask: Any) -> Any:
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    ensure_dir(path.parent)
+    dummy = tok([f"{DEFAULT_EMBEDDING_PREFIX}ONNX export"], return_tensors="pt")
+    dynamic = {0: "batch", 1: "seq"}
+    tmp_path = path.with_suffix(".onnx.tmp")
+    log.info("ONNX へ変換中（初回のみ）: %s", path)
+    try:
+        with torch.inference_mode():
+            torch.onnx.export(
+                _LastHidden(model).eval(),
+                (dummy["input_ids"], dummy["attention_mask"]),
+                str(tmp_path),
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic, "last_hidden_state": dynamic},
+                opset_version=17,
+            )
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def resolve_embedding_device(backend: str = DEFAULT_EMBEDDING_BACKEND) -> str:
+    """backend が埋め込みに使う device。torch だけが cuda / mps を使い、他は cpu。"""
+    if backend != "torch":
+        return "cpu"
+    import torch
+
+    if torch.cuda.is_available():
+        return "cuda"
+    if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def load_embedding_model(model_name: str, backend: str = DEFAULT_EMBEDDING_BACKEND) -> EmbeddingModel:
+    """埋め込みモデルを backend に応じて読み込む。
+
+    - torch: transformers の fp32 モデル（cuda / mps / cpu を自動選択）
+    - torch-int8: Linear 層を動的 int8 量子化した CPU モデル
+    - onnx: 初回に ~/.cache/pvm/onnx へ export し、ONNX Runtime（CPU）で実行
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"unknown embedding backend: {backend}")
     _require_windows_utf8_for_embedding()
     import torch
     from transformers import AutoTokenizer, AutoModel
@@ -546,61 +921,1021 @@ def compute_embeddings(texts: Sequence[str], model_name: str, batch: int, max_le
         except ImportError:  # pragma: no cover
             pass
 
-    if torch.cuda.is_available():
-        device = "cuda"
-    elif getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
-        device = "mps"
-    else:
-        device = "cpu"
-    log.info("埋め込みモデルを読み込み中: %s", model_name)
+    device = resolve_embedding_device(backend)
+    t0 = time.perf_counter()
+    log.info("埋め込みモデルを読み込み中: %s (backend=%s)", model_name, backend)
     tok = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModel.from_pretrained(model_name).to(device).eval()
+    if backend == "onnx":
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError(
+                "--embedding-backend onnx には onnxruntime が必要です。"
+                f"`pip install onnxruntime` を実行してください。詳細: {e}"
+            )
+        onnx_path = _onnx_model_path(model_name)
+        if not onnx_path.exists():
+            _export_onnx_model(AutoModel.from_pretrained(model_name).eval(), tok, onnx_path)
+        model: Any = _OnnxEncoder(onnx_path)
+    else:
+        model = AutoModel.from_pretrained(model_name).to(device).eval()
+        if backend == "torch-int8":
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return EmbeddingModel(tok, model, device, backend, time.perf_counter() - t0)
+
+
+def validate_embedding_backend(
+    texts: Sequence[str],
+    model_name: str,
+    backend: str,
+    batch: int,
+    max_len: int,
+    embedding_prefix: str = DEFAULT_EMBEDDING_PREFIX,
+    sample: int = 256,
+    random_state: int = 42,
+) -> Dict[str, Any]:
+    """標本の本文で backend と fp32 torch の埋め込みを比べ、行ごとの cosine 一致度を返す。"""
+    rng = np.random.default_rng(int(random_state))
+    n_sample = min(int(sample), len(texts))
+    rows = np.sort(rng.choice(len(texts), size=n_sample, replace=False)) if n_sample else np.zeros(0, dtype=int)
+    subset = [str(texts[int(i)]) for i in rows]
+    timings: Dict[str, float] = {}
+    vectors: Dict[str, np.ndarray] = {}
+    for name in ("torch", backend):
+        if name in vectors:
+            continue
+        t0 = time.perf_counter()
+        vectors[name], _ = compute_embeddings(subset, model_name, batch, max_len, embedding_prefix=embedding_prefix, backend=name)
+        timings[name] = time.perf_counter() - t0
+    cos = np.sum(l2_normalize(vectors["torch"]) * l2_normalize(vectors[backend]), axis=1) if n_sample else np.zeros(0)
+    return {
+        "backend": backend,
+        "reference": "torch",
+        "n_sample": int(n_sample),
+        "cosine_mean": float(np.mean(cos)) if n_sample else None,
+        "cosine_min": float(np.min(cos)) if n_sample else None,
+        "cosine_p01": float(np.quantile(cos, 0.01)) if n_sample else None,
+        "seconds": {k: float(v) for k, v in timings.items()},
+    }
 
-    reps: List[np.ndarray] = []
-    truncated_total = 0
-    show_bar = sys.stdout.isatty()
-    total_docs = len(texts)
-    log.info("埋め込み開始: 件数=%d, batch=%d, max_len=%d, prefix=%r, device=%s", total_docs, batch, max_len, embedding_prefix, device)
-    progress = tqdm(total=total_docs, desc="埋め込み", unit="件", disable=not show_bar)
+
+def plan_token_budget_batches(lengths: Sequence[int], batch_tokens: int) -> List[np.ndarray]:
+    """トークン長の降順に並べ、padding 後のトークン数が予算内に収まるよう行を詰める。
+
+    1バッチのコストは「最長系列長 × 行数」なので、長さの近い文同士をまとめて
+    padding の無駄を減らす。予算を超える単独の長文は1行だけのバッチにする。
+    返す index 配列は元の行番号で、呼び出し側が元の順序へ書き戻す。
+    """
+    lengths_arr = np.maximum(np.asarray(lengths, dtype=np.int64), 1)
+    order = np.argsort(-lengths_arr, kind="stable")
+    budget = max(1, int(batch_tokens))
+    batches: List[np.ndarray] = []
+    current: List[int] = []
+    current_max = 0
+    for idx in order:
+        length = int(lengths_arr[idx])
+        widest = max(current_max, length)
+        if current and widest * (len(current) + 1) > budget:
+            batches.append(np.asarray(current, dtype=np.int64))
+            current, widest = [], length
+        current.append(int(idx))
+        current_max = widest
+    if current:
+        batches.append(np.asarray(current, dtype=np.int64))
+    return batches
+
+
+def prefetch_iter(iterable: Any, depth: int) -> Any:
+    """iterable を別スレッドで depth 件先読みしながら順に返す。depth<=0 ならそのまま返す。
+
+    生成側の例外は消費側で再送出する。消費側が途中で抜けた場合も生成スレッドは止まる。
+    """
+    if depth <= 0:
+        yield from iterable
+        return
+    import queue
+    import threading
+
+    q: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=int(depth))
+    stop = threading.Event()
+
+    def _put(kind: str, payload: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put((kind, payload), timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            for item in iterable:
+                if not _put("item", item):
+                    return
+            _put("done", None)
+        except BaseException as e:  # noqa: BLE001 - 消費側で再送出する
+            _put("error", e)
+
+    worker = threading.Thread(target=_produce, name="pvm-prefetch", daemon=True)
+    worker.start()
     try:
-        with torch.inference_mode():
-            for i in range(0, total_docs, batch):
-                raw_batch_texts = list(texts[i:i + batch])
-                batch_texts = [f"{embedding_prefix}{t}" if embedding_prefix else str(t) for t in raw_batch_texts]
-                enc = tok(
-                    batch_texts,
-                    padding=True,
-                    truncation=True,
-                    max_length=max_len,
+        while True:
+            kind, payload = q.get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise payload
+            yield payload
+    finally:
+        stop.set()
+        worker.join(timeout=1.0)
+
+
+def split_token_windows(ids: Sequence[int], window: int, overlap: int) -> List[List[int]]:
+    """トークン列を window 長・overlap 重なりの窓に分ける。短い列は1窓のまま返す。
+
+    最後の窓は末尾に揃える（末尾だけの極端に短い窓を作らない）。
+    """
+    ids = list(ids)
+    window = max(1, int(window))
+    if len(ids) <= window:
+        return [ids]
+    stride = max(1, window - max(0, int(overlap)))
+    starts = list(range(0, len(ids) - window, stride)) + [len(ids) - window]
+    return [ids[start:start + window] for start in starts]
+
+
+def embedding_throughput_stats(
+    n_docs: int,
+    seq_lengths: Sequence[int],
+    padded_tokens: int,
+    batch_seconds: Sequence[float],
+    embed_seconds: float,
+    load_seconds: float,
+) -> Dict[str, Any]:
+    """埋め込み1回分の計測値を 結果レポート.json 用の指標にまとめる。
+
+    seq_lengths は padding 前の系列長（窓モードでは窓ごと）、padded_tokens は
+    padding 込みで model に渡したトークン数。秒数はモデル読込を含まない。
+    """
+    lengths = np.asarray(seq_lengths, dtype=np.int64)
+    real_tokens = int(lengths.sum())
+    times = np.asarray(batch_seconds, dtype=np.float64)
+
+    def _pct(q: float) -> Optional[float]:
+        return float(np.percentile(times, q)) if times.size else None
+
+    return {
+        "n_docs": int(n_docs),
+        "n_sequences": int(lengths.size),
+        "n_batches": int(times.size),
+        "model_load_seconds": float(load_seconds),
+        "embed_seconds": float(embed_seconds),
+        "docs_per_sec": _safe_rate(n_docs, embed_seconds),
+        "real_tokens": real_tokens,
+        "padded_tokens": int(padded_tokens),
+        "real_tokens_per_sec": _safe_rate(real_tokens, embed_seconds),
+        "padded_tokens_per_sec": _safe_rate(int(padded_tokens), embed_seconds),
+        "padding_ratio": 1.0 - _safe_ratio(real_tokens, int(padded_tokens)) if padded_tokens else 0.0,
+        "max_seq_len": int(lengths.max()) if lengths.size else 0,
+        "median_seq_len": float(np.median(lengths)) if lengths.size else 0.0,
+        "batch_seconds_p50": _pct(50),
+        "batch_seconds_p90": _pct(90),
+        "batch_seconds_p99": _pct(99),
+    }
+
+
+def compute_embeddings(
+    texts: Sequence[str],
+    model_name: str,
+    batch: int,
+    max_len: int,
+    embedding_prefix: str = DEFAULT_EMBEDDING_PREFIX,
+    batch_tokens: int = 0,
+    show_progress: bool = True,
+    prefetch: int = DEFAULT_EMBED_PREFETCH,
+    out: Optional[np.ndarray] = None,
+    done: Optional[np.ndarray] = None,
+    backend: str = DEFAULT_EMBEDDING_BACKEND,
+    chunk_tokens: int = 0,
+    chunk_overlap: int = 0,
+    stats: Optional[Dict[str, Any]] = None,
+    loaded: Optional[EmbeddingModel] = None,
+) -> Tuple[np.ndarray, str]:
+    """Ruri で mean pooling 埋め込みを計算する。
+
+    batch_tokens > 0 のときは全文を先にトークン化し、plan_token_budget_batches()
+    で長さ順・トークン予算のバッチを組む（行数 batch は使わない）。
+    どちらのモードでも出力は入力順に並ぶ。
+    prefetch > 0 のときはトークン化を別スレッドで prefetch バッチ先行させ、
+    forward と重ねる。0 なら従来どおり逐次実行。
+    out / done を渡すと（EmbeddingCheckpoint の memmap など）、done==0 の行だけを
+    計算して out へ直接書き込み、バッチごとに done を立てる。
+    chunk_tokens > 0 のときは本文（max_len で打ち切り）を prefix と特殊トークン込みで
+    chunk_tokens 以下の窓に分け、窓を通常のバッチで埋め込んでから、文ごとに
+    トークン数で重み付けした平均へ戻す（= 全窓のトークン平均）。
+    stats に dict を渡すと embedding_throughput_stats() の計測値で更新する。
+    loaded に読込済みの EmbeddingModel を渡すとモデル読込を省く（常駐サービス用）。
+    """
+    total_docs = len(texts)
+    pending_rows = np.flatnonzero(np.asarray(done) == 0) if done is not None else np.arange(total_docs)
+    if out is not None and len(pending_rows) == 0:
+        log.info("埋め込みはすべて完了済みです（%d文, checkpoint から再開）", total_docs)
+        return out, (loaded.device if loaded is not None else resolve_embedding_device(backend))
+    import torch
+
+    if loaded is None:
+        loaded = load_embedding_model(model_name, backend)
+        load_seconds = loaded.load_seconds
+    else:
+        load_seconds = 0.0
+    tok, model, device = loaded.tokenizer, loaded.model, loaded.device
+
+    model_keys = ("input_ids", "attention_mask", "token_type_ids")
+    if len(pending_rows) < total_docs:
+        log.info("checkpoint から再開: 完了済み %d 文, 残り %d 文", total_docs - len(pending_rows), len(pending_rows))
+    # 以下の idx は pending_rows 内の位置。書き戻し時に元の行番号へ変換する。
+    prefixed = [f"{embedding_prefix}{texts[int(r)]}" if embedding_prefix else str(texts[int(r)]) for r in pending_rows]
+    truncated_total = 0
+    # owner / weight は窓モード専用。窓 i が pending の何番目の文に属し、何トークンを持つか。
+    owner: Optional[np.ndarray] = None
+    weight: Optional[np.ndarray] = None
+    if chunk_tokens and chunk_tokens > 0:
+        prefix_ids = tok(embedding_prefix, add_special_tokens=False)["input_ids"] if embedding_prefix else []
+        n_special = int(tok.num_special_tokens_to_add(pair=False))
+        window = int(chunk_tokens) - len(prefix_ids) - n_special
+        if window <= int(chunk_overlap):
+            raise PVMUserError(
+                f"--chunk-tokens={int(chunk_tokens)} は prefix と特殊トークン（{len(prefix_ids) + n_special}）"
+                f"と --chunk-overlap={int(chunk_overlap)} を差し引くと窓が残りません。"
+            )
+        body_cap = max(1, int(max_len) - len(prefix_ids) - n_special)
+        bodies = tok(
+            [str(texts[int(r)]) for r in pending_rows], add_special_tokens=False, truncation=True, max_length=body_cap,
+        )["input_ids"]
+        truncated_total = int(sum(1 for ids in bodies if len(ids) >= body_cap))
+        windows: List[List[int]] = []
+        owners: List[int] = []
+        for pos, ids in enumerate(bodies):
+            for piece in split_token_windows(ids, window, chunk_overlap):
+                windows.append(tok.build_inputs_with_special_tokens(list(prefix_ids) + piece))
+                owners.append(pos)
+        owner = np.asarray(owners, dtype=np.int64)
+        weight = np.asarray([len(w) for w in windows], dtype=np.float64)
+        encoded = {"input_ids": windows, "attention_mask": [[1] * len(w) for w in windows]}
+        lengths = [len(w) for w in windows]
+        n_units = len(windows)
+        chunk_desc = f", chunk_tokens={int(chunk_tokens)}, overlap={int(chunk_overlap)}, 窓={n_units}"
+    else:
+        encoded = None
+        n_units = len(prefixed)
+        chunk_desc = ""
+    if batch_tokens and batch_tokens > 0:
+        if encoded is None:
+            encoded = tok(prefixed, truncation=True, max_length=max_len)
+            lengths = [len(ids) for ids in encoded["input_ids"]]
+            truncated_total = int(sum(1 for length in lengths if length >= max_len))
+        batches = plan_token_budget_batches(lengths, batch_tokens)
+        batch_desc = f"batch_tokens={int(batch_tokens)}{chunk_desc}"
+    else:
+        batches = [np.arange(i, min(i + batch, n_units)) for i in range(0, n_units, batch)]
+        batch_desc = f"batch={int(batch)}{chunk_desc}"
+
+    def _tokenized_batches() -> Any:
+        for idx in batches:
+            if encoded is not None:
+                enc = tok.pad(
+                    {k: [encoded[k][int(i)] for i in idx] for k in model_keys if k in encoded},
                     return_tensors="pt",
-                    return_length=True,
                 )
-                if "length" in enc:
-                    try:
-                        truncated_total += int((enc["length"] >= max_len).sum().item())
-                    except Exception:
-                        pass
-                model_inputs = {k: v.to(device) for k, v in enc.items() if k in ("input_ids", "attention_mask", "token_type_ids")}
-                out = model(**model_inputs).last_hidden_state
+                yield idx, enc, 0
+                continue
+            enc = tok(
+                [prefixed[int(i)] for i in idx],
+                padding=True,
+                truncation=True,
+                max_length=max_len,
+                return_tensors="pt",
+                return_length=True,
+            )
+            n_truncated = 0
+            if "length" in enc:
+                try:
+                    n_truncated = int((enc["length"] >= max_len).sum().item())
+                except Exception:
+                    pass
+            yield idx, enc, n_truncated
+
+    X: Optional[np.ndarray] = out
+    pending: Optional[Tuple[np.ndarray, Any, Any]] = None
+    sums: Optional[np.ndarray] = None
+    weight_sums = np.zeros(len(pending_rows), dtype=np.float64)
+    remaining = np.bincount(owner, minlength=len(pending_rows)) if owner is not None else None
+
+    def _flush(item: Tuple[np.ndarray, Any, Any]) -> None:
+        # 前バッチの device→host コピー完了を待って書き戻す。GPU ではこの待ちが
+        # 次バッチの forward と重なる（コピー後に record した event だけを待つ）。
+        nonlocal X, sums
+        idx, host, event = item
+        if event is not None:
+            event.synchronize()
+        rows = host.numpy().astype(np.float32, copy=False)
+        if X is None:
+            X = np.empty((total_docs, rows.shape[1]), dtype=np.float32)
+        if owner is None:
+            positions = idx
+        else:
+            # 窓ベクトルをトークン数で重み付けして文ごとに足し込み、全窓が揃った文だけ確定する。
+            if sums is None:
+                sums = np.zeros((len(pending_rows), rows.shape[1]), dtype=np.float64)
+            docs = owner[idx]
+            np.add.at(sums, docs, rows * weight[idx, None])
+            np.add.at(weight_sums, docs, weight[idx])
+            np.subtract.at(remaining, docs, 1)
+            positions = np.unique(docs)
+            positions = positions[remaining[positions] == 0]
+            rows = (sums[positions] / weight_sums[positions, None]).astype(np.float32)
+        target = pending_rows[positions]
+        X[target] = rows
+        if done is not None:
+            done[target] = 1
+
+    seq_lengths: List[int] = []
+    padded_tokens = 0
+    batch_seconds: List[float] = []
+    show_bar = show_progress and sys.stdout.isatty()
+    log.info("埋め込み開始: 件数=%d, %s, max_len=%d, prefix=%r, device=%s", total_docs, batch_desc, max_len, embedding_prefix, device)
+    # 窓モードの進捗は文ではなく窓の数で進む。
+    progress = tqdm(total=n_units, desc="埋め込み", unit="窓" if owner is not None else "件", disable=not show_bar)
+    embed_start = time.perf_counter()
+    try:
+        with torch.inference_mode():
+            for idx, enc, n_truncated in prefetch_iter(_tokenized_batches(), prefetch):
+                # batch 時間は forward と前バッチの書き戻しまで（トークン化待ちは含まない）。
+                batch_start = time.perf_counter()
+                truncated_total += n_truncated
+                seq_lengths.extend(int(v) for v in enc["attention_mask"].sum(dim=1).tolist())
+                padded_tokens += int(enc["attention_mask"].numel())
+                model_inputs = {k: v.to(device) for k, v in enc.items() if k in model_keys}
+                hidden = model(**model_inputs).last_hidden_state
                 mask = model_inputs["attention_mask"].unsqueeze(-1)
-                emb = (out * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-6)
-                reps.append(emb.detach().cpu().numpy().astype(np.float32))
-                progress.update(len(raw_batch_texts))
+                emb = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-6)
+                if device == "cuda":
+                    host = emb.detach().to("cpu", non_blocking=True)
+                    event = torch.cuda.Event()
+                    event.record()
+                else:
+                    host, event = emb.detach().cpu(), None
+                if pending is not None:
+                    _flush(pending)
+                pending = (idx, host, event)
+                batch_seconds.append(time.perf_counter() - batch_start)
+                progress.update(len(idx))
+            if pending is not None:
+                _flush(pending)
     finally:
         progress.close()
+        # memmap 出力は完了済みバッチまでを確実に書き出す（行データ → 完了マスクの順）。
+        for arr in (X, done):
+            if hasattr(arr, "flush"):
+                arr.flush()
     if truncated_total > 0:
         log.warning("Tokenizerで %d 文が max_len=%d 付近で切り詰められた可能性があります。", truncated_total, max_len)
-    X = np.vstack(reps).astype(np.float32)
-    log.info("埋め込み完了（%d文, device=%s）", total_docs, device)
+    if X is None:
+        X = np.zeros((0, 0), dtype=np.float32)
+    measured = embedding_throughput_stats(
+        len(pending_rows), seq_lengths, padded_tokens, batch_seconds,
+        time.perf_counter() - embed_start, load_seconds,
+    )
+    if stats is not None:
+        stats.update(measured)
+    log.info(
+        "埋め込み完了（%d文, device=%s, %.1f docs/sec, padding率=%.1f%%, 最大長=%d, モデル読込=%.1f秒）",
+        total_docs, device, measured["docs_per_sec"], 100.0 * measured["padding_ratio"],
+        measured["max_seq_len"], measured["model_load_seconds"],
+    )
     return X, device
 
+
+def _embedding_shard_worker(payload: Dict[str, Any]) -> Tuple[int, Optional[np.ndarray], str, float, Dict[str, Any]]:
+    """ProcessPoolExecutor 用。子プロセスで torch のスレッド数を固定し、1シャードを埋め込む。
+
+    checkpoint_dir があれば親が用意した memmap を r+ で開き、担当行へ直接書く
+    （この場合は配列を返さない）。
+    """
+    import torch
+
+    torch.set_num_threads(int(payload["threads"]))
+    out: Optional[np.ndarray] = None
+    done: Optional[np.ndarray] = None
+    if payload.get("checkpoint_dir"):
+        ckpt_dir = Path(payload["checkpoint_dir"])
+        start, stop = int(payload["row_start"]), int(payload["row_stop"])
+        out = np.load(ckpt_dir / "embeddings.npy", mmap_mode="r+")[start:stop]
+        done = np.load(ckpt_dir / "done.npy", mmap_mode="r+")[start:stop]
+    stats: Dict[str, Any] = {}
+    t0 = time.perf_counter()
+    X, device = compute_embeddings(
+        payload["texts"],
+        payload["model_name"],
+        payload["batch"],
+        payload["max_len"],
+        embedding_prefix=payload["embedding_prefix"],
+        batch_tokens=payload["batch_tokens"],
+        show_progress=False,
+        prefetch=payload["prefetch"],
+        out=out,
+        done=done,
+        backend=payload["backend"],
+        chunk_tokens=payload["chunk_tokens"],
+        chunk_overlap=payload["chunk_overlap"],
+        stats=stats,
+    )
+    return int(payload["shard"]), (None if out is not None else X), device, time.perf_counter() - t0, stats
+
+
+@contextmanager
+def _torch_num_threads(threads: int) -> Iterator[None]:
+    """このプロセスの torch intra-op スレッド数を threads にし、抜けるときに元へ戻す。0以下なら触らない。"""
+    if not threads or threads <= 0:
+        yield
+        return
+    import torch
+
+    previous = int(torch.get_num_threads())
+    torch.set_num_threads(int(threads))
+    try:
+        yield
+    finally:
+        torch.set_num_threads(previous)
+
+
+def compute_embeddings_sharded(
+    texts: Sequence[str],
+    model_name: str,
+    batch: int,
+    max_len: int,
+    embedding_prefix: str = DEFAULT_EMBEDDING_PREFIX,
+    batch_tokens: int = 0,
+    workers: int = 1,
+    threads: int = 0,
+    prefetch: int = DEFAULT_EMBED_PREFETCH,
+    checkpoint: Optional[EmbeddingCheckpoint] = None,
+    backend: str = DEFAULT_EMBEDDING_BACKEND,
+    chunk_tokens: int = 0,
+    chunk_overlap: int = 0,
+    loaded: Optional[EmbeddingModel] = None,
+) -> Tuple[np.ndarray, str, List[Dict[str, Any]]]:
+    """CPU で N プロセスに連続シャードを分けて埋め込み、入力順に連結する。
+
+    各プロセスはモデルを個別に保持し、torch の intra-op スレッド数を threads に固定する
+    （0 なら論理コア数 / workers）。GPU/MPS が使える環境や件数が1件以下のときは
+    1プロセスのまま計算し、その間だけスレッド数を変える（loaded があれば使い回す）。
+    checkpoint があれば各シャードはその memmap の担当行へ直接書き、戻り値も memmap になる。
+    戻り値の3番目はプロセスごとの件数・秒数・docs/sec と throughput（embedding_throughput_stats()）。
+    """
+    import torch
+
+    total_docs = len(texts)
+    threads = int(threads) if threads and threads > 0 else max(1, (os.cpu_count() or 1) // max(1, int(workers)))
+    accelerated = backend == "torch" and (
+        torch.cuda.is_available()
+        or (getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available())
+    )
+    if accelerated and workers > 1:
+        log.warning("GPU/MPS が使えるため --embed-workers=%d は使わず1プロセスで埋め込みます。", int(workers))
+    n_shards = 1 if accelerated else max(1, min(int(workers), total_docs))
+    if n_shards <= 1:
+        stats: Dict[str, Any] = {}
+        t0 = time.perf_counter()
+        with _torch_num_threads(0 if accelerated else threads):
+            used_threads = int(torch.get_num_threads())
+            X, device = compute_embeddings(
+                texts, model_name, batch, max_len, embedding_prefix=embedding_prefix,
+                batch_tokens=batch_tokens, prefetch=prefetch,
+                out=checkpoint.embeddings if checkpoint is not None else None,
+                done=checkpoint.done if checkpoint is not None else None,
+                backend=backend,
+                chunk_tokens=chunk_tokens,
+                chunk_overlap=chunk_overlap,
+                stats=stats,
+                loaded=loaded,
+            )
+        seconds = time.perf_counter() - t0
+        return X, device, [{
+            "shard": 0, "n_docs": total_docs, "threads": used_threads,
+            "seconds": float(seconds), "docs_per_sec": _safe_rate(total_docs, seconds), "throughput": stats,
+        }]
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    bounds = np.array_split(np.arange(total_docs), n_shards)
+    payloads = [
+        {
+            "shard": shard, "texts": [str(texts[int(i)]) for i in idx], "model_name": model_name,
+            "batch": batch, "max_len": max_len, "embedding_prefix": embedding_prefix,
+            "batch_tokens": batch_tokens, "threads": threads, "prefetch": prefetch,
+            "checkpoint_dir": str(checkpoint.directory) if checkpoint is not None else None, "backend": backend,
+            "chunk_tokens": chunk_tokens, "chunk_overlap": chunk_overlap,
+            "row_start": int(idx[0]) if len(idx) else 0, "row_stop": int(idx[-1]) + 1 if len(idx) else 0,
+        }
+        for shard, idx in enumerate(bounds)
+    ]
+    log.info("埋め込みを %d プロセスに分割します（各 %d スレッド, 件数=%d）", n_shards, threads, total_docs)
+    parts: Dict[int, Optional[np.ndarray]] = {}
+    worker_stats: List[Dict[str, Any]] = []
+    device = "cpu"
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n_shards, mp_context=ctx) as pool:
+        for shard, X_part, device, seconds, stats in pool.map(_embedding_shard_worker, payloads):
+            n_docs = len(payloads[shard]["texts"])
+            parts[shard] = X_part
+            worker_stats.append({
+                "shard": shard, "n_docs": n_docs, "threads": threads,
+                "seconds": float(seconds), "docs_per_sec": _safe_rate(n_docs, seconds), "throughput": stats,
+            })
+            log.info("  worker %d: %d件 / %.1f秒 (%.1f docs/sec)", shard, n_docs, seconds, _safe_rate(n_docs, seconds))
+    if checkpoint is not None:
+        return checkpoint.embeddings, device, worker_stats
+    X = np.vstack([parts[shard] for shard in range(n_shards)]).astype(np.float32, copy=False)
+    return X, device, worker_stats
+
+
+def embedding_signature(
+    embedding_model: str,
+    embedding_prefix: str,
+    max_len: int,
+    embedding_backend: str = DEFAULT_EMBEDDING_BACKEND,
+    chunk_tokens: int = 0,
+    chunk_overlap: int = 0,
+) -> Dict[str, Any]:
+    """embedding 空間を決める設定をまとめる。cache key と互換検査の基準になる。"""
+    return {
+        "embedding_model": str(embedding_model),
+        "embedding_prefix": str(embedding_prefix),
+        "max_len": int(max_len),
+        "embedding_backend": str(embedding_backend),
+        "chunk_tokens": int(chunk_tokens),
+        "chunk_overlap": int(chunk_overlap) if chunk_tokens else 0,
+    }
+
+
+def embedding_cache_key(text: str, signature: Dict[str, Any]) -> str:
+    """正規化済み本文と embedding 設定から content-addressed key を作る。"""
+    h = hashlib.sha256()
+    h.update(json.dumps(signature, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    h.update(b"\0")
+    h.update(normalize_text(text).encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """sqlite3 に保存する content-addressed な embedding store。
+
+    key は embedding_cache_key() の sha256。容量が上限を超えたら
+    最終利用時刻の古い順に削除する（LRU）。ベクトルは float32 の生バイト列で持つ。
+    """
+
+    _LOOKUP_CHUNK = 500
+
+    def __init__(self, path: Path, max_mb: float = DEFAULT_EMBEDDING_CACHE_MAX_MB):
+        self.path = Path(path)
+        self.max_bytes = int(max(0.0, float(max_mb)) * 1024 * 1024)
+        ensure_dir(self.path.parent)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vec BLOB NOT NULL, "
+            "nbytes INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "EmbeddingCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        self.close()
+        return False
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        now = time.time()
+        for i in range(0, len(unique_keys), self._LOOKUP_CHUNK):
+            chunk = unique_keys[i:i + self._LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = self._conn.execute(f"SELECT key, dim, vec FROM embeddings WHERE key IN ({marks})", chunk).fetchall()
+            for key, dim, vec in rows:
+                arr = np.frombuffer(vec, dtype=np.float32)
+                if arr.size == int(dim):
+                    found[str(key)] = arr
+            if rows:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used=? WHERE key=?",
+                    [(now, str(key)) for key, _, _ in rows],
+                )
+        self._conn.commit()
+        return found
+
+    def put_many(self, items: Sequence[Tuple[str, np.ndarray]]) -> None:
+        now = time.time()
+        rows = []
+        for key, vec in items:
+            blob = np.ascontiguousarray(vec, dtype=np.float32).tobytes()
+            rows.append((str(key), int(np.asarray(vec).size), blob, len(blob), now))
+        self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+        self._conn.commit()
+
+    def total_bytes(self) -> int:
+        return int(self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0])
+
+    def evict(self) -> int:
+        """上限を超えていれば古い順に削除し、削除件数を返す。"""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+        target = int(self.max_bytes * EMBEDDING_CACHE_EVICT_TARGET)
+        doomed: List[str] = []
+        for key, nbytes in self._conn.execute("SELECT key, nbytes FROM embeddings ORDER BY last_used ASC"):
+            if total <= target:
+                break
+            doomed.append(str(key))
+            total -= int(nbytes)
+        self._conn.executemany("DELETE FROM embeddings WHERE key=?", [(k,) for k in doomed])
+        self._conn.commit()
+        return len(doomed)
+
+
+class EmbeddingCheckpoint:
+    """再開可能な埋め込み出力。directory に memmap の .npy と完了マスクを置く。
+
+    embeddings.npy (n×dim float32) へ行を直接書き、done.npy (uint8) で完了行を記録する。
+    checkpoint.json の fingerprint（本文列 + embedding 設定の sha256）・件数・次元が
+    一致すれば既存ファイルを r+ で開いて続きから計算し、一致しなければ作り直す。
+    """
+
+    def __init__(self, directory: Path, fingerprint: str, n_rows: int, dim: int):
+        self.directory = Path(directory)
+        self.fingerprint = str(fingerprint)
+        ensure_dir(self.directory)
+        self.embeddings_path = self.directory / "embeddings.npy"
+        self.done_path = self.directory / "done.npy"
+        self.meta_path = self.directory / "checkpoint.json"
+        meta = {"fingerprint": self.fingerprint, "n_rows": int(n_rows), "dim": int(dim)}
+        resumable = False
+        if self.meta_path.exists() and self.embeddings_path.exists() and self.done_path.exists():
+            try:
+                resumable = json.loads(self.meta_path.read_text(encoding="utf-8")) == meta
+            except (OSError, json.JSONDecodeError):
+                resumable = False
+            if not resumable:
+                log.warning("embedding checkpoint の入力・設定が今回と異なるため作り直します: %s", self.directory)
+        if resumable:
+            self.embeddings = np.load(self.embeddings_path, mmap_mode="r+")
+            self.done = np.load(self.done_path, mmap_mode="r+")
+        else:
+            self.meta_path.unlink(missing_ok=True)
+            self.embeddings = np.lib.format.open_memmap(self.embeddings_path, mode="w+", dtype=np.float32, shape=(int(n_rows), int(dim)))
+            self.done = np.lib.format.open_memmap(self.done_path, mode="w+", dtype=np.uint8, shape=(int(n_rows),))
+            self.flush()
+            _atomic_write_json(self.meta_path, meta)
+        self.resumed_rows = int(np.count_nonzero(self.done))
+
+    @staticmethod
+    def make_fingerprint(texts: Sequence[str], signature: Dict[str, Any]) -> str:
+        h = hashlib.sha256()
+        h.update(json.dumps(signature, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        for t in texts:
+            h.update(b"\0")
+            h.update(str(t).encode("utf-8"))
+        return h.hexdigest()
+
+    @property
+    def complete(self) -> bool:
+        return bool(np.all(self.done))
+
+    def flush(self) -> None:
+        # 行データを先に flush し、完了マスクが実データより先に永続化されないようにする。
+        self.embeddings.flush()
+        self.done.flush()
+
+
+def _embedding_dim(model_name: str) -> int:
+    from transformers import AutoConfig
+
+    return int(AutoConfig.from_pretrained(model_name).hidden_size)
+
+
+def embed_texts(
+    texts: Sequence[str],
+    model_name: str,
+    batch: int,
+    max_len: int,
+    embedding_prefix: str = DEFAULT_EMBEDDING_PREFIX,
+    cache_path: Optional[Path] = None,
+    cache_max_mb: float = DEFAULT_EMBEDDING_CACHE_MAX_MB,
+    batch_tokens: int = 0,
+    workers: int = 1,
+    threads: int = 0,
+    prefetch: int = DEFAULT_EMBED_PREFETCH,
+    checkpoint_dir: Optional[Path] = None,
+    backend: str = DEFAULT_EMBEDDING_BACKEND,
+    chunk_tokens: int = 0,
+    chunk_overlap: int = 0,
+    loaded: Optional[EmbeddingModel] = None,
+) -> Tuple[np.ndarray, str, Dict[str, Any]]:
+    """main() 用の埋め込み入口。重複除去と cache 参照を済ませ、未知の本文だけモデルへ渡す。
+
+    texts は prepare_input_dataframe() で正規化済みの前提。同一本文は1回だけ埋め込み、
+    ベクトルを全行へ書き戻す（行順は texts のまま）。checkpoint_dir を渡すと
+    モデル計算分を EmbeddingCheckpoint へ逐次書き、同じ入力の再実行では続きから計算する。
+    loaded を渡すと単一プロセス経路ではそのモデルを使い回す（chunk ごとの再読み込みを避ける）。
+    戻り値の3番目は 結果レポート.json の "embedding" に載せる実行情報。
+    """
+    texts = [str(t) for t in texts]
+    codes, uniques = pd.factorize(pd.Series(texts, dtype=object), sort=False)
+    unique_texts = [str(t) for t in uniques]
+    n_duplicates = len(texts) - len(unique_texts)
+    if n_duplicates:
+        log.info("埋め込み前の重複除去: %d 行 → %d 件（重複 %d 行）", len(texts), len(unique_texts), n_duplicates)
+    signature = embedding_signature(model_name, embedding_prefix, max_len, backend, chunk_tokens, chunk_overlap)
+    info: Dict[str, Any] = {
+        **signature,
+        "n_texts": len(texts),
+        "n_unique_texts": len(unique_texts),
+        "duplicate_ratio": _safe_ratio(n_duplicates, len(texts)),
+        "batch": int(batch),
+        "batch_tokens": int(batch_tokens),
+        "prefetch": int(prefetch),
+        "workers": None,
+        "checkpoint": None,
+        "throughput": None,
+    }
+
+    def _compute(subset: List[str]) -> Tuple[np.ndarray, str]:
+        ensure_ruri()
+        checkpoint: Optional[EmbeddingCheckpoint] = None
+        if checkpoint_dir is not None:
+            checkpoint = EmbeddingCheckpoint(
+                Path(checkpoint_dir),
+                EmbeddingCheckpoint.make_fingerprint(subset, signature),
+                len(subset),
+                _embedding_dim(model_name),
+            )
+            info["checkpoint"] = {"path": str(checkpoint_dir), "resumed_rows": checkpoint.resumed_rows}
+        if workers <= 1:
+            stats: Dict[str, Any] = {}
+            # --embed-threads だけの指定はこの呼び出しの間だけ効かせ、後段の ICA/BLAS へ持ち越さない。
+            with _torch_num_threads(threads):
+                result = compute_embeddings(
+                    subset, model_name, batch, max_len, embedding_prefix=embedding_prefix,
+                    batch_tokens=batch_tokens, prefetch=prefetch,
+                    out=checkpoint.embeddings if checkpoint is not None else None,
+                    done=checkpoint.done if checkpoint is not None else None,
+                    backend=backend,
+                    chunk_tokens=chunk_tokens,
+                    chunk_overlap=chunk_overlap,
+                    stats=stats,
+                    loaded=loaded,
+                )
+            info["throughput"] = stats or None
+            return result
+        X_sub, dev, worker_stats = compute_embeddings_sharded(
+            subset, model_name, batch, max_len, embedding_prefix=embedding_prefix,
+            batch_tokens=batch_tokens, workers=workers, threads=threads, prefetch=prefetch,
+            checkpoint=checkpoint, backend=backend, chunk_tokens=chunk_tokens, chunk_overlap=chunk_overlap,
+            loaded=loaded,
+        )
+        info["workers"] = worker_stats
+        if len(worker_stats) == 1:
+            info["throughput"] = worker_stats[0]["throughput"] or None
+        return X_sub, dev
+
+    if cache_path is None:
+        X_unique, device = _compute(unique_texts)
+        info["cache"] = None
+        # 重複が無ければ行の並べ直しは不要（checkpoint の memmap をそのまま返す）。
+        return (X_unique if not n_duplicates else X_unique[codes]), device, info
+
+    device = "cache"
+    with EmbeddingCache(Path(cache_path), cache_max_mb) as store:
+        keys = [embedding_cache_key(t, signature) for t in unique_texts]
+        found = store.get_many(keys)
+        miss_rows = [i for i, key in enumerate(keys) if key not in found]
+        hits = len(unique_texts) - len(miss_rows)
+        log.info("embedding cache: hit=%d, miss=%d (%s)", hits, len(miss_rows), cache_path)
+        computed: Optional[np.ndarray] = None
+        if miss_rows:
+            computed, device = _compute([unique_texts[i] for i in miss_rows])
+            store.put_many([(keys[i], computed[j]) for j, i in enumerate(miss_rows)])
+        evicted = store.evict()
+        if evicted:
+            log.info("embedding cache: 容量上限 %.0fMB を超えたため %d 件を削除しました。", float(cache_max_mb), evicted)
+        if computed is not None:
+            dim = int(computed.shape[1])
+        else:
+            dim = int(next(iter(found.values())).size) if found else 0
+        X_unique = np.empty((len(unique_texts), dim), dtype=np.float32)
+        for i, key in enumerate(keys):
+            if key in found:
+                X_unique[i] = found[key]
+        if computed is not None:
+            X_unique[miss_rows] = computed
+        info["cache"] = {
+            "path": str(cache_path),
+            "hits": int(hits),
+            "misses": int(len(miss_rows)),
+            "hit_rate": _safe_ratio(hits, len(unique_texts)),
+            "evicted": int(evicted),
+            "max_mb": float(cache_max_mb),
+        }
+    return X_unique[codes], device, info
+
+
+def load_precomputed_embeddings(
+    path: Path,
+    row_ids: Sequence[Any],
+    embedding_model: str,
+    embedding_prefix: str,
+    max_len: int,
+    embedding_backend: str = DEFAULT_EMBEDDING_BACKEND,
+    chunk_tokens: int = 0,
+    chunk_overlap: int = 0,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """外部で計算済みの埋め込み（.npy / .parquet）を入力行の順に読み込む。
+
+    同名の `<path>.json` に embedding_model / embedding_prefix / max_len
+    （任意で embedding_backend と ids）を記録しておく。設定が現在の引数と
+    違えば停止する。ids（parquet では id 列）があれば入力の id 列と文字列で突き合わせ、
+    無ければ行数が一致する場合だけ行順で対応させる。
+    """
+    path = Path(path)
+    meta_path = path.with_name(path.name + ".json")
+    if not path.exists():
+        raise PVMUserError(f"--embeddings のファイルが見つかりません: {path}")
+    if not meta_path.exists():
+        raise PVMUserError(
+            f"埋め込みの設定ファイル {meta_path.name} がありません。"
+            "embedding_model / embedding_prefix / max_len を記録した JSON を同じ場所に置いてください。"
+        )
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    problems = _embedding_compat_problems(
+        meta, embedding_model, embedding_prefix, max_len, embedding_backend, chunk_tokens, chunk_overlap,
+    )
+    if problems:
+        raise SystemExit(
+            f"--embeddings の embedding 設定と現在の設定が不一致です: {'、'.join(problems)}。"
+            "計算時と同じ --embedding_model / --embedding-prefix / --max_len / --embedding-backend / --chunk-tokens を指定してください。"
+        )
+
+    ids: Optional[List[str]] = [str(v) for v in meta["ids"]] if meta.get("ids") is not None else None
+    suffix = path.suffix.lower()
+    if suffix == ".npy":
+        X = np.load(path, mmap_mode="r")
+    elif suffix == ".parquet":
+        table = pd.read_parquet(path)
+        if "id" in table.columns:
+            ids = table["id"].astype(str).tolist()
+            table = table.drop(columns=["id"])
+        if "embedding" in table.columns:
+            X = np.stack([np.asarray(v, dtype=np.float32) for v in table["embedding"]])
+        else:
+            X = table.to_numpy(dtype=np.float32)
+    else:
+        raise PVMUserError(f"--embeddings は .npy または .parquet を指定してください: {path}")
+    if X.ndim != 2:
+        raise PVMUserError(f"--embeddings は 2 次元の行列が必要です（shape={X.shape}）")
+
+    want = [str(v) for v in row_ids]
+    if ids is None:
+        if len(X) != len(want):
+            raise PVMUserError(
+                f"--embeddings の行数 {len(X)} が有効な入力件数 {len(want)} と一致しません。"
+                "行を特定するには ids（parquet では id 列）を記録してください。"
+            )
+        rows = np.arange(len(want))
+    else:
+        if len(ids) != len(X):
+            raise PVMUserError(f"--embeddings の ids 件数 {len(ids)} と行数 {len(X)} が一致しません。")
+        position = pd.Index(ids)
+        if not position.is_unique:
+            raise PVMUserError("--embeddings の ids に重複があります。")
+        rows = position.get_indexer(want)
+        missing = int(np.sum(rows < 0))
+        if missing:
+            raise PVMUserError(f"入力の {missing} 行に対応する埋め込みが --embeddings にありません。")
+    # 行順がそのまま一致する float32 の .npy は memmap のまま返し、全件をメモリへ
+    # 読み込まない（--pca-solver incremental はこれを chunk ごとに読む）。
+    keep_mmap = (
+        isinstance(X, np.memmap) and X.dtype == np.float32 and X.flags.c_contiguous
+        and np.array_equal(rows, np.arange(len(X)))
+    )
+    if not keep_mmap:
+        X = np.ascontiguousarray(X[rows], dtype=np.float32)
+    log.info("計算済み埋め込みを読み込みました: %s（%d行, dim=%d）", path, X.shape[0], X.shape[1])
+    info: Dict[str, Any] = {
+        **embedding_signature(embedding_model, embedding_prefix, max_len, embedding_backend, chunk_tokens, chunk_overlap),
+        "n_texts": int(len(want)),
+        "source": "precomputed",
+        "path": str(path),
+        "aligned_by": "ids" if ids is not None else "row_order",
+        "cache": None,
+    }
+    return X, info
+
+
+# 共有白色化を使う条件。PCA 座標の相関がこれ以下なら列ごとの rescale を白色化とみなす。
+PCA_WHITENING_MAX_CORR = 1e-3
+
+
+@dataclass
+class PcaWhitening:
+    """PCA 座標 Xp の白色化を ICA の試行・seed 間で共有するための値。
+
+    Xp の列は無相関なので、先頭 c 成分の白色化は中心化した列をそれぞれの
+    RMS で割るだけで済む（FastICA の whiten="unit-variance" と同じ尺度）。
+    白色化済み行列そのものは持たず、試行ごとに必要な c 列だけを作る。
+    """
+    mean: np.ndarray
+    scale: np.ndarray
+
+    @classmethod
+    def from_scores(cls, Xp: np.ndarray, batch_rows: int = DEFAULT_PCA_BATCH_ROWS) -> Optional["PcaWhitening"]:
+        """列が十分に無相関なときだけ作る。近似 PCA で相関が残る場合は None。
+
+        相関は batch_rows 行ずつ積算し、Xp と同じ大きさの float64 行列は作らない。
+        """
+        n_rows = len(Xp)
+        if n_rows < 2:
+            return None
+        mean = Xp.mean(axis=0, dtype=np.float64)
+        gram = np.zeros((Xp.shape[1], Xp.shape[1]), dtype=np.float64)
+        for start in range(0, n_rows, max(1, int(batch_rows))):
+            block = np.asarray(Xp[start:start + batch_rows], dtype=np.float64) - mean
+            gram += block.T @ block
+        cov = gram / n_rows
+        scale = np.sqrt(np.diag(cov))
+        if not np.all(scale > 0):
+            return None
+        corr = cov / np.outer(scale, scale)
+        if float(np.max(np.abs(corr - np.eye(corr.shape[0])))) > PCA_WHITENING_MAX_CORR:
+            return None
+        return cls(mean=mean, scale=scale)
+
+    def whiten(self, X: np.ndarray, n_components: int) -> np.ndarray:
+        """X の先頭 n_components 列を X と同じ dtype で白色化する。"""
+        c = int(n_components)
+        mean = self.mean[:c].astype(X.dtype, copy=False)
+        scale = self.scale[:c].astype(X.dtype, copy=False)
+        return (X[:, :c] - mean) / scale
+
+
+class _PrewhitenedFastICA:
+    """共有の PcaWhitening に対して fixed-point 反復だけを行う FastICA。
+
+    components_ / mean_ は元の PCA 座標に対する値へ戻すため、通常の FastICA と
+    同じく (Xp - mean_) @ components_.T で独立成分が得られる。
+    """
+
+    def __init__(self, whitening: PcaWhitening, ica: FastICA, n_components: int):
+        self.whitening = whitening
+        self.ica = ica
+        self.n_components = int(n_components)
+
+    def fit_transform(self, X: np.ndarray) -> np.ndarray:
+        if X.shape[1] != len(self.whitening.mean):
+            raise ValueError(f"白色化の次元と入力の列数が一致しません: {X.shape[1]} != {len(self.whitening.mean)}")
+        c = self.n_components
+        S = self.ica.fit_transform(self.whitening.whiten(X, c))
+        # whiten="unit-variance" と同じく独立成分を単位分散へ揃える。
+        S_std = np.std(S, axis=0, keepdims=True)
+        S /= S_std
+        components = np.zeros((c, X.shape[1]), dtype=np.float64)
+        components[:, :c] = (self.ica.components_ / S_std.T) / self.whitening.scale[:c]
+        self.components_ = components
+        self.mean_ = self.whitening.mean
+        self.mixing_ = np.linalg.pinv(components)
+        self.n_iter_ = self.ica.n_iter_
+        return S
+
+
 def _fastica_safe(
     n_components: int,
     random_state: int,
     algorithm: str = "parallel",
     max_iter: int = 5000,
     tol: float = 1e-4,
-) -> FastICA:
+    whitening: Optional[PcaWhitening] = None,
+) -> Any:
+    if whitening is not None:
+        ica = FastICA(whiten=False, algorithm=algorithm, max_iter=max_iter, tol=tol, random_state=random_state)
+        return _PrewhitenedFastICA(whitening, ica, n_components)
     try:
         return FastICA(
             n_components=n_components,
@@ -641,6 +1976,12 @@ class TransformBundle:
     ica2_status: str = "converged"
     final_n_components: int = 0
     fallback_level: int = 0
+    # 上の各ステップを合成した 1 本のアフィン変換 (X @ W + b)。
+    # None の場合は fuse_transform_bundle() が初回利用時に計算する。
+    fused_weight: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    fused_bias: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    fused_pre_weight: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    fused_pre_bias: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
 
 
 
@@ -676,6 +2017,11 @@ class BaselineMeta:
     quality_summary: str = ""
     quality_metrics: Optional[Dict[str, Any]] = None
     retry_count: int = 0
+    embedding_backend: str = DEFAULT_EMBEDDING_BACKEND
+    chunk_tokens: int = 0
+    chunk_overlap: int = 0
+    # ICA① の白色化: "fastica"（FastICA 自身）/ "pca_shared"（--ica-shared-whitening）。
+    ica_whitening: str = "fastica"
 
 
 
@@ -701,13 +2047,148 @@ def propose_ica1_dims_from_pca_base(
     return sorted(max(2, min(max_pcs, d)) for d in dims)
 
 
+def _try_fit_ica(
+    X: np.ndarray,
+    n_components: int,
+    algorithm: str,
+    max_iter: int,
+    tol: float,
+    seed: int,
+    stage_name: str,
+    whitening: Optional[PcaWhitening] = None,
+) -> Tuple[Optional[FastICA], Optional[np.ndarray], Optional[BaseException]]:
+    """ICA を1回だけ fit する。失敗時は (None, None, 理由) を返す。"""
+    ica = _fastica_safe(n_components, seed, algorithm=algorithm, max_iter=max_iter, tol=tol, whitening=whitening)
+    try:
+        with warnings.catch_warnings(record=True) as captured:
+            warnings.simplefilter("always", ConvergenceWarning)
+            S = ica.fit_transform(X)
+    except (ValueError, RuntimeError, FloatingPointError, LinAlgError) as e:
+        return None, None, e
+    warned = any(issubclass(w.category, ConvergenceWarning) for w in captured)
+    finite_ok = np.isfinite(S).all() and np.isfinite(getattr(ica, "components_", np.array([]))).all()
+    if warned or (not finite_ok):
+        why = "convergence warning" if warned else "non-finite values"
+        return None, None, RuntimeError(f"{stage_name} {why}")
+    return ica, S, None
+
+
+# ICA retry の並列実行は1回の run で1つのプロセスプールを使い回す。
+# 初めて必要になった時点で起動し、main() の終了時に shutdown_ica_pool() で閉じる。
+_ICA_POOL: Optional[Any] = None
+_ICA_POOL_WORKERS = 0
+_ICA_POOL_GENERATION: Optional[Any] = None
+_ICA_POOL_DIR: Optional[TemporaryDirectory] = None
+
+# worker 側の取り消しフラグ。投入時の世代から進んでいれば、その候補は fit せずに返す。
+_ICA_WORKER_GENERATION: Optional[Any] = None
+
+
+def _ica_pool_init(blas_threads: int, generation: Any) -> None:
+    global _ICA_WORKER_GENERATION
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(limits=max(1, int(blas_threads)))
+    _ICA_WORKER_GENERATION = generation
+
+
+def _ica_pool_attempt(
+    path: str,
+    entry: Tuple[int, str, int, float, int],
+    stage_name: str,
+    whitening: Optional[PcaWhitening],
+    generation: int,
+) -> Tuple[Optional[FastICA], Optional[np.ndarray], Optional[BaseException]]:
+    if _ICA_WORKER_GENERATION.value != int(generation):
+        return None, None, RuntimeError(f"{stage_name} 採否が決まったため先行 fit を取り消しました")
+    return _try_fit_ica(np.load(path, mmap_mode="r"), *entry, stage_name, whitening)
+
+
+def _get_ica_pool(workers: int) -> Any:
+    """run 内で共有する ICA retry 用プロセスプールを返す（未起動なら起動する）。"""
+    global _ICA_POOL, _ICA_POOL_WORKERS, _ICA_POOL_GENERATION, _ICA_POOL_DIR
+    if _ICA_POOL is not None and _ICA_POOL_WORKERS != int(workers):
+        shutdown_ica_pool()
+    if _ICA_POOL is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        ctx = multiprocessing.get_context("spawn")
+        blas_threads = max(1, (os.cpu_count() or 1) // int(workers))
+        log.info("ICA retry 用に %d プロセスを起動します（各 BLAS %d スレッド）", int(workers), blas_threads)
+        _ICA_POOL_GENERATION = ctx.Value("q", 0)
+        _ICA_POOL_DIR = TemporaryDirectory(prefix="pvm_ica_")
+        _ICA_POOL = ProcessPoolExecutor(
+            max_workers=int(workers),
+            mp_context=ctx,
+            initializer=_ica_pool_init,
+            initargs=(blas_threads, _ICA_POOL_GENERATION),
+        )
+        _ICA_POOL_WORKERS = int(workers)
+    return _ICA_POOL
+
+
+@contextmanager
+def _shared_ica_input(X: np.ndarray, candidate: str) -> Iterator[str]:
+    """候補1つ分の試行のあいだだけ、X を worker が memmap で読む .npy として置く。"""
+    path = os.path.join(_ICA_POOL_DIR.name, f"{candidate}.npy")
+    np.save(path, X)
+    try:
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            # 取り消し後も実行中の fit が開いている場合（Windows）は shutdown_ica_pool() で消す。
+            pass
+
+
+def _cancel_ica_attempts(pending: Dict[int, Any]) -> None:
+    """採否が決まった後の先行 fit を取り消す。
+
+    待機中の future は cancel し、worker へ渡済みのものは世代を進めて fit 前に返させる。
+    実行中の fit は最後まで走るが、結果は読まずに捨てる。
+    """
+    with _ICA_POOL_GENERATION.get_lock():
+        _ICA_POOL_GENERATION.value += 1
+    for future in pending.values():
+        future.cancel()
+    pending.clear()
+
+
+def shutdown_ica_pool() -> None:
+    """ICA retry 用プロセスプールと一時ディレクトリを片付ける。未起動なら何もしない。"""
+    global _ICA_POOL, _ICA_POOL_WORKERS, _ICA_POOL_GENERATION, _ICA_POOL_DIR
+    if _ICA_POOL is not None:
+        with _ICA_POOL_GENERATION.get_lock():
+            _ICA_POOL_GENERATION.value += 1
+        _ICA_POOL.shutdown(wait=True, cancel_futures=True)
+    if _ICA_POOL_DIR is not None:
+        _ICA_POOL_DIR.cleanup()
+    _ICA_POOL = None
+    _ICA_POOL_WORKERS = 0
+    _ICA_POOL_GENERATION = None
+    _ICA_POOL_DIR = None
+
+
 def _fit_ica_with_retries(
     X: np.ndarray,
     n_components: int,
     random_state: int,
     stage_name: str,
     ica_retry_config: Optional[IcaRetryConfig] = None,
+    whitening: Optional[PcaWhitening] = None,
 ) -> Dict[str, Any]:
+    """components × algorithms × (max_iter, tol) × seeds の順に、最初に収束した ICA を返す。
+
+    whitening（X の PcaWhitening）を渡すと各試行は白色化を省き、fixed-point 反復だけを行う。
+
+    parallel_workers >= 2 のときは、最初の試行が失敗した時点で run 共有のプロセスプール
+    （_get_ica_pool）へ後続の候補を先行して投入し、採用が決まったら残りを取り消す。
+    採否は常にグリッド順に確定させるため、attempts / retry_count の数え方は逐次実行と同じ。
+    ただし worker は BLAS スレッド数が異なり浮動小数点の丸めが変わるため、独立成分は
+    許容誤差内での一致になり、収束判定が際どい候補では採否が変わることもある。
+    """
     retry_cfg = ica_retry_config or DEFAULT_ICA_RETRY
     min_components = 2
     start_components = max(min_components, int(n_components))
@@ -720,84 +2201,206 @@ def _fit_ica_with_retries(
     algo_candidates = list(retry_cfg.algorithms)
     config_candidates = list(retry_cfg.configs)
 
-    last_error: Optional[BaseException] = None
-    attempts = 0
+    grid: List[Tuple[int, str, int, float, int]] = []
     seen = set()
-    started = time.monotonic()
-
     for comps in component_candidates:
         for algo in algo_candidates:
             for max_iter, tol in config_candidates:
                 for seed in seed_candidates:
-                    if retry_cfg.max_attempts and attempts >= retry_cfg.max_attempts:
-                        raise RuntimeError(f"{stage_name} retry上限に到達しました: attempts={attempts}")
-                    if retry_cfg.max_seconds and (time.monotonic() - started) >= retry_cfg.max_seconds:
-                        raise RuntimeError(f"{stage_name} retry時間上限に到達しました: seconds={retry_cfg.max_seconds:g}, attempts={attempts}")
                     key = (comps, algo, max_iter, tol, seed)
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    attempts += 1
-                    ica = _fastica_safe(comps, seed, algorithm=algo, max_iter=max_iter, tol=tol)
-                    try:
-                        with warnings.catch_warnings(record=True) as captured:
-                            warnings.simplefilter("always", ConvergenceWarning)
-                            S = ica.fit_transform(X)
-                        warned = any(issubclass(w.category, ConvergenceWarning) for w in captured)
-                        finite_ok = np.isfinite(S).all() and np.isfinite(getattr(ica, "components_", np.array([]))).all()
-                        if warned or (not finite_ok):
-                            why = "convergence warning" if warned else "non-finite values"
-                            last_error = RuntimeError(f"{stage_name} {why}")
-                            log.debug(
-                                "%s retry: n_components=%d algo=%s max_iter=%d tol=%g seed=%d reason=%s",
-                                stage_name, comps, algo, max_iter, tol, seed, why,
-                            )
-                            continue
-                        return {
-                            "ica": ica,
-                            "S": S.astype(np.float32),
-                            "n_components": int(comps),
-                            "status": "converged",
-                            "retry_count": int(attempts - 1),
-                            "attempts": int(attempts),
-                            "algo": str(algo),
-                            "max_iter": int(max_iter),
-                            "tol": float(tol),
-                            "seed": int(seed),
-                            "retry_policy": {
-                                "max_attempts": int(retry_cfg.max_attempts),
-                                "max_seconds": float(retry_cfg.max_seconds),
-                                "max_dim_candidates": int(retry_cfg.max_dim_candidates),
-                                "allow_dim_fallback": bool(retry_cfg.allow_dim_fallback),
-                            },
-                        }
-                    except (ValueError, RuntimeError, FloatingPointError, LinAlgError) as e:
-                        last_error = e
-                        log.debug(
-                            "%s fit retry: n_components=%d algo=%s max_iter=%d tol=%g seed=%d err=%s",
-                            stage_name, comps, algo, max_iter, tol, seed, e,
+                    if key not in seen:
+                        seen.add(key)
+                        grid.append(key)
+    # max_attempts を超える候補は逐次実行でも試さないため、先行 fit もしない。
+    limit = min(len(grid), retry_cfg.max_attempts) if retry_cfg.max_attempts else len(grid)
+    workers = max(1, int(retry_cfg.parallel_workers))
+
+    last_error: Optional[BaseException] = None
+    attempts = 0
+    started = time.monotonic()
+    pool = None
+    path = ""
+    generation = 0
+    pending: Dict[int, Any] = {}
+    next_submit = 0
+    # 採否が決まったら先に残りの先行 fit を取り消し、その後で共有入力を消す。
+    with ExitStack() as shared_inputs:
+        try:
+            for idx, (comps, algo, max_iter, tol, seed) in enumerate(grid):
+                if retry_cfg.max_attempts and attempts >= retry_cfg.max_attempts:
+                    raise RuntimeError(f"{stage_name} retry上限に到達しました: attempts={attempts}")
+                if retry_cfg.max_seconds and (time.monotonic() - started) >= retry_cfg.max_seconds:
+                    raise RuntimeError(f"{stage_name} retry時間上限に到達しました: seconds={retry_cfg.max_seconds:g}, attempts={attempts}")
+                if pool is None:
+                    ica, S, error = _try_fit_ica(X, comps, algo, max_iter, tol, seed, stage_name, whitening)
+                else:
+                    while next_submit < limit and len(pending) < workers:
+                        pending[next_submit] = pool.submit(
+                            _ica_pool_attempt, path, grid[next_submit], stage_name, whitening, generation,
                         )
-                        continue
+                        next_submit += 1
+                    ica, S, error = pending.pop(idx).result()
+                attempts += 1
+                if ica is not None:
+                    return {
+                        "ica": ica,
+                        "S": S.astype(np.float32),
+                        "n_components": int(comps),
+                        "status": "converged",
+                        "retry_count": int(attempts - 1),
+                        "attempts": int(attempts),
+                        "algo": str(algo),
+                        "max_iter": int(max_iter),
+                        "tol": float(tol),
+                        "seed": int(seed),
+                        "retry_policy": {
+                            "max_attempts": int(retry_cfg.max_attempts),
+                            "max_seconds": float(retry_cfg.max_seconds),
+                            "max_dim_candidates": int(retry_cfg.max_dim_candidates),
+                            "allow_dim_fallback": bool(retry_cfg.allow_dim_fallback),
+                        },
+                    }
+                last_error = error
+                log.debug(
+                    "%s retry: n_components=%d algo=%s max_iter=%d tol=%g seed=%d reason=%s",
+                    stage_name, comps, algo, max_iter, tol, seed, error,
+                )
+                if pool is None and workers > 1 and idx + 1 < limit:
+                    pool = _get_ica_pool(workers)
+                    generation = int(_ICA_POOL_GENERATION.value)
+                    path = shared_inputs.enter_context(
+                        _shared_ica_input(X, f"ica_p{X.shape[1]}_d{start_components}_rs{int(random_state)}_g{generation}")
+                    )
+                    log.info("%s: ICA retry を %d プロセスで先行実行します", stage_name, workers)
+                    next_submit = idx + 1
+        finally:
+            if pending:
+                _cancel_ica_attempts(pending)
     raise RuntimeError(f"{stage_name} の学習に失敗しました: {last_error}")
 
 
+def _pca_batch_spans(n_rows: int, batch_rows: int, min_rows: int) -> List[Tuple[int, int]]:
+    """partial_fit 用の行範囲。IncrementalPCA は1回に n_components 行以上を要するため、
+    短い末尾は直前の範囲へつなげる。"""
+    step = max(int(batch_rows), int(min_rows))
+    spans = [(start, min(start + step, n_rows)) for start in range(0, n_rows, step)]
+    if len(spans) > 1 and spans[-1][1] - spans[-1][0] < min_rows:
+        spans[-2] = (spans[-2][0], n_rows)
+        spans.pop()
+    return spans
+
+
+def _fit_incremental_pca(
+    X: np.ndarray,
+    max_pcs: int,
+    batch_rows: int,
+) -> Tuple[StandardScaler, IncrementalPCA]:
+    """X を batch_rows 行ずつ読み、scaler と IncrementalPCA を partial_fit する。
+
+    X は np.memmap でもよく、標準化済みの全件行列は作らない。
+    """
+    spans = _pca_batch_spans(X.shape[0], batch_rows, max_pcs)
+    scaler = StandardScaler()
+    for start, stop in spans:
+        scaler.partial_fit(X[start:stop])
+    pca = IncrementalPCA(n_components=max_pcs)
+    for start, stop in spans:
+        pca.partial_fit(scaler.transform(X[start:stop]))
+    log.debug("incremental PCA: %d 行を %d chunk で学習", X.shape[0], len(spans))
+    return scaler, pca
+
+
+def _project_pca_in_batches(
+    X: np.ndarray,
+    scaler: StandardScaler,
+    pca: Any,
+    n_pcs: int,
+    batch_rows: int,
+) -> np.ndarray:
+    """先頭 n_pcs 成分の PCA 座標だけを chunk ごとに計算する。"""
+    components = np.asarray(pca.components_[:n_pcs], dtype=np.float64).T
+    Xp = np.empty((X.shape[0], int(n_pcs)), dtype=np.float32)
+    for start, stop in _pca_batch_spans(X.shape[0], batch_rows, 1):
+        Xp[start:stop] = (scaler.transform(X[start:stop]) - pca.mean_) @ components
+    return Xp
+
+
+def _pca_seed_key(random_state: int, config: PcaConfig) -> Optional[int]:
+    """random_state が分解結果を変えるのは randomized だけなので、他は seed 間で共有する。"""
+    return int(random_state) if config.solver == "randomized" else None
+
+
+def get_pca_fit(
+    X: np.ndarray,
+    pca_var: float,
+    random_state: int,
+    cache: Dict[Any, Any],
+    pca_config: Optional[PcaConfig] = None,
+) -> Dict[str, Any]:
+    """scaler と PCA 分解を学習して cache する。pca_var は切り詰め位置にしか効かないため key に含めない。
+
+    full / incremental は solver ごとに1回だけ分解する。randomized は成分数を
+    initial_components, 2倍, 4倍 ... と固定の段で増やし、各段を1回だけ分解して cache する。
+    sklearn の randomized solver は explained_variance_ratio_ を全分散で割るため、途中の段でも
+    累積寄与率を判定でき、pca_var に最初に届いた段（max_pcs に届けば完全分解）を返す。
+    どの pca_var を先に求めても、同じ pca_var には同じ分解が対応する。
+    """
+    pca_cfg = pca_config or DEFAULT_PCA_CONFIG
+    seed_key = _pca_seed_key(random_state, pca_cfg)
+    max_pcs = max(2, min(X.shape[0] - 1, X.shape[1]))
+    if pca_cfg.solver != "randomized":
+        key = ("pca_fit", seed_key, pca_config_cache_key(pca_cfg))
+        if key not in cache:
+            if pca_cfg.solver == "incremental":
+                scaler, pca = _fit_incremental_pca(X, max_pcs, pca_cfg.batch_rows)
+            else:
+                scaler = StandardScaler()
+                pca = PCA(n_components=max_pcs, random_state=random_state).fit(scaler.fit_transform(X))
+            cache[key] = {"scaler": scaler, "pca": pca}
+        return cache[key]
+
+    Xs: Optional[np.ndarray] = None
+    n_comp = max(2, int(pca_cfg.initial_components))
+    while True:
+        n_comp = min(n_comp, max_pcs)
+        key = ("pca_fit", seed_key, pca_config_cache_key(pca_cfg), n_comp)
+        fit = cache.get(key)
+        if fit is None:
+            if Xs is None:
+                scaler = StandardScaler()
+                Xs = scaler.fit_transform(X)
+            if n_comp >= max_pcs:
+                pca = PCA(n_components=max_pcs, random_state=random_state).fit(Xs)
+            else:
+                pca = PCA(n_components=n_comp, svd_solver="randomized", random_state=random_state).fit(Xs)
+            fit = {"scaler": scaler, "pca": pca}
+            cache[key] = fit
+        reached = float(np.sum(fit["pca"].explained_variance_ratio_))
+        if n_comp >= max_pcs or reached >= pca_var:
+            log.debug("randomized PCA: %d 成分で累積寄与率 %.4f", n_comp, reached)
+            return fit
+        log.debug("randomized PCA: %d 成分では累積寄与率 %.4f < %.4f のため拡張", n_comp, reached, pca_var)
+        n_comp *= 2
+
+
 def get_pca_base(
     X: np.ndarray,
     pca_var: float,
     random_state: int,
     cache: Dict[Any, Any],
+    pca_config: Optional[PcaConfig] = None,
 ) -> Dict[str, Any]:
-    key = ("pca_base", round(float(pca_var), 6), int(random_state))
+    pca_cfg = pca_config or DEFAULT_PCA_CONFIG
+    key = ("pca_base", round(float(pca_var), 6), _pca_seed_key(random_state, pca_cfg), pca_config_cache_key(pca_cfg))
     if key in cache:
         return cache[key]
 
-    scaler = StandardScaler()
-    Xs = scaler.fit_transform(X)
-    max_pcs = max(2, min(Xs.shape[0] - 1, Xs.shape[1]))
-    pca = PCA(n_components=max_pcs, random_state=random_state)
-    Xp = pca.fit_transform(Xs)
+    # 分解は pca_var をまたいで共有し、ここでは切り詰め位置と座標だけを求める。
+    fit = get_pca_fit(X, pca_var, random_state, cache, pca_cfg)
+    scaler, pca = fit["scaler"], fit["pca"]
     n_pcs = int(np.searchsorted(np.cumsum(pca.explained_variance_ratio_), pca_var) + 1)
-    n_pcs = max(2, min(n_pcs, Xp.shape[1]))
+    n_pcs = max(2, min(n_pcs, len(pca.explained_variance_ratio_)))
+    Xp = _project_pca_in_batches(X, scaler, pca, n_pcs, pca_cfg.batch_rows)
     pca_bundle_base = dict(
         scaler_mean=np.asarray(scaler.mean_, dtype=np.float32),
         scaler_scale=np.asarray(scaler.scale_, dtype=np.float32),
@@ -807,7 +2410,7 @@ def get_pca_base(
         embed_dim=int(X.shape[1]),
     )
     out = {
-        "Xp": Xp[:, :n_pcs].astype(np.float32),
+        "Xp": Xp,
         "n_pcs": int(n_pcs),
         "pca_bundle_base": pca_bundle_base,
         "explained_variance_ratio": np.asarray(pca.explained_variance_ratio_, dtype=np.float32),
@@ -823,19 +2426,33 @@ def get_stage1_result(
     random_state: int,
     cache: Dict[Any, Any],
     ica_retry_config: Optional[IcaRetryConfig] = None,
+    pca_config: Optional[PcaConfig] = None,
 ) -> Dict[str, Any]:
-    key = ("stage1", round(float(pca_var), 6), int(ica1_dim), int(random_state), ica_retry_cache_key(ica_retry_config or DEFAULT_ICA_RETRY))
+    key = (
+        "stage1", round(float(pca_var), 6), int(ica1_dim), int(random_state),
+        ica_retry_cache_key(ica_retry_config or DEFAULT_ICA_RETRY),
+        pca_config_cache_key(pca_config or DEFAULT_PCA_CONFIG),
+    )
     if key in cache:
         return cache[key]
 
-    pca_base = get_pca_base(X, pca_var=pca_var, random_state=random_state, cache=cache)
+    pca_base = get_pca_base(X, pca_var=pca_var, random_state=random_state, cache=cache, pca_config=pca_config)
     Xp = pca_base["Xp"]
     n_pcs = int(pca_base["n_pcs"])
     pca_bundle_base = pca_base["pca_bundle_base"]
 
     d1 = max(2, min(int(ica1_dim), n_pcs))
+    whitening = None
+    if (ica_retry_config or DEFAULT_ICA_RETRY).shared_whitening:
+        # 白色化は pca_base ごとに1回だけ作り、次元・seed・retry をまたいで共有する。
+        if "whitening" not in pca_base:
+            pca_base["whitening"] = PcaWhitening.from_scores(Xp)
+        whitening = pca_base["whitening"]
+    ica1_whitening = "pca_shared" if whitening is not None else "fastica"
     try:
-        ica1_res = _fit_ica_with_retries(Xp, d1, random_state, "ICA①", ica_retry_config)
+        ica1_res = _fit_ica_with_retries(
+            Xp, d1, random_state, "ICA①", ica_retry_config, whitening=whitening,
+        )
         ica1 = ica1_res["ica"]
         Xi1 = ica1_res["S"]
         d1 = int(ica1_res["n_components"])
@@ -854,6 +2471,7 @@ def get_stage1_result(
             "ica1_max_iter": int(ica1_res.get("max_iter", 0)),
             "ica1_tol": float(ica1_res.get("tol", 0.0)),
             "ica1_seed": int(ica1_res.get("seed", random_state)),
+            "ica1_whitening": ica1_whitening,
             "ica1_error": None,
         }
     except RuntimeError as e1:
@@ -872,6 +2490,7 @@ def get_stage1_result(
             "ica1_max_iter": 0,
             "ica1_tol": 0.0,
             "ica1_seed": int(random_state),
+            "ica1_whitening": ica1_whitening,
             "ica1_error": str(e1),
         }
     cache[key] = out
@@ -950,7 +2569,8 @@ def fit_transforms(
     k: int,
     random_state: int,
     cache: Optional[Dict[Any, Any]] = None,
-    ica_retry_config: Optional[IcaRetryConfig] = None
+    ica_retry_config: Optional[IcaRetryConfig] = None,
+    pca_config: Optional[PcaConfig] = None,
 ) -> Tuple[TransformBundle, np.ndarray, Dict[str, Any]]:
     """PVM変換をfitし、最終クラスタリング用の Xfinal を返す。
 
@@ -975,6 +2595,7 @@ def fit_transforms(
         random_state=random_state,
         cache=cache,
         ica_retry_config=ica_retry_config,
+        pca_config=pca_config,
     )
     pca_bundle_base = stage1["pca_bundle_base"]
     n_pcs = int(stage1["n_pcs"])
@@ -1028,6 +2649,7 @@ def fit_transforms(
                     "max_iter": int(stage1.get("ica1_max_iter", 0)),
                     "tol": float(stage1.get("ica1_tol", 0.0)),
                     "seed": int(stage1.get("ica1_seed", random_state)),
+                    "whitening": str(stage1.get("ica1_whitening", "fastica")),
                 },
                 "ica2_setup": {
                     "method": "between_class_projection",
@@ -1071,6 +2693,7 @@ def fit_transforms(
                     "max_iter": int(stage1.get("ica1_max_iter", 0)),
                     "tol": float(stage1.get("ica1_tol", 0.0)),
                     "seed": int(stage1.get("ica1_seed", random_state)),
+                    "whitening": str(stage1.get("ica1_whitening", "fastica")),
                 },
                 "ica2_setup": None,
                 "fallback_reason": str(e2),
@@ -1110,27 +2733,63 @@ def fit_transforms(
     return bundle, Xfinal, info
 
 
-def apply_transforms(X: np.ndarray, bundle: TransformBundle) -> np.ndarray:
-    if X.shape[1] != bundle.embed_dim:
-        raise ValueError("埋め込み次元が baseline と不一致です。embedding model や前処理を確認してください。")
-    safe_scale = np.where(bundle.scaler_scale == 0.0, 1.0, bundle.scaler_scale)
-    Xs = (X - bundle.scaler_mean) / safe_scale
-    Xp_full = (Xs - bundle.pca_mean) @ bundle.pca_components.T
-    Xp = Xp_full[:, : bundle.pca_n_components]
+def _compose_affine_steps(bundle: TransformBundle) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Compose scaler → PCA → ICA① → CP into affine maps (float64).
+
+    Returns (W_final, b_final, W_pre, b_pre) such that the stepwise transform
+    equals X @ W + b. The pre-projection map is returned before L2 norm.
+    """
+    safe_scale = np.where(bundle.scaler_scale == 0.0, 1.0, bundle.scaler_scale).astype(np.float64)
+    P = np.asarray(bundle.pca_components, dtype=np.float64)[: bundle.pca_n_components]
+    W_pca = P.T / safe_scale[:, None]
+    b_pca = -(np.asarray(bundle.scaler_mean, dtype=np.float64) / safe_scale + np.asarray(bundle.pca_mean, dtype=np.float64)) @ P.T
+
+    W_ica1 = b_ica1 = None
+    if bundle.transform_mode in {"full_original_pvm", "ica1_only_pvm"}:
+        I1 = np.asarray(bundle.ica1_components, dtype=np.float64)
+        W_ica1 = W_pca @ I1.T
+        b_ica1 = (b_pca - np.asarray(bundle.ica1_mean, dtype=np.float64)) @ I1.T
 
     if bundle.transform_mode == "full_original_pvm":
-        Xi1 = (Xp - bundle.ica1_mean) @ bundle.ica1_components.T
-        Xi2 = (Xi1 - bundle.ica2_mean) @ bundle.ica2_components.T
-        return Xi2[:, : bundle.final_n_components].astype(np.float32)
+        I2 = np.asarray(bundle.ica2_components, dtype=np.float64)
+        W_final = W_ica1 @ I2.T
+        b_final = (b_ica1 - np.asarray(bundle.ica2_mean, dtype=np.float64)) @ I2.T
+    elif bundle.transform_mode == "ica1_only_pvm":
+        W_final, b_final = W_ica1, b_ica1
+    elif bundle.transform_mode == "pca_pvm":
+        W_final, b_final = W_pca, b_pca
+    else:
+        raise ValueError(f"未知の transform_mode です: {bundle.transform_mode}")
+    W_final = W_final[:, : bundle.final_n_components]
+    b_final = b_final[: bundle.final_n_components]
+
+    if W_ica1 is not None and bundle.ica1_n_components > 0:
+        W_pre = W_ica1[:, : bundle.ica1_n_components]
+        b_pre = b_ica1[: bundle.ica1_n_components]
+    else:
+        W_pre, b_pre = W_final, b_final
+    return W_final, b_final, W_pre, b_pre
+
 
-    if bundle.transform_mode == "ica1_only_pvm":
-        Xi1 = (Xp - bundle.ica1_mean) @ bundle.ica1_components.T
-        return Xi1[:, : bundle.final_n_components].astype(np.float32)
+def fuse_transform_bundle(bundle: TransformBundle) -> TransformBundle:
+    """Fill the fused affine fields of ``bundle`` (in place) if missing."""
+    if bundle.fused_weight is None or bundle.fused_pre_weight is None:
+        W_final, b_final, W_pre, b_pre = _compose_affine_steps(bundle)
+        bundle.fused_weight = np.ascontiguousarray(W_final, dtype=np.float32)
+        bundle.fused_bias = np.asarray(b_final, dtype=np.float32)
+        bundle.fused_pre_weight = np.ascontiguousarray(W_pre, dtype=np.float32)
+        bundle.fused_pre_bias = np.asarray(b_pre, dtype=np.float32)
+    return bundle
 
-    if bundle.transform_mode == "pca_pvm":
-        return Xp[:, : bundle.final_n_components].astype(np.float32)
 
-    raise ValueError(f"未知の transform_mode です: {bundle.transform_mode}")
+def apply_transforms(X: np.ndarray, bundle: TransformBundle) -> np.ndarray:
+    """Project embeddings into the final (CP) space with one fused GEMM."""
+    if X.shape[1] != bundle.embed_dim:
+        raise ValueError("埋め込み次元が baseline と不一致です。embedding model や前処理を確認してください。")
+    fuse_transform_bundle(bundle)
+    Xf = np.asarray(X, dtype=np.float32) @ bundle.fused_weight
+    Xf += bundle.fused_bias
+    return Xf
 
 
 def apply_pre_projection_space(X: np.ndarray, bundle: TransformBundle) -> np.ndarray:
@@ -1142,19 +2801,29 @@ def apply_pre_projection_space(X: np.ndarray, bundle: TransformBundle) -> np.nda
     """
     if X.shape[1] != bundle.embed_dim:
         raise ValueError("埋め込み次元が baseline と不一致です。embedding model や前処理を確認してください。")
-    safe_scale = np.where(bundle.scaler_scale == 0.0, 1.0, bundle.scaler_scale)
-    Xs = (X - bundle.scaler_mean) / safe_scale
-    Xp_full = (Xs - bundle.pca_mean) @ bundle.pca_components.T
-    Xp = Xp_full[:, : bundle.pca_n_components]
+    fuse_transform_bundle(bundle)
+    Xpre = np.asarray(X, dtype=np.float32) @ bundle.fused_pre_weight
+    Xpre += bundle.fused_pre_bias
+    return l2_normalize(Xpre).astype(np.float32)
 
-    if bundle.transform_mode in {"full_original_pvm", "ica1_only_pvm"} and bundle.ica1_n_components > 0:
-        Xi1 = (Xp - bundle.ica1_mean) @ bundle.ica1_components.T
-        return l2_normalize(Xi1[:, : bundle.ica1_n_components]).astype(np.float32)
 
-    if bundle.transform_mode == "pca_pvm":
-        return l2_normalize(Xp[:, : bundle.final_n_components]).astype(np.float32)
+def apply_transform_spaces(X: np.ndarray, bundle: TransformBundle) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (final CP space, normalized ICA① gate space) from one pass.
 
-    return l2_normalize(apply_transforms(X, bundle)).astype(np.float32)
+    Equivalent to calling apply_transforms and apply_pre_projection_space on
+    the same X, but both fused maps share a single GEMM over X.
+    """
+    if X.shape[1] != bundle.embed_dim:
+        raise ValueError("埋め込み次元が baseline と不一致です。embedding model や前処理を確認してください。")
+    fuse_transform_bundle(bundle)
+    n_final = bundle.fused_weight.shape[1]
+    W = np.concatenate([bundle.fused_weight, bundle.fused_pre_weight], axis=1)
+    b = np.concatenate([bundle.fused_bias, bundle.fused_pre_bias])
+    Z = np.asarray(X, dtype=np.float32) @ W
+    Z += b
+    Xfinal = np.ascontiguousarray(Z[:, :n_final])
+    Xpre = l2_normalize(Z[:, n_final:]).astype(np.float32)
+    return Xfinal, Xpre
 
 
 def centroids_from_labels(Xn: np.ndarray, labels: np.ndarray, k: int) -> np.ndarray:
@@ -1661,6 +3330,7 @@ def get_pipeline_result(
     cache: Dict[Any, Any],
     ica_retry_config: Optional[IcaRetryConfig] = None,
     keep_arrays: bool = True,
+    pca_config: Optional[PcaConfig] = None,
 ) -> Dict[str, Any]:
     """変換+クラスタリングの結果を返す。
 
@@ -1675,6 +3345,7 @@ def get_pipeline_result(
         int(k),
         int(random_state),
         ica_retry_cache_key(ica_retry_config or DEFAULT_ICA_RETRY),
+        pca_config_cache_key(pca_config or DEFAULT_PCA_CONFIG),
     )
     if key in cache:
         return cache[key]
@@ -1690,6 +3361,7 @@ def get_pipeline_result(
         random_state=random_state,
         cache=cache,
         ica_retry_config=ica_retry_config,
+        pca_config=pca_config,
     )
     cluster = spherical_kmeans(Xfinal, k=k, random_state=random_state)
 
@@ -1741,6 +3413,7 @@ def candidate_stability(
     base_seed: int,
     cache: Dict[Any, Any],
     ica_retry_config: Optional[IcaRetryConfig] = None,
+    pca_config: Optional[PcaConfig] = None,
 ) -> float:
     label_runs = []
     for seed in seed_triplet(base_seed):
@@ -1755,6 +3428,7 @@ def candidate_stability(
             cache=cache,
             ica_retry_config=ica_retry_config,
             keep_arrays=False,
+            pca_config=pca_config,
         )
         label_runs.append(res["labels"])
     aris = []
@@ -1784,6 +3458,7 @@ def _degraded_fallback_candidates(
     retry_config: IcaRetryConfig,
     search_budget: str,
     reason: str,
+    pca_config: Optional[PcaConfig] = None,
 ) -> List[CandidateResult]:
     """Build an explicitly degraded last-resort tier.
 
@@ -1797,7 +3472,7 @@ def _degraded_fallback_candidates(
         try:
             res = get_pipeline_result(
                 X, pca_var, requested, k, random_state, cache,
-                ica_retry_config=retry_config,
+                ica_retry_config=retry_config, pca_config=pca_config,
             )
         except Exception as exc:
             log.warning("degraded fallback候補 d=%d k=%d も失敗: %s", requested, k, exc)
@@ -1850,6 +3525,7 @@ def explore_candidates(
     cache: Dict[Any, Any],
     ica_retry_config: Optional[IcaRetryConfig] = None,
     search_config: Optional[AdaptiveSearchConfig] = None,
+    pca_config: Optional[PcaConfig] = None,
 ) -> List[CandidateResult]:
     """Discover canonical ICA dimensions, then validate finalists exactly.
 
@@ -1869,7 +3545,7 @@ def explore_candidates(
             f"候補探索の件数が不足しています。"
             f"k_min={k_lo} では最低 {k_lo + 1} 件必要です（現在 {n} 件）。"
         )
-    pca_base = get_pca_base(X, pca_var=pca_var, random_state=random_state, cache=cache)
+    pca_base = get_pca_base(X, pca_var=pca_var, random_state=random_state, cache=cache, pca_config=pca_config)
     X_eval = l2_normalize(pca_base["Xp"])
     dims = propose_ica1_dims_from_pca_base(pca_base, pca_var, cfg.dim_candidates)
     bounded_retry = _search_retry_config(ica_retry_config, cfg, exact=False)
@@ -1882,7 +3558,7 @@ def explore_candidates(
         for requested in requested_dims:
             discovered = get_stage1_result(
                 X, pca_var, int(requested), random_state, cache,
-                ica_retry_config=bounded_retry,
+                ica_retry_config=bounded_retry, pca_config=pca_config,
             )
             if not discovered["ica1_success"]:
                 continue
@@ -1892,7 +3568,7 @@ def explore_candidates(
                 continue
             canonical = get_stage1_result(
                 X, pca_var, effective, random_state, cache,
-                ica_retry_config=exact_cfg,
+                ica_retry_config=exact_cfg, pca_config=pca_config,
             )
             if not canonical["ica1_success"] or int(canonical["d1"]) != effective:
                 continue
@@ -1918,7 +3594,7 @@ def explore_candidates(
         log.warning("%s。結果はdegradedとして明示します。", reason)
         fallback_rows = _degraded_fallback_candidates(
             X, X_eval, dims, k_lo, k_hi, pca_var, random_state, cache,
-            bounded_retry, cfg.name, reason,
+            bounded_retry, cfg.name, reason, pca_config=pca_config,
         )
         if fallback_rows:
             return fallback_rows
@@ -1990,12 +3666,12 @@ def explore_candidates(
         failed: Dict[str, str] = {}
         for offset in cfg.seed_offsets:
             seed = int(random_state + offset)
-            stage1 = get_stage1_result(X, pca_var, d, seed, cache, exact_cfg)
+            stage1 = get_stage1_result(X, pca_var, d, seed, cache, exact_cfg, pca_config=pca_config)
             if not stage1["ica1_success"] or int(stage1["d1"]) != d:
                 failed[str(seed)] = str(stage1.get("ica1_error") or "exact dimension mismatch")
                 continue
             cluster1 = spherical_kmeans(stage1["Xi1"], k=k, random_state=seed)
-            res = get_pipeline_result(X, pca_var, d, k, seed, cache, exact_cfg)
+            res = get_pipeline_result(X, pca_var, d, k, seed, cache, exact_cfg, pca_config=pca_config)
             if (
                 res["transform_mode"] != "full_original_pvm"
                 or int(res["bundle"].ica1_n_components) != d
@@ -2032,7 +3708,7 @@ def explore_candidates(
             Xs = np.array(X[idx], dtype=np.float32, copy=True)
             for col in range(Xs.shape[1]):
                 Xs[:, col] = Xs[rng.permutation(len(Xs)), col]
-            null_stage = get_stage1_result(Xs, pca_var, d, random_state + 900 + rep, {}, exact_cfg)
+            null_stage = get_stage1_result(Xs, pca_var, d, random_state + 900 + rep, {}, exact_cfg, pca_config=pca_config)
             if null_stage["ica1_success"] and int(null_stage["d1"]) == d:
                 shuffled_axes.append(np.asarray(null_stage["Xi1"], dtype=np.float32))
         repeated_axes = [
@@ -2101,7 +3777,7 @@ def explore_candidates(
         log.warning("%s。結果はdegradedとして明示します。", reason)
         results = _degraded_fallback_candidates(
             X, X_eval, dims, k_lo, k_hi, pca_var, random_state, cache,
-            bounded_retry, cfg.name, reason,
+            bounded_retry, cfg.name, reason, pca_config=pca_config,
         )
         if not results:
             raise RuntimeError("exact canonical検証とdegraded fallbackの両方で候補が見つかりませんでした。")
@@ -2233,6 +3909,12 @@ def _bundle_to_arrays(bundle: TransformBundle, centroids: np.ndarray, ica1_centr
         "fallback_level": np.asarray([bundle.fallback_level], dtype=np.int32),
         "centroids": np.asarray(centroids, dtype=np.float32),
     }
+    # lock 時に 1 回の GEMM で射影できるよう、合成済みアフィン変換も保存する。
+    fuse_transform_bundle(bundle)
+    arrays["fused_weight"] = bundle.fused_weight
+    arrays["fused_bias"] = bundle.fused_bias
+    arrays["fused_pre_weight"] = bundle.fused_pre_weight
+    arrays["fused_pre_bias"] = bundle.fused_pre_bias
     if ica1_centroids is None:
         arrays["ica1_centroids"] = np.zeros((0, 0), dtype=np.float32)
     else:
@@ -2266,6 +3948,13 @@ def _bundle_from_npz(path: Path) -> Tuple[TransformBundle, np.ndarray, Optional[
             final_n_components=int(_npz_scalar(data, "final_n_components", _npz_scalar(data, "ica2_n_components"))),
             fallback_level=int(_npz_scalar(data, "fallback_level", 0)),
         )
+        if all(key in data for key in ("fused_weight", "fused_bias", "fused_pre_weight", "fused_pre_bias")):
+            bundle.fused_weight = np.asarray(data["fused_weight"], dtype=np.float32)
+            bundle.fused_bias = np.asarray(data["fused_bias"], dtype=np.float32)
+            bundle.fused_pre_weight = np.asarray(data["fused_pre_weight"], dtype=np.float32)
+            bundle.fused_pre_bias = np.asarray(data["fused_pre_bias"], dtype=np.float32)
+        # 旧 baseline (合成行列なし) はここで合成する。
+        fuse_transform_bundle(bundle)
         centroids = l2_normalize(np.asarray(data["centroids"], dtype=np.float32))
         ica1_centroids = None
         if "ica1_centroids" in data:
@@ -2369,6 +4058,89 @@ def next_run_dir(result_root: Path, project: str) -> Path:
         idx += 1
 
 
+def file_sha256(path: Path, block_bytes: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_bytes), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_digest(path: Path, full: bool = True) -> str:
+    """実行指紋に入れるファイルの同一性。full=False ならサイズと更新時刻だけで、本体を読まない。"""
+    if full:
+        return f"sha256:{file_sha256(path)}"
+    st = Path(path).stat()
+    return f"stat:{st.st_size}:{st.st_mtime_ns}"
+
+
+def build_run_fingerprint(
+    input_digest: str,
+    args: argparse.Namespace,
+    embedding_prefix: str,
+    baseline_ref: Optional[str],
+    embeddings_digest: Optional[str] = None,
+) -> Dict[str, Any]:
+    """入力内容・結果に効く CLI 引数・使用 baseline 版から、実行の同一性を表す指紋を作る。"""
+    settings = {name: getattr(args, name, None) for name in RUN_FINGERPRINT_ARGS}
+    settings["embedding_prefix"] = embedding_prefix
+    payload = {
+        "input_digest": input_digest,
+        "embeddings_digest": embeddings_digest,
+        "settings": settings,
+        "baseline": baseline_ref,
+        "script_version": SCRIPT_VERSION,
+    }
+    blob = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    return {
+        "run_fingerprint": hashlib.sha256(blob).hexdigest(),
+        "input_digest": input_digest,
+        "baseline": baseline_ref,
+    }
+
+
+def score_file_record(run_dir: Path, output_format: str, rows: int) -> Dict[str, Any]:
+    """結果レポートに残す結果スコアの記録。再利用時にファイルが書き切られているかの確認に使う。"""
+    path = run_score_path(run_dir, output_format)
+    return {"name": path.name, "rows": int(rows), "bytes": int(path.stat().st_size)}
+
+
+def find_identical_run(result_root: Path, project: str, fingerprint: str, output_format: str = "csv") -> Optional[Path]:
+    """同じ指紋を記録し、結果スコアが記録どおり書き切られている run ディレクトリを新しい順に探す。"""
+    prefix = f"run_{project}_"
+    runs = [d for d in result_root.glob(f"{prefix}*") if d.name[len(prefix):].isdigit()]
+    for run_dir in sorted(runs, key=lambda d: int(d.name[len(prefix):]), reverse=True):
+        report_path = run_dir / "結果レポート.json"
+        score_path = run_score_path(run_dir, output_format)
+        if not report_path.exists() or not score_path.exists():
+            continue
+        try:
+            with open(report_path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if (report.get("run_fingerprint") or {}).get("run_fingerprint") != fingerprint:
+            continue
+        record = report.get("score_file") or {}
+        if record.get("name") != score_path.name or record.get("bytes") != score_path.stat().st_size:
+            log.warning("指紋は一致しましたが結果スコアが記録と異なるため再利用しません: %s", run_dir)
+            continue
+        return run_dir
+    return None
+
+
+def reuse_run_outputs(source: Path, run_dir: Path) -> None:
+    """source の出力を run_dir へ複製し、レポートに再利用元を記録する。"""
+    for path in source.iterdir():
+        if path.is_file():
+            shutil.copy2(path, run_dir / path.name)
+    report_path = run_dir / "結果レポート.json"
+    with open(report_path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    report["reused_from"] = source.name
+    export_report(run_dir, report)
+
+
 def export_candidates(run_dir: Path, results: List[CandidateResult]) -> None:
     df = pd.DataFrame([asdict(r) for r in results])
     df.to_csv(run_dir / "k_candidates.csv", index=False, encoding="utf-8-sig")
@@ -2384,6 +4156,7 @@ def export_candidate_assignments(
     top_results: List[CandidateResult],
     cache: Dict[Any, Any],
     ica_retry_config: Optional[IcaRetryConfig] = None,
+    pca_config: Optional[PcaConfig] = None,
 ) -> None:
     out = df_src[keep_cols].copy()
     rows = []
@@ -2396,7 +4169,7 @@ def export_candidate_assignments(
             r.effective_ica1_dim if r.selection_tier == "strict_full"
             else (r.requested_ica1_dim or r.ica1_dim)
         )
-        res = get_pipeline_result(X, pca_var=pca_var, ica1_dim=requested_dim, k=r.k, random_state=r.random_state, cache=cache, ica_retry_config=candidate_retry)
+        res = get_pipeline_result(X, pca_var=pca_var, ica1_dim=requested_dim, k=r.k, random_state=r.random_state, cache=cache, ica_retry_config=candidate_retry, pca_config=pca_config)
         out[f"cand{r.rank}_K{r.k}"] = res["labels"].astype(int)
         rows.append({
             "plan": r.rank,
@@ -2429,8 +4202,7 @@ def export_candidate_assignments(
     log.info("候補割当を出力: %s", run_dir / "k_candidates_assignments.csv")
 
 
-def export_run_csv(
-    run_dir: Path,
+def build_run_score_frame(
     df_src: pd.DataFrame,
     keep_cols: List[str],
     Xfinal: np.ndarray,
@@ -2441,7 +4213,8 @@ def export_run_csv(
     Xica1: Optional[np.ndarray] = None,
     include_ica1_cols: bool = False,
     coordinate_prefix: str = "CP",
-) -> None:
+) -> pd.DataFrame:
+    """結果スコア（csv / parquet / arrow）の1行1文書の表を作る（列順は export_run_csv と共通）。"""
     out = df_src[keep_cols].copy()
     ic_total = Xfinal.shape[1]
     show_ic = ic_total if not max_ic_cols else min(ic_total, int(max_ic_cols))
@@ -2455,8 +4228,101 @@ def export_run_csv(
     if extra_cols:
         for k, v in extra_cols.items():
             out[k] = v
-    out.to_csv(run_dir / "結果スコア.csv", index=False, encoding="utf-8-sig")
-    log.info("スコア出力: %s", run_dir / "結果スコア.csv")
+    return out
+
+
+def export_run_csv(
+    run_dir: Path,
+    df_src: pd.DataFrame,
+    keep_cols: List[str],
+    Xfinal: np.ndarray,
+    labels: np.ndarray,
+    dists: np.ndarray,
+    max_ic_cols: Optional[int],
+    extra_cols: Optional[Dict[str, Any]] = None,
+    Xica1: Optional[np.ndarray] = None,
+    include_ica1_cols: bool = False,
+    coordinate_prefix: str = "CP",
+    output_format: str = "csv",
+) -> None:
+    out = build_run_score_frame(
+        df_src, keep_cols, Xfinal, labels, dists, max_ic_cols, extra_cols=extra_cols,
+        Xica1=Xica1, include_ica1_cols=include_ica1_cols, coordinate_prefix=coordinate_prefix,
+    )
+    path = run_score_path(run_dir, output_format)
+    with RunScoreWriter(path, output_format) as writer:
+        writer.write(out)
+    log.info("スコア出力: %s", path)
+
+
+def run_score_path(run_dir: Path, output_format: str = "csv") -> Path:
+    return run_dir / f"結果スコア.{output_format}"
+
+
+def _columnar_score_frame(out: pd.DataFrame) -> pd.DataFrame:
+    """Parquet / Arrow 用に座標・距離を float32、cluster を int32 へ落とす（CSV は従来の型のまま）。
+
+    id / text は入力の値をそのまま残す（空欄を含む数値 id は float64 で読まれるため、
+    float32 にすると 2^24 を超える id が変わってしまう）。object 型の id は文字列型にそろえる。
+    数値と文字列が混在する列や、全件空欄の chunk でも schema が変わらないようにするため。
+    """
+    cast: Dict[str, Any] = {
+        c: np.float32 for c in out.columns
+        if c not in ("id", "text") and pd.api.types.is_float_dtype(out[c])
+    }
+    cast["cluster"] = np.int32
+    if "id" in out.columns and out["id"].dtype == object:
+        out = out.assign(id=_as_text_column(out["id"]).astype("string"))
+    return out.astype(cast)
+
+
+class RunScoreWriter:
+    """結果スコアを CSV / Parquet / Arrow IPC へ書く。write() を繰り返すと chunk ごとに追記する。"""
+
+    def __init__(self, path: Path, output_format: str = "csv"):
+        if output_format not in RUN_SCORE_FORMATS:
+            raise PVMUserError(f"未知の出力形式です: {output_format}（{' / '.join(RUN_SCORE_FORMATS)}）")
+        if output_format != "csv":
+            _require_pyarrow(f"{output_format} 出力")
+        self.path = Path(path)
+        self.output_format = output_format
+        self.rows = 0
+        self._writer: Any = None
+        self._schema: Any = None
+
+    def write(self, out: pd.DataFrame) -> None:
+        if self.output_format == "csv":
+            if self.rows == 0:
+                out.to_csv(self.path, index=False, encoding="utf-8-sig")
+            else:
+                # BOM は先頭だけに付ける。
+                out.to_csv(self.path, mode="a", header=False, index=False, encoding="utf-8")
+        else:
+            import pyarrow as pa
+
+            # 2回目以降は先頭 chunk の schema に合わせ、ファイル内で列型を揃える。
+            table = pa.Table.from_pandas(_columnar_score_frame(out), schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                if self.output_format == "parquet":
+                    import pyarrow.parquet as pq
+
+                    self._writer = pq.ParquetWriter(self.path, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(str(self.path), self._schema)
+            self._writer.write_table(table)
+        self.rows += len(out)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "RunScoreWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
 
 
 def final_coordinate_prefix(transform_mode: str) -> str:
@@ -2548,6 +4414,10 @@ def _safe_ratio(part: int, whole: int) -> float:
     return 0.0 if whole <= 0 else float(part) / float(whole)
 
 
+def _safe_rate(count: int, seconds: float) -> float:
+    return 0.0 if seconds <= 0 else float(count) / float(seconds)
+
+
 def _pick_quantile_examples(sorted_indices: np.ndarray, positions: Sequence[float], count: int) -> List[int]:
     if len(sorted_indices) == 0:
         return []
@@ -2599,23 +4469,62 @@ def compute_run_quality(
     base_threshold: Optional[float] = None,
     base_dists: Optional[np.ndarray] = None,
 ) -> Dict[str, Any]:
+    labels = np.asarray(labels).astype(int)
+    return summarize_run_quality(
+        labels=labels,
+        dists=dists,
+        margins=assignment_margins(Xfinal, labels, centroids),
+        n_clusters=int(np.asarray(centroids).shape[0]),
+        protected_cluster_count=protected_cluster_count,
+        transform_mode=transform_mode,
+        gate_mask=gate_mask,
+        gate_final_mask=gate_final_mask,
+        gate_ica1_mask=gate_ica1_mask,
+        accepted_extra_mask=accepted_extra_mask,
+        added_mask=added_mask,
+        base_threshold=base_threshold,
+        base_dists=base_dists,
+    )
+
+
+def assignment_margins(Xfinal: np.ndarray, labels: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """割当先と2番目に近いクラスタとの cosine 距離差（小さいほど境界的）。"""
+    labels = np.asarray(labels).astype(int)
+    D = cosine_distance_to_centroids(l2_normalize(Xfinal), l2_normalize(centroids))
+    rows = np.arange(len(D))
+    first = D[rows, labels].copy()
+    # 割当先を inf で潰して次点を取る（D はこの関数内の一時配列なので複製しない）。
+    D[rows, labels] = np.inf
+    second = D.min(axis=1)
+    return (second - first).astype(np.float32)
+
+
+def summarize_run_quality(
+    labels: np.ndarray,
+    dists: np.ndarray,
+    margins: np.ndarray,
+    n_clusters: int,
+    protected_cluster_count: int,
+    transform_mode: str,
+    gate_mask: Optional[np.ndarray] = None,
+    gate_final_mask: Optional[np.ndarray] = None,
+    gate_ica1_mask: Optional[np.ndarray] = None,
+    accepted_extra_mask: Optional[np.ndarray] = None,
+    added_mask: Optional[np.ndarray] = None,
+    base_threshold: Optional[float] = None,
+    base_dists: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """行ごとの 1 次元配列だけから compute_run_quality() と同じ品質指標を作る。"""
     labels = np.asarray(labels).astype(int)
     dists = np.asarray(dists, dtype=np.float32)
-    Xn = l2_normalize(Xfinal)
-    Cn = l2_normalize(centroids)
-    D = cosine_distance_to_centroids(Xn, Cn)
-    first = D[np.arange(len(D)), labels]
-    D2 = D.copy()
-    D2[np.arange(len(D2)), labels] = np.inf
-    second = D2[np.arange(len(D2)), np.argmin(D2, axis=1)]
-    margins = (second - first).astype(np.float32)
+    margins = np.asarray(margins, dtype=np.float32)
 
     boundary_mask = margins <= DEFAULT_BOUNDARY_MARGIN
     boundary_rate = float(np.mean(boundary_mask)) if len(boundary_mask) else 0.0
 
     cluster_rows = []
     q90s = []
-    for k in range(int(Cn.shape[0])):
+    for k in range(int(n_clusters)):
         idx = np.where(labels == k)[0]
         if len(idx) == 0:
             continue
@@ -2713,6 +4622,51 @@ def compute_run_quality(
     }
 
 
+class RunQualityAccumulator:
+    """chunk 単位の lock 結果から summarize_run_quality() の入力を貯める。
+
+    n×k の距離行列は chunk 内で margin に縮約して捨てるため、保持するのは
+    行数ぶんの 1 次元配列（label / dist / margin / gate 類）だけになる。
+    """
+
+    _FIELDS = ("labels", "dists", "margins", "base_dists", "gate_mask", "gate_final_mask", "gate_ica1_mask", "accepted_extra_mask")
+
+    def __init__(self, centroids: np.ndarray):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self._parts: Dict[str, List[np.ndarray]] = {name: [] for name in self._FIELDS}
+
+    def add(self, Xfinal: np.ndarray, lock_res: Dict[str, Any]) -> None:
+        labels = np.asarray(lock_res["labels"]).astype(np.int32)
+        self._parts["labels"].append(labels)
+        self._parts["dists"].append(np.asarray(lock_res["dists"], dtype=np.float32))
+        self._parts["margins"].append(assignment_margins(Xfinal, labels, self.centroids))
+        self._parts["base_dists"].append(np.asarray(lock_res["base_dists"], dtype=np.float32))
+        for name in ("gate_mask", "gate_final_mask", "gate_ica1_mask", "accepted_extra_mask"):
+            self._parts[name].append(np.asarray(lock_res[name]).astype(bool))
+
+    def column(self, name: str) -> np.ndarray:
+        parts = self._parts[name]
+        if not parts:
+            return np.zeros(0, dtype=bool if name.endswith("_mask") else np.float32)
+        return np.concatenate(parts)
+
+    def finalize(self, protected_cluster_count: int, transform_mode: str, base_threshold: Optional[float]) -> Dict[str, Any]:
+        return summarize_run_quality(
+            labels=self.column("labels"),
+            dists=self.column("dists"),
+            margins=self.column("margins"),
+            n_clusters=int(self.centroids.shape[0]),
+            protected_cluster_count=protected_cluster_count,
+            transform_mode=transform_mode,
+            gate_mask=self.column("gate_mask"),
+            gate_final_mask=self.column("gate_final_mask"),
+            gate_ica1_mask=self.column("gate_ica1_mask"),
+            accepted_extra_mask=self.column("accepted_extra_mask"),
+            base_threshold=base_threshold,
+            base_dists=self.column("base_dists"),
+        )
+
+
 def emit_run_summary(mode: str, analysis_info: Optional[Dict[str, Any]]) -> None:
     if not analysis_info:
         return
@@ -2772,11 +4726,13 @@ def export_ai_prompt_pack(
     nearby_cluster_count: int = 2,
     nearby_examples_per_cluster: int = 2,
     ica_axis_cards: Optional[Sequence[Dict[str, Any]]] = None,
+    population_n: Optional[int] = None,
 ) -> None:
     """
     AI向けの単一パケットを出力する。
     主役は AI_解釈依頼.md だけで、依頼文とクラスタカードを同梱する。
     AI_クラスタ一覧.csv は人間確認用の補助出力。
+    population_n を渡した場合、df_src 以下は全体からの無作為抽出とみなし、その旨を明記する。
     """
     labels = np.asarray(labels).astype(int)
     dists = np.asarray(dists).astype(np.float32)
@@ -2812,7 +4768,11 @@ def export_ai_prompt_pack(
     packet_lines.append('PVM の数理説明は最小限にし、命名・解釈に必要な情報だけを整理して載せています。')
     packet_lines.append('')
     packet_lines.append('## 前提')
-    packet_lines.append(f'- 総件数: {total_n}')
+    if population_n is not None and int(population_n) != total_n:
+        packet_lines.append(f'- 総件数: {int(population_n)}')
+        packet_lines.append(f'- 代表例と件数・構成比: 全体から無作為抽出した {total_n} 件に基づく')
+    else:
+        packet_lines.append(f'- 総件数: {total_n}')
     packet_lines.append(f'- クラスタ数: {int(Cn.shape[0])}')
     packet_lines.append(f'- 実行モード: {mode}')
     packet_lines.append(f'- base cluster 数: {int(protected_cluster_count)}')
@@ -3395,6 +5355,306 @@ def conservative_unlock(
         "info": info,
     }
 
+# ---------------------------------------------------------------------------
+# library API / resident scoring service
+# ---------------------------------------------------------------------------
+
+class PVMModel:
+    """保存済み baseline で lock 判定するためのライブラリ API。結果ファイルは書かない。
+
+    >>> model = PVMModel.load("顧客アンケート")
+    >>> X = model.embed(["配送が遅い", "使い方が分からない"])
+    >>> model.assign(X)["labels"]
+
+    embedding 設定（model / prefix / max_len / backend / chunk）は baseline の記録に従う。
+    gate 閾値は main() の lock と同じく「unlock_q 指定 > baseline 保存値」で解決する。
+    埋め込みモデルは最初の embed() で読み込み、以後は保持する。
+    """
+
+    def __init__(
+        self,
+        bundle: TransformBundle,
+        centroids: np.ndarray,
+        meta_raw: Dict[str, Any],
+        project: str,
+        version: str,
+        unlock_q: Optional[float] = None,
+        batch: int = DEFAULT_BATCH,
+        batch_tokens: int = 0,
+        backend: Optional[str] = None,
+    ):
+        import threading
+
+        self.bundle = bundle
+        self.centroids = centroids
+        self.meta_raw = meta_raw
+        self.project = project
+        self.version = version
+        self.batch = int(batch)
+        self.batch_tokens = int(batch_tokens)
+        self.embedding_model = str(meta_raw["embedding_model"])
+        self.embedding_prefix = str(meta_raw.get("embedding_prefix") or "")
+        self.max_len = int(meta_raw.get("max_len") or DEFAULT_MAX_LEN)
+        self.embedding_backend = str(backend or meta_raw.get("embedding_backend") or DEFAULT_EMBEDDING_BACKEND)
+        self.chunk_tokens = int(meta_raw.get("chunk_tokens") or 0)
+        self.chunk_overlap = int(meta_raw.get("chunk_overlap") or 0)
+        validate_embedding_compat(
+            meta_raw, self.embedding_model, self.embedding_prefix, self.max_len,
+            self.embedding_backend, self.chunk_tokens, self.chunk_overlap,
+        )
+        self.gate_quantile = resolve_effective_unlock_q(unlock_q, meta_raw)
+        self.gate_threshold = resolve_quantile_threshold(meta_raw, self.gate_quantile)
+        self.ica1_gate_threshold = resolve_ica1_quantile_threshold(meta_raw, self.gate_quantile)
+        self._encoder: Optional[EmbeddingModel] = None
+        # モデルは1つなので推論は直列化する（常駐サービスでは接続の受付だけ並行）。
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(
+        cls,
+        project: str,
+        version: Optional[str] = None,
+        result_root: Path = Path("PVMresult"),
+        **kwargs: Any,
+    ) -> "PVMModel":
+        """result_root/baseline_<project>/history の指定版（未指定なら最新版）を読む。"""
+        bundle, centroids, meta_raw, ver = load_baseline_version(Path(result_root), project, version)
+        return cls(bundle, centroids, meta_raw, project, ver, **kwargs)
+
+    def embed(self, texts: Sequence[Any]) -> np.ndarray:
+        """本文を normalize_text() してから baseline と同じ設定で埋め込む。"""
+        normalized = [normalize_text("" if t is None else str(t)) for t in texts]
+        with self._lock:
+            if self._encoder is None:
+                ensure_ruri()
+                self._encoder = load_embedding_model(self.embedding_model, self.embedding_backend)
+            X, _ = compute_embeddings(
+                normalized, self.embedding_model, self.batch, self.max_len,
+                embedding_prefix=self.embedding_prefix, batch_tokens=self.batch_tokens, show_progress=False,
+                prefetch=0, backend=self.embedding_backend, chunk_tokens=self.chunk_tokens,
+                chunk_overlap=self.chunk_overlap, loaded=self._encoder,
+            )
+        return X
+
+    def transform(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """埋め込みを (final 空間, ICA① gate 空間) へ写す。"""
+        return apply_transform_spaces(X, self.bundle)
+
+    def assign(self, X: np.ndarray) -> Dict[str, Any]:
+        """埋め込みを lock 判定する。戻り値は gated_lock_assign() と同じ dict。"""
+        return self.assign_spaces(*self.transform(X))
+
+    def assign_spaces(self, Xfinal: np.ndarray, Xpre: np.ndarray) -> Dict[str, Any]:
+        """transform() 済みの2空間で lock 判定する（座標も出力したい呼び出し側向け）。"""
+        return gated_lock_assign(
+            Xfinal=Xfinal,
+            centroids=self.centroids,
+            protected_cluster_count=int(self.meta_raw["protected_cluster_count"]),
+            base_threshold=self.gate_threshold,
+            extra_accept_thresholds=self.meta_raw.get("extra_accept_thresholds", []),
+            extra_relative_advantage=float(self.meta_raw.get("extra_relative_advantage", DEFAULT_EXTRA_REL_ADV)),
+            Xpre=Xpre,
+            ica1_centroids=self.meta_raw.get("_runtime_ica1_centroids"),
+            ica1_base_threshold=self.ica1_gate_threshold,
+        )
+
+    def score(self, texts: Sequence[Any], ids: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+        """embed → assign を行い、行ごとの判定を dict のリストで返す。空の本文は error 付きで返す。"""
+        if ids is not None and len(ids) != len(texts):
+            raise PVMUserError("ids と texts の件数が一致しません。")
+        valid = [i for i, t in enumerate(texts) if normalize_text("" if t is None else str(t))]
+        results: List[Dict[str, Any]] = [
+            {"id": ids[i] if ids is not None else i, "cluster": None, "error": "empty text"}
+            for i in range(len(texts))
+        ]
+        if not valid:
+            return results
+        res = self.assign(self.embed([texts[i] for i in valid]))
+        for j, i in enumerate(valid):
+            results[i] = {
+                "id": results[i]["id"],
+                "cluster": int(res["labels"][j]),
+                "dist": float(res["dists"][j]),
+                "gate": bool(res["gate_mask"][j]),
+                "gate_final": bool(res["gate_final_mask"][j]),
+                "gate_ica1": bool(res["gate_ica1_mask"][j]),
+                "accepted_extra": bool(res["accepted_extra_mask"][j]),
+            }
+        return results
+
+
+def _handle_scoring_request(scorer: PVMModel, raw: bytes) -> Dict[str, Any]:
+    """JSON lines の1行（受信したままのバイト列）を処理する。入力エラーはサービスを止めず {"ok": false} で返す。"""
+    try:
+        # UTF-8 でない行も UnicodeDecodeError（ValueError）として他の不正リクエストと同じく返す。
+        request = json.loads(raw.decode("utf-8"))
+        if not isinstance(request, dict):
+            raise PVMUserError("リクエストは JSON object で送ってください。")
+        if request.get("ping"):
+            return {"ok": True, "baseline": f"{scorer.project}:{scorer.version}"}
+        texts = request.get("texts")
+        if not isinstance(texts, list):
+            raise PVMUserError('"texts" に本文の配列を指定してください。')
+        return {"ok": True, "results": scorer.score(texts, request.get("ids"))}
+    except (ValueError, PVMUserError) as e:
+        return {"ok": False, "error": str(e)}
+    except Exception as e:  # noqa: BLE001 - 常駐サービスは1件の失敗で止めない
+        log.exception("scoring request failed")
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def serve_lock_scorer(scorer: PVMModel, address: str) -> None:
+    """localhost の TCP で JSON lines を受け付ける。1行1リクエスト、1行1レスポンス。"""
+    import socketserver
+
+    host, _, port = str(address).rpartition(":")
+    host = host or "127.0.0.1"
+
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for raw in self.rfile:
+                if not raw.strip():
+                    continue
+                t0 = time.perf_counter()
+                response = _handle_scoring_request(scorer, raw)
+                self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                log.debug("scoring request: ok=%s, %.1fms", response.get("ok"), 1000.0 * (time.perf_counter() - t0))
+
+    class _Server(socketserver.ThreadingTCPServer):
+        allow_reuse_address = True
+        daemon_threads = True
+
+    with _Server((host, int(port)), _Handler) as server:
+        log.info("lock 判定サービスを開始しました: %s:%s（baseline: %s, ver: %s）", host, port, scorer.project, scorer.version)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            log.info("lock 判定サービスを停止しました。")
+
+
+class _RowReservoir:
+    """行を固定件数まで一様無作為に保持する（各行に乱数キーを振り、小さい順に残す）。"""
+
+    def __init__(self, size: int, random_state: int):
+        self.size = max(1, int(size))
+        self.rng = np.random.default_rng(random_state)
+        self.keys = np.zeros(0, dtype=np.float64)
+        self.frame: Optional[pd.DataFrame] = None
+        self.arrays: Dict[str, np.ndarray] = {}
+
+    def add(self, frame: pd.DataFrame, **arrays: np.ndarray) -> None:
+        keys = self.rng.random(len(frame))
+        if len(self.keys) >= self.size:
+            # 既に満杯なら、現在の最大キーより小さい行だけが入れ替え候補になる。
+            take = np.flatnonzero(keys < self.keys.max())
+            frame, keys = frame.iloc[take], keys[take]
+            arrays = {name: np.asarray(v)[take] for name, v in arrays.items()}
+        if not len(keys):
+            return
+        if self.frame is None:
+            self.frame = frame.reset_index(drop=True)
+            self.arrays = {name: np.asarray(v) for name, v in arrays.items()}
+            self.keys = keys
+        else:
+            self.frame = pd.concat([self.frame, frame], ignore_index=True)
+            self.arrays = {name: np.concatenate([self.arrays[name], np.asarray(v)]) for name, v in arrays.items()}
+            self.keys = np.concatenate([self.keys, keys])
+        if len(self.keys) > self.size:
+            keep = np.sort(np.argpartition(self.keys, self.size - 1)[: self.size])
+            self.frame = self.frame.iloc[keep].reset_index(drop=True)
+            self.arrays = {name: v[keep] for name, v in self.arrays.items()}
+            self.keys = self.keys[keep]
+
+
+def stream_lock_chunks(
+    scorer: PVMModel,
+    frames: Any,
+    embed_chunk: Any,
+    out_path: Path,
+    max_ic_cols: Optional[int],
+    include_ica1_cols: bool = False,
+    sample_rows: int = DEFAULT_STREAM_SAMPLE_ROWS,
+    random_state: int = 42,
+    output_format: str = "csv",
+) -> Dict[str, Any]:
+    """prepare_input_dataframe() 済みの chunk を順に embed → transform → lock 判定し、out_path へ追記する。
+
+    embed_chunk(texts) は (X, embedding_info) を返す関数。保持するのは品質集計用の 1 次元配列と
+    AI_解釈依頼.md 用の無作為抽出 sample_rows 行だけで、埋め込み・座標・距離行列は chunk ごとに捨てる。
+    """
+    bundle = scorer.bundle
+    prefix = final_coordinate_prefix(str(bundle.transform_mode))
+    quality = RunQualityAccumulator(scorer.centroids)
+    reservoir = _RowReservoir(sample_rows, random_state)
+    embedding_infos: List[Dict[str, Any]] = []
+    n_rows = 0
+    n_chunks = 0
+    with RunScoreWriter(out_path, output_format) as writer:
+        for df in frames:
+            if not len(df):
+                continue
+            X, info = embed_chunk(df["text"].tolist())
+            Xfinal, Xpre = scorer.transform(X)
+            del X
+            lock_res = scorer.assign_spaces(Xfinal, Xpre)
+            writer.write(build_run_score_frame(
+                df, ["id", "text"], Xfinal, lock_res["labels"], lock_res["dists"], max_ic_cols,
+                extra_cols={
+                    "gate_over_base": lock_res["gate_mask"],
+                    "gate_final": lock_res["gate_final_mask"],
+                    "gate_ica1": lock_res["gate_ica1_mask"],
+                    "accepted_existing_extra": lock_res["accepted_extra_mask"],
+                },
+                Xica1=(Xpre if int(bundle.ica1_n_components) > 0 else None),
+                include_ica1_cols=include_ica1_cols,
+                coordinate_prefix=prefix,
+            ))
+            quality.add(Xfinal, lock_res)
+            reservoir.add(df[["id", "text"]], Xfinal=Xfinal, labels=lock_res["labels"], dists=lock_res["dists"])
+            embedding_infos.append(info)
+            n_rows += len(df)
+            n_chunks += 1
+            log.info("chunk %d: %d 行を lock 判定しました（累計 %d 行）", n_chunks, len(df), n_rows)
+    return {
+        "n": n_rows,
+        "chunks": n_chunks,
+        "quality": quality,
+        "sample": reservoir,
+        "embedding_infos": embedding_infos,
+    }
+
+
+def merge_embedding_infos(infos: Sequence[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """chunk ごとの embed_texts() 情報を1つにまとめる（件数と cache 数は合算、throughput は chunk 別に残す）。"""
+    if not infos:
+        return None
+    merged = dict(infos[0])
+    n_texts = sum(int(i.get("n_texts") or 0) for i in infos)
+    n_unique = sum(int(i.get("n_unique_texts") or 0) for i in infos)
+    merged.update(
+        n_texts=n_texts,
+        n_unique_texts=n_unique,
+        duplicate_ratio=_safe_ratio(n_texts - n_unique, n_texts),
+        workers=None,
+        checkpoint=None,
+        throughput=None,
+        chunk_throughput=[i.get("throughput") for i in infos],
+    )
+    caches = [i["cache"] for i in infos if i.get("cache")]
+    if caches:
+        hits = sum(int(c["hits"]) for c in caches)
+        misses = sum(int(c["misses"]) for c in caches)
+        merged["cache"] = {
+            **caches[0],
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": _safe_ratio(hits, hits + misses),
+            "evicted": sum(int(c["evicted"]) for c in caches),
+        }
+    return merged
+
+
 # ---------------------------------------------------------------------------
 # smoke checks (offline internal)
 # ---------------------------------------------------------------------------
@@ -3432,6 +5692,24 @@ def _smoke_internal() -> None:
         raise AssertionError("embedding prefix mismatch should stop")
     except SystemExit:
         pass
+    validate_embedding_compat(
+        {"embedding_model": "dummy", "embedding_prefix": "", "max_len": 128},
+        "dummy",
+        "",
+        128,
+        "onnx",
+    )
+    try:
+        validate_embedding_compat(
+            {"embedding_model": "dummy", "embedding_prefix": "", "max_len": 128, "embedding_backend": "torch"},
+            "dummy",
+            "",
+            128,
+            "torch-int8",
+        )
+        raise AssertionError("fp32 / int8 backend mixing should stop")
+    except SystemExit:
+        pass
 
     # autodetect_columns: prefer rich text over URLs / id-like cols
     df_test = pd.DataFrame({
@@ -3526,8 +5804,8 @@ def _smoke_internal() -> None:
         # v001 baseline
         ver1 = save_baseline_version(root, "smoke", fit["bundle"], fit["centroids"], meta, ica1_centroids=ica1_state["ica1_centroids"])
         bundle1, cent1, meta1, _ = load_baseline_version(root, "smoke", ver1)
-        Xf1 = apply_transforms(X, bundle1)
-        Xpre1 = apply_pre_projection_space(X, bundle1)
+        Xf1, Xpre1 = apply_transform_spaces(X, bundle1)
+        assert np.allclose(Xpre1, apply_pre_projection_space(X, bundle1), atol=1e-5)
         lock1 = gated_lock_assign(
             Xfinal=Xf1,
             centroids=cent1,
@@ -3540,6 +5818,9 @@ def _smoke_internal() -> None:
             ica1_base_threshold=resolve_ica1_quantile_threshold(meta1, DEFAULT_UNLOCK_Q),
         )
         assert len(lock1["labels"]) == len(X)
+        lib_model = PVMModel.load("smoke", ver1, root)
+        lib_lock = lib_model.assign(X)
+        assert np.array_equal(lib_lock["labels"], lock1["labels"]), "PVMModel.assign should match the lock path"
 
         # unlock to v002
         X2 = np.vstack([X, rng.normal(5, 0.2, size=(20, 8)).astype(np.float32)])
@@ -3925,6 +6206,7 @@ def build_argparser() -> argparse.ArgumentParser:
     )
     ap.add_argument("--input_xlsx", type=str, default=None)
     ap.add_argument("--input_csv", type=str, default=None)
+    ap.add_argument("--input_parquet", type=str, default=None, help="Parquet 入力（pyarrow が必要）。本文列と ID 列だけを読み込みます")
     ap.add_argument("--text_col", type=str, default=None)
     ap.add_argument("--id_col", type=str, default=None)
     ap.add_argument("--project", type=str, default=None)
@@ -3933,10 +6215,43 @@ def build_argparser() -> argparse.ArgumentParser:
     ap.add_argument("--embedding_model", type=str, default="cl-nagoya/ruri-v3-310m")
     ap.add_argument("--embedding-prefix", dest="embedding_prefix", type=str, default=DEFAULT_EMBEDDING_PREFIX,
                     help="embedding前に各テキストへ付けるprefix。Ruri v3のクラスタリング用途では既定の『トピック: 』を推奨。noneで空prefix")
+    ap.add_argument("--embeddings", type=str, default=None,
+                    help="計算済み埋め込み（.npy / .parquet）。同名の .json に model / prefix / max_len（任意で ids）を記録。指定時は torch を使いません")
+    ap.add_argument("--embedding-backend", dest="embedding_backend", choices=EMBEDDING_BACKENDS, default=DEFAULT_EMBEDDING_BACKEND,
+                    help="埋め込みの実行方式。torch-int8 / onnx は CPU 向けの高速化。baseline と fp32/int8 の系統が違うと lock/unlock は停止します")
+    ap.add_argument("--validate-backend", dest="validate_backend", action="store_true",
+                    help="入力から標本を取り、--embedding-backend と fp32 torch の cosine 一致度を表示して終了します")
+    ap.add_argument("--validate-sample", dest="validate_sample", type=int, default=256,
+                    help="--validate-backend で比べる標本件数")
     ap.add_argument("--batch", type=int, default=DEFAULT_BATCH)
     ap.add_argument("--max_len", type=int, default=DEFAULT_MAX_LEN)
+    ap.add_argument("--chunk-tokens", dest="chunk_tokens", type=int, default=0,
+                    help="長文を prefix・特殊トークン込みでこのトークン数以下の窓に分けて埋め込み、文ごとにトークン加重平均します。0で分割なし（max_len まで1回で計算）")
+    ap.add_argument("--chunk-overlap", dest="chunk_overlap", type=int, default=0,
+                    help="--chunk-tokens の窓同士を重ねるトークン数")
+    ap.add_argument("--batch-tokens", dest="batch_tokens", type=int, default=0,
+                    help="1バッチの上限トークン数（最長長×行数）。指定時は長さ順に詰めて padding を減らし、--batch は使いません。0で従来の行数バッチ")
+    ap.add_argument("--embed-workers", dest="embed_workers", type=int, default=1,
+                    help="CPU 埋め込みのプロセス数。各プロセスがモデルを保持し連続シャードを担当します（GPU/MPS では1固定）")
+    ap.add_argument("--embed-threads", dest="embed_threads", type=int, default=0,
+                    help="埋め込みプロセスごとの torch スレッド数。0で自動（--embed-workers 指定時は論理コア数 / workers）")
+    ap.add_argument("--embed-prefetch", dest="embed_prefetch", type=int, default=DEFAULT_EMBED_PREFETCH,
+                    help="トークン化を別スレッドで何バッチ先行させるか。forward と重ねて待ち時間を減らします。0で逐次実行")
+    ap.add_argument("--embedding-checkpoint", dest="embedding_checkpoint", type=str, default=None,
+                    help="埋め込みを memmap の .npy へ逐次保存するディレクトリ。中断後に同じ入力・設定で再実行すると完了済みバッチを飛ばして再開します")
+    ap.add_argument("--embedding-cache", dest="embedding_cache", type=str, default=None,
+                    help="埋め込み結果を保存する sqlite ファイル。本文・モデル・prefix・max_len が同じ行は再計算しません")
+    ap.add_argument("--embedding-cache-max-mb", dest="embedding_cache_max_mb", type=float, default=DEFAULT_EMBEDDING_CACHE_MAX_MB,
+                    help="embedding cache の容量上限(MB)。超えたら最終利用の古い順に削除します")
 
     ap.add_argument("--pca_var", type=float, default=0.90)
+    ap.add_argument(
+        "--pca-solver", dest="pca_solver", choices=PCA_SOLVERS, default="full",
+        help="baseline作成時のPCA分解。randomizedは累積寄与率がpca_varに届くまで成分数を増やす近似分解で、大規模初回が速くなります。"
+             "incrementalは--pca-batch-rows行ずつ学習し、標準化済みの全件行列を持ちません",
+    )
+    ap.add_argument("--pca-batch-rows", dest="pca_batch_rows", type=int, default=DEFAULT_PCA_BATCH_ROWS,
+                    help="--pca-solver incremental で一度に学習する行数")
     ap.add_argument("--k_min", type=int, default=3)
     ap.add_argument("--k_max", type=int, default=12)
     ap.add_argument("--random_state", type=int, default=42)
@@ -3950,6 +6265,13 @@ def build_argparser() -> argparse.ArgumentParser:
     ap.add_argument("--基準流用", dest="baseline_from", type=str, default=None)
     ap.add_argument("--baseline-version", dest="baseline_version", type=str, default=None,
                     help="lock / unlock 時に使う baseline version を指定 (例: v002)。未指定なら最新版。baseline-from と併用可")
+    ap.add_argument("--serve", nargs="?", const=DEFAULT_SERVE_ADDRESS, default=None, metavar="HOST:PORT",
+                    help=f"baseline と埋め込みモデルを常駐させ、JSON lines で lock 判定を返すサービスを起動します（既定 {DEFAULT_SERVE_ADDRESS}）。--project か --baseline-from が必要")
+    ap.add_argument("--lock-chunk-rows", dest="lock_chunk_rows", type=int, default=0,
+                    help="lock を入力 N 行ずつの分割処理で行い、結果スコア（--output-format の形式）へ順に追記します。全件の埋め込みや距離行列を同時に持たないため、"
+                         "巨大な入力でもメモリは chunk 分で済みます。重複除去は chunk 内のみ（chunk をまたぐ再計算を避けるなら --embedding-cache を併用）。0で無効")
+    ap.add_argument("--reuse-identical-run", dest="reuse_identical_run", action="store_true",
+                    help="入力ファイルの内容・結果に効く設定・使用 baseline 版が同一の過去 lock 実行があれば、再計算せずその出力を新しい run へ複製します")
     ap.add_argument("--restore-version", dest="restore_version", type=str, default=None,
                     help="指定 version を復元保存して終了。同名を戻す場合は --project NAME、別名から複製する場合は --baseline-from SOURCE --project TARGET を指定します")
 
@@ -3963,10 +6285,14 @@ def build_argparser() -> argparse.ArgumentParser:
     ap.add_argument("--unlock-min-points", dest="unlock_min_points", type=int, default=8)
 
     ap.add_argument("--max_ic_cols", "--max-cp-cols", dest="max_ic_cols", type=int, default=None,
-                    help="結果スコア.csvへ出力する最終座標列の上限（旧名--max_ic_colsも互換維持）")
+                    help="結果スコアへ出力する最終座標列の上限（旧名--max_ic_colsも互換維持）")
     ap.add_argument(
         "--include-ica1-cols", action="store_true",
-        help="結果スコア.csvへCP軸に加えてICA①の全座標を出力します",
+        help="結果スコアへCP軸に加えてICA①の全座標を出力します",
+    )
+    ap.add_argument(
+        "--output-format", dest="output_format", choices=RUN_SCORE_FORMATS, default="csv",
+        help="結果スコアの形式。parquet / arrow（Arrow IPC）は座標・距離を float32、cluster を int32 で書きます（pyarrow が必要）",
     )
     ap.add_argument(
         "--search-budget", choices=tuple(ADAPTIVE_SEARCH_PRESETS), default="standard",
@@ -3976,6 +6302,10 @@ def build_argparser() -> argparse.ArgumentParser:
                     help="ICA retry の最大試行数。0なら標準候補グリッドを最後まで試す")
     ap.add_argument("--ica-timeout-sec", dest="ica_timeout_sec", type=float, default=0.0,
                     help="ICA retry の時間上限秒。0なら時間上限なし")
+    ap.add_argument("--ica-workers", dest="ica_workers", type=int, default=1,
+                    help="ICA の初回試行が失敗したとき、後続の retry 候補を何プロセスで先行実行するか。採否は1と同じ候補順で決まります")
+    ap.add_argument("--ica-shared-whitening", dest="ica_shared_whitening", action="store_true",
+                    help="PCA 座標の白色化を ICA の試行間で共有し、各試行は反復だけを行う。独立成分が既定と変わりうるため fingerprint に含めます")
     ap.add_argument("--log_level", type=str, default="INFO")
     ap.add_argument("--self-check", action="store_true", help="埋め込み無しの内部スモークチェック")
     ap.add_argument("--version", action="store_true")
@@ -4067,6 +6397,10 @@ def _restore_only(result_root: Path, args: argparse.Namespace) -> None:
         environment=build_environment("restore"),
         chosen_plan=None,
         source_baseline=f"{source_project}:{src_ver}",
+        embedding_backend=str(meta_r.get("embedding_backend") or DEFAULT_EMBEDDING_BACKEND),
+        chunk_tokens=int(meta_r.get("chunk_tokens") or 0),
+        chunk_overlap=int(meta_r.get("chunk_overlap") or 0),
+        ica_whitening=str(meta_r.get("ica_whitening") or "fastica"),
     )
     new_ver = save_baseline_version(result_root, target_project, bundle_r, centroids_r, restore_meta, ica1_centroids=meta_r.get("_runtime_ica1_centroids"))
     export_report(run_dir, {
@@ -4075,19 +6409,196 @@ def _restore_only(result_root: Path, args: argparse.Namespace) -> None:
         "embedding_model": restore_meta.embedding_model,
         "embedding_prefix": restore_meta.embedding_prefix,
         "max_len": restore_meta.max_len,
+        "embedding_backend": restore_meta.embedding_backend,
+        "chunk_tokens": restore_meta.chunk_tokens,
         "source_baseline": f"{source_project}:{src_ver}",
         "used_version": new_ver,
     })
     log.info("baseline 復元: %s", history_root(result_root, target_project) / new_ver)
 
 
+def _current_run_fingerprint(
+    result_root: Path,
+    args: argparse.Namespace,
+    infile: Path,
+    project: str,
+    embedding_prefix: str,
+) -> Dict[str, Any]:
+    """今回の実行の指紋。実行時点の baseline の版まで含める。
+
+    lock / unlock は使う版（--baseline-version または最新版）、探索・採用は実行時点の最新版を
+    入れるため、間に baseline が更新・復元されれば同じ入力・設定でも別の指紋になる。
+    入力の SHA-256 は --reuse-identical-run のときだけ計算し、それ以外はサイズと更新時刻で
+    済ませる（大きな入力を指紋のためだけに読み直さない）。
+    """
+    baseline_ref = None
+    try:
+        baseline_project, baseline_exists, _ = resolve_default_baseline_project(result_root, project, args.baseline_from)
+    except BaselineSelectionError:
+        baseline_exists = False
+    if baseline_exists:
+        pinned = args.baseline_version if (not args.show_candidates and args.use_plan is None) else None
+        baseline_ref = f"{baseline_project}:{pinned or latest_version(result_root, baseline_project)}"
+    full = bool(args.reuse_identical_run)
+    return build_run_fingerprint(
+        file_digest(infile, full), args, embedding_prefix, baseline_ref,
+        embeddings_digest=file_digest(Path(args.embeddings), full) if args.embeddings else None,
+    )
+
+
+def find_reusable_run(
+    result_root: Path,
+    args: argparse.Namespace,
+    project: str,
+    run_fingerprint: Dict[str, Any],
+) -> Optional[Path]:
+    """--reuse-identical-run で複製してよい過去実行を返す。
+
+    再利用は既存 baseline を読むだけの lock に限る。探索・採用・unlock や、baseline が
+    まだ無く今回の lock が baseline を作る実行は、出力の複製では baseline が書かれないため
+    再利用しない。
+    """
+    if args.show_candidates or args.use_plan is not None or args.unlock:
+        return None
+    if run_fingerprint.get("baseline") is None:
+        log.info("baseline が無く今回の実行で作成するため、過去実行は再利用しません。")
+        return None
+    return find_identical_run(result_root, project, run_fingerprint["run_fingerprint"], args.output_format)
+
+
+def _run_streaming_lock(
+    result_root: Path,
+    args: argparse.Namespace,
+    infile: Path,
+    ext: str,
+    embedding_prefix: str,
+    run_fingerprint: Optional[Dict[str, Any]] = None,
+) -> None:
+    """--lock-chunk-rows: 入力を chunk ごとに読み、lock 判定して 結果スコアへ追記する。"""
+    project = get_project_name(args.project, infile)
+    try:
+        baseline_project, baseline_exists, _ = resolve_default_baseline_project(result_root, project, args.baseline_from)
+    except BaselineSelectionError as e:
+        raise SystemExit(str(e)) from None
+    if not baseline_exists:
+        raise SystemExit("--lock-chunk-rows には既存の baseline が必要です。まず初回実行で baseline を作成してください。")
+    bundle, centroids, meta_raw, ver = load_baseline_version(result_root, baseline_project, args.baseline_version)
+    validate_embedding_compat(
+        meta_raw, args.embedding_model, embedding_prefix, args.max_len,
+        args.embedding_backend, args.chunk_tokens, args.chunk_overlap,
+    )
+    scorer = PVMModel(
+        bundle, centroids, meta_raw, baseline_project, ver,
+        unlock_q=args.unlock_q, batch=args.batch, batch_tokens=args.batch_tokens, backend=args.embedding_backend,
+    )
+
+    # 列の自動検出は先頭だけで行い、本読み込みは本文列と ID 列に絞る。
+    text_col, id_col = autodetect_columns(read_table_head(infile, ext), args.text_col, args.id_col)
+    log.info('使用する列: テキスト列="%s"%s', text_col, f'、ID列="{id_col}"' if id_col else "（ID列なし・自動付番）")
+    excluded_total = [0]
+
+    def _prepared_chunks() -> Iterator[pd.DataFrame]:
+        for df, excluded in iter_input_batches(infile, ext, text_col, id_col, args.lock_chunk_rows):
+            excluded_total[0] += excluded
+            yield df
+
+    encoder: Optional[EmbeddingModel] = None
+    if args.embed_workers <= 1:
+        ensure_ruri()
+        encoder = load_embedding_model(args.embedding_model, args.embedding_backend)
+
+    def _embed_chunk(texts: List[str]) -> Tuple[np.ndarray, Dict[str, Any]]:
+        X, _, info = embed_texts(
+            texts, args.embedding_model, args.batch, args.max_len,
+            embedding_prefix=embedding_prefix,
+            cache_path=Path(args.embedding_cache) if args.embedding_cache else None,
+            cache_max_mb=args.embedding_cache_max_mb,
+            batch_tokens=args.batch_tokens,
+            workers=args.embed_workers,
+            threads=args.embed_threads,
+            prefetch=args.embed_prefetch,
+            backend=args.embedding_backend,
+            chunk_tokens=args.chunk_tokens,
+            chunk_overlap=args.chunk_overlap,
+            loaded=encoder,
+        )
+        return X, info
+
+    run_dir = next_run_dir(result_root, project)
+    log.info("=== 実行モード: クラスターロック（分割処理 %d 行ずつ, baseline: %s, ver: %s） ===", int(args.lock_chunk_rows), baseline_project, ver)
+    streamed = stream_lock_chunks(
+        scorer, _prepared_chunks(), _embed_chunk, run_score_path(run_dir, args.output_format),
+        args.max_ic_cols, include_ica1_cols=args.include_ica1_cols, random_state=int(args.random_state),
+        output_format=args.output_format,
+    )
+    if excluded_total[0]:
+        log.warning("本文が欠損または空の %d 件を除外しました。", excluded_total[0])
+    if streamed["n"] == 0:
+        raise PVMUserError("有効な本文が1件もありません。入力ファイルのテキスト列を確認してください。")
+    log.info("スコア出力: %s", run_score_path(run_dir, args.output_format))
+
+    protected = int(meta_raw["protected_cluster_count"])
+    analysis_info = streamed["quality"].finalize(protected, str(bundle.transform_mode), scorer.gate_threshold)
+    sample = streamed["sample"]
+    export_report(run_dir, {
+        "n": int(streamed["n"]),
+        "project": project,
+        "mode": "lock",
+        "embedding_model": args.embedding_model,
+        "embedding_prefix": embedding_prefix,
+        "max_len": int(args.max_len),
+        "embedding_backend": args.embedding_backend,
+        "chunk_tokens": int(args.chunk_tokens),
+        "source_baseline": f"{baseline_project}:{ver}",
+        "protected_cluster_count": protected,
+        "base_threshold": float(meta_raw["base_threshold"]),
+        "gate_threshold": float(scorer.gate_threshold),
+        "gate_quantile": float(scorer.gate_quantile),
+        "ica1_gate_threshold": None if scorer.ica1_gate_threshold is None else float(scorer.ica1_gate_threshold),
+        "gate_final_only_count": int(analysis_info["gate_final_only_count"]),
+        "gate_ica1_only_count": int(analysis_info["gate_ica1_only_count"]),
+        "gate_both_count": int(analysis_info["gate_both_count"]),
+        "pre_projection_gate_missing": bool(meta_raw.get("pre_projection_gate_missing", False)),
+        "extra_cluster_count": len(meta_raw.get("extra_accept_thresholds", [])),
+        "transform_mode": str(bundle.transform_mode),
+        "ica1_status": str(bundle.ica1_status),
+        "ica2_status": str(bundle.ica2_status),
+        "fallback_level": int(bundle.fallback_level),
+        "quality": analysis_info,
+        "embedding": merge_embedding_infos(streamed["embedding_infos"]),
+        "run_fingerprint": run_fingerprint,
+        "score_file": score_file_record(run_dir, args.output_format, streamed["n"]),
+        "streaming": {
+            "lock_chunk_rows": int(args.lock_chunk_rows),
+            "chunks": int(streamed["chunks"]),
+            "ai_packet_sample_rows": int(len(sample.keys)),
+        },
+    })
+    export_ai_prompt_pack(
+        run_dir, sample.frame, "text", sample.arrays["Xfinal"], sample.arrays["labels"], sample.arrays["dists"],
+        centroids, protected, "lock", analysis_info=analysis_info, population_n=int(streamed["n"]),
+    )
+    emit_run_summary("lock", analysis_info)
+    log.info("完了。")
+
+
 def main() -> None:
+    try:
+        _main()
+    finally:
+        shutdown_ica_pool()
+
+
+def _main() -> None:
     ap = build_argparser()
     args = ap.parse_args()
     setup_logging(args.log_level)
     quiet_third_party_noise(args.log_level)
-    ica_retry_config = build_ica_retry_config(args.ica_max_attempts, args.ica_timeout_sec)
+    ica_retry_config = build_ica_retry_config(
+        args.ica_max_attempts, args.ica_timeout_sec, args.ica_workers, args.ica_shared_whitening,
+    )
     adaptive_search_config = resolve_adaptive_search_config(args.search_budget)
+    pca_config = build_pca_config(args.pca_solver, args.pca_batch_rows)
     embedding_prefix = resolve_embedding_prefix(args.embedding_prefix)
 
     if args.version:
@@ -4112,6 +6623,22 @@ def main() -> None:
         raise SystemExit("--baseline-version は lock / unlock でのみ指定できます。")
     if args.unlock_q is not None and not (0.0 < float(args.unlock_q) < 1.0):
         raise SystemExit("--unlock-q は (0, 1) の範囲で指定してください。")
+    if args.chunk_tokens < 0 or args.chunk_overlap < 0 or (args.chunk_tokens and args.chunk_overlap >= args.chunk_tokens):
+        raise SystemExit("--chunk-tokens は 0 以上、--chunk-overlap は 0 以上かつ --chunk-tokens 未満で指定してください。")
+    if args.reuse_identical_run and (args.show_candidates or args.use_plan is not None or args.unlock):
+        raise SystemExit("--reuse-identical-run は lock でのみ使えます（探索/採用/unlock は baseline を更新するため再利用しません）。")
+    if args.output_format != "csv":
+        # 埋め込みを終えてから書き出しで失敗しないよう、先に確認する。
+        _require_pyarrow(f"--output-format {args.output_format}")
+    if args.lock_chunk_rows < 0:
+        raise SystemExit("--lock-chunk-rows は 0 以上で指定してください。")
+    if args.lock_chunk_rows and (
+        args.show_candidates or args.use_plan is not None or args.unlock
+        or args.restore_version or args.serve or args.validate_backend
+    ):
+        raise SystemExit("--lock-chunk-rows は lock 専用です。探索/採用/unlock/restore/--serve/--validate-backend と同時指定できません。")
+    if args.lock_chunk_rows and (args.embeddings or args.embedding_checkpoint):
+        raise SystemExit("--lock-chunk-rows は --embeddings / --embedding-checkpoint と同時指定できません。")
 
     result_root = Path("PVMresult")
     ensure_dir(result_root)
@@ -4123,16 +6650,54 @@ def main() -> None:
             raise SystemExit(str(e)) from None
         return
 
+    if args.serve:
+        if args.show_candidates or args.use_plan is not None or args.unlock:
+            raise SystemExit("--serve は lock 判定専用です。探索/採用/unlock と同時指定できません。")
+        serve_project = args.baseline_from or args.project
+        if not serve_project:
+            raise SystemExit("--serve には --project NAME（または --baseline-from NAME）で baseline を指定してください。")
+        if not has_baseline(result_root, serve_project):
+            raise SystemExit(f"baseline がありません: {serve_project}")
+        scorer = PVMModel.load(
+            serve_project, args.baseline_version, result_root,
+            unlock_q=args.unlock_q, batch=args.batch, batch_tokens=args.batch_tokens, backend=args.embedding_backend,
+        )
+        validate_embedding_compat(
+            scorer.meta_raw, args.embedding_model, embedding_prefix, args.max_len,
+            args.embedding_backend, args.chunk_tokens, args.chunk_overlap,
+        )
+        scorer.embed(["warm up"])
+        serve_lock_scorer(scorer, args.serve)
+        return
+
     if args.input_xlsx:
         infile, ext = Path(args.input_xlsx), "xlsx"
     elif args.input_csv:
         infile, ext = Path(args.input_csv), "csv"
+    elif args.input_parquet:
+        infile, ext = Path(args.input_parquet), "parquet"
     else:
         # 元のPVM互換: 未指定時は自動検出を既定とする
         infile, ext = autodetect_input()
 
-    df0 = read_table(infile, ext)
-    text_col, id_col = autodetect_columns(df0, args.text_col, args.id_col)
+    project = get_project_name(args.project, infile)
+    run_fingerprint = _current_run_fingerprint(result_root, args, infile, project, embedding_prefix)
+    if args.reuse_identical_run:
+        prior_run = find_reusable_run(result_root, args, project, run_fingerprint)
+        if prior_run is not None:
+            run_dir = next_run_dir(result_root, project)
+            reuse_run_outputs(prior_run, run_dir)
+            log.info("入力・設定・baseline が同一の実行結果を再利用しました: %s → %s", prior_run, run_dir)
+            return
+        log.info("同一条件の過去実行は見つかりませんでした。通常どおり計算します。")
+
+    if args.lock_chunk_rows:
+        _run_streaming_lock(result_root, args, infile, ext, embedding_prefix, run_fingerprint)
+        return
+
+    # 列の自動検出は先頭だけで行い、全件の読み込みは本文列と ID 列に絞る。
+    text_col, id_col = autodetect_columns(read_table_head(infile, ext), args.text_col, args.id_col)
+    df0 = read_table(infile, ext, usecols=[c for c in [id_col, text_col] if c is not None])
     log.info('使用する列: テキスト列="%s"%s', text_col, f'、ID列="{id_col}"' if id_col else "（ID列なし・自動付番）")
 
     df, excluded_count = prepare_input_dataframe(df0, text_col, id_col)
@@ -4146,7 +6711,14 @@ def main() -> None:
         raise PVMUserError("有効な本文が1件もありません。入力ファイルのテキスト列を確認してください。")
     log.info("データ件数: %d", n)
 
-    project = get_project_name(args.project, infile)
+    if args.validate_backend:
+        ensure_ruri()
+        report = validate_embedding_backend(
+            df["text"].tolist(), args.embedding_model, args.embedding_backend, args.batch, args.max_len,
+            embedding_prefix=embedding_prefix, sample=args.validate_sample, random_state=args.random_state,
+        )
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
 
     # default baseline selection rule
     # 1) explicit --baseline-from
@@ -4191,19 +6763,41 @@ def main() -> None:
     loaded_baseline_cache: Optional[Tuple[TransformBundle, np.ndarray, Dict[str, Any], str]] = None
     if baseline_exists and args.use_plan is None and not args.show_candidates:
         loaded_baseline_cache = load_baseline_version(result_root, baseline_project, args.baseline_version)
-        validate_embedding_compat(loaded_baseline_cache[2], args.embedding_model, embedding_prefix, args.max_len)
+        validate_embedding_compat(
+            loaded_baseline_cache[2], args.embedding_model, embedding_prefix, args.max_len,
+            args.embedding_backend, args.chunk_tokens, args.chunk_overlap,
+        )
 
-    ensure_ruri()
-    X, device = compute_embeddings(df["text"].tolist(), args.embedding_model, args.batch, args.max_len, embedding_prefix=embedding_prefix)
+    if args.embeddings:
+        X, embedding_info = load_precomputed_embeddings(
+            Path(args.embeddings), df["id"].tolist(), args.embedding_model, embedding_prefix, args.max_len,
+            args.embedding_backend, args.chunk_tokens, args.chunk_overlap,
+        )
+        device = "precomputed"
+    else:
+        X, device, embedding_info = embed_texts(
+            df["text"].tolist(), args.embedding_model, args.batch, args.max_len,
+            embedding_prefix=embedding_prefix,
+            cache_path=Path(args.embedding_cache) if args.embedding_cache else None,
+            cache_max_mb=args.embedding_cache_max_mb,
+            batch_tokens=args.batch_tokens,
+            workers=args.embed_workers,
+            threads=args.embed_threads,
+            prefetch=args.embed_prefetch,
+            checkpoint_dir=Path(args.embedding_checkpoint) if args.embedding_checkpoint else None,
+            backend=args.embedding_backend,
+            chunk_tokens=args.chunk_tokens,
+            chunk_overlap=args.chunk_overlap,
+        )
     if n < max(30, args.k_max * 3):
         log.warning("データ件数が少なめです（n=%d）。k_max=%d は粗めの探索になります。", n, args.k_max)
 
     # exploration-only path
     if args.show_candidates:
         log.info("🧭 候補探索のみを実行します。baseline は更新しません。")
-        results = explore_candidates(X, args.k_min, args.k_max, args.pca_var, args.random_state, cache, ica_retry_config=ica_retry_config, search_config=adaptive_search_config)
+        results = explore_candidates(X, args.k_min, args.k_max, args.pca_var, args.random_state, cache, ica_retry_config=ica_retry_config, search_config=adaptive_search_config, pca_config=pca_config)
         export_candidates(run_dir, results)
-        export_candidate_assignments(run_dir, df, keep_cols, X, args.pca_var, results[:5], cache, ica_retry_config=_search_retry_config(ica_retry_config, adaptive_search_config, exact=True))
+        export_candidate_assignments(run_dir, df, keep_cols, X, args.pca_var, results[:5], cache, ica_retry_config=_search_retry_config(ica_retry_config, adaptive_search_config, exact=True), pca_config=pca_config)
         export_report(run_dir, {
             "n": n,
             "project": project,
@@ -4212,7 +6806,11 @@ def main() -> None:
             "embedding_model": args.embedding_model,
             "embedding_prefix": embedding_prefix,
             "max_len": int(args.max_len),
+            "embedding_backend": args.embedding_backend,
+            "chunk_tokens": int(args.chunk_tokens),
             "top5": [asdict(r) for r in results[:5]],
+            "embedding": embedding_info,
+            "run_fingerprint": run_fingerprint,
         })
         return
 
@@ -4224,10 +6822,10 @@ def main() -> None:
             log.info("🧭 初回（自動基準作成）: ベスト Plan を自動採用して baseline を作成します。")
         else:
             log.info("🧭 明示採用（baseline 更新）: 指定 Plan で新しい baseline 版を作成します。")
-        results = explore_candidates(X, args.k_min, args.k_max, args.pca_var, args.random_state, cache, ica_retry_config=ica_retry_config, search_config=adaptive_search_config)
+        results = explore_candidates(X, args.k_min, args.k_max, args.pca_var, args.random_state, cache, ica_retry_config=ica_retry_config, search_config=adaptive_search_config, pca_config=pca_config)
         export_candidates(run_dir, results)
         exact_commit_config = _search_retry_config(ica_retry_config, adaptive_search_config, exact=True)
-        export_candidate_assignments(run_dir, df, keep_cols, X, args.pca_var, results[:5], cache, ica_retry_config=exact_commit_config)
+        export_candidate_assignments(run_dir, df, keep_cols, X, args.pca_var, results[:5], cache, ica_retry_config=exact_commit_config, pca_config=pca_config)
         chosen = choose_result_by_plan(results, args.use_plan)
         strict_commit = chosen.selection_tier == "strict_full"
         commit_config = replace(exact_commit_config, allow_dim_fallback=not strict_commit)
@@ -4235,7 +6833,7 @@ def main() -> None:
             chosen.effective_ica1_dim if strict_commit
             else (chosen.requested_ica1_dim or chosen.ica1_dim)
         )
-        fit = get_pipeline_result(X, args.pca_var, commit_dim, chosen.k, chosen.random_state, cache, ica_retry_config=commit_config)
+        fit = get_pipeline_result(X, args.pca_var, commit_dim, chosen.k, chosen.random_state, cache, ica_retry_config=commit_config, pca_config=pca_config)
         if strict_commit:
             if (
                 fit["transform_mode"] != "full_original_pvm"
@@ -4291,12 +6889,17 @@ def main() -> None:
             environment=build_environment(device),
             chosen_plan=asdict(chosen),
             source_baseline=None,
+            embedding_backend=args.embedding_backend,
+            chunk_tokens=int(args.chunk_tokens),
+            chunk_overlap=int(args.chunk_overlap) if args.chunk_tokens else 0,
+            ica_whitening=str((fit["transform_info"].get("ica1_setup") or {}).get("whitening", "fastica")),
         )
         export_run_csv(
             run_dir, df, keep_cols, fit["Xfinal"], fit["labels"], fit["dists"], args.max_ic_cols,
             Xica1=(Xpre_fit if int(fit["bundle"].ica1_n_components) > 0 else None),
             include_ica1_cols=args.include_ica1_cols,
             coordinate_prefix=final_coordinate_prefix(str(fit["bundle"].transform_mode)),
+            output_format=args.output_format,
         )
         if int(fit["bundle"].ica1_n_components) > 0:
             ica_axis_cards = export_ica_axis_report(
@@ -4338,6 +6941,8 @@ def main() -> None:
             "embedding_model": args.embedding_model,
             "embedding_prefix": embedding_prefix,
             "max_len": int(args.max_len),
+            "embedding_backend": args.embedding_backend,
+            "chunk_tokens": int(args.chunk_tokens),
             "used_version": ver,
             "chosen_plan": asdict(chosen),
             "base_threshold": base_threshold,
@@ -4352,6 +6957,8 @@ def main() -> None:
             "fallback_level": int(fit["bundle"].fallback_level),
             "quality_gate_status": analysis_info.get("quality_gate_status", "pass"),
             "quality": analysis_info,
+            "embedding": embedding_info,
+            "run_fingerprint": run_fingerprint,
         })
         export_ai_prompt_pack(
             run_dir,
@@ -4378,10 +6985,12 @@ def main() -> None:
         bundle, centroids, meta_raw, ver = loaded_baseline_cache
     else:
         bundle, centroids, meta_raw, ver = load_baseline_version(result_root, baseline_project, args.baseline_version)
-        validate_embedding_compat(meta_raw, args.embedding_model, embedding_prefix, args.max_len)
+        validate_embedding_compat(
+            meta_raw, args.embedding_model, embedding_prefix, args.max_len,
+            args.embedding_backend, args.chunk_tokens, args.chunk_overlap,
+        )
 
-    Xfinal = apply_transforms(X, bundle)
-    Xpre = apply_pre_projection_space(X, bundle)
+    Xfinal, Xpre = apply_transform_spaces(X, bundle)
     ica1_centroids_runtime = meta_raw.get("_runtime_ica1_centroids")
     # gate quantile は「明示指定 > baseline 保存値 > 既定値」で解決し、
     # final空間 gate と ICA①空間 gate で同じ quantile を使う。
@@ -4452,6 +7061,10 @@ def main() -> None:
             environment=build_environment(device),
             chosen_plan=None,
             source_baseline=f"{baseline_project}:{ver}",
+            embedding_backend=args.embedding_backend,
+            chunk_tokens=int(args.chunk_tokens),
+            chunk_overlap=int(args.chunk_overlap) if args.chunk_tokens else 0,
+            ica_whitening=str(meta_raw.get("ica_whitening") or "fastica"),
         )
         # transform_mode / ica*_status / fallback_level / quality_* は
         # 直後の enrich_baseline_meta() が bundle と analysis_info から再設定するため、
@@ -4470,7 +7083,7 @@ def main() -> None:
             "accepted_existing_extra": unlock_res["accepted_extra_mask"],
             "unlock_added": unlock_res["added_mask"],
         }
-        export_run_csv(run_dir, df, keep_cols, Xfinal, unlock_res["labels"], unlock_res["dists"], args.max_ic_cols, extra_cols=extra_cols, Xica1=(Xpre if int(bundle.ica1_n_components) > 0 else None), include_ica1_cols=args.include_ica1_cols, coordinate_prefix=final_coordinate_prefix(str(bundle.transform_mode)))
+        export_run_csv(run_dir, df, keep_cols, Xfinal, unlock_res["labels"], unlock_res["dists"], args.max_ic_cols, extra_cols=extra_cols, Xica1=(Xpre if int(bundle.ica1_n_components) > 0 else None), include_ica1_cols=args.include_ica1_cols, coordinate_prefix=final_coordinate_prefix(str(bundle.transform_mode)), output_format=args.output_format)
         export_report(run_dir, {
             "n": n,
             "project": project,
@@ -4478,6 +7091,8 @@ def main() -> None:
             "embedding_model": args.embedding_model,
             "embedding_prefix": embedding_prefix,
             "max_len": int(args.max_len),
+            "embedding_backend": args.embedding_backend,
+            "chunk_tokens": int(args.chunk_tokens),
             "source_baseline": f"{baseline_project}:{ver}",
             "used_version": ver2,
             "unlock_info": unlock_res["info"],
@@ -4496,6 +7111,8 @@ def main() -> None:
             "fallback_level": int(bundle.fallback_level),
             "quality_gate_status": analysis_info.get("quality_gate_status", "pass"),
             "quality": analysis_info,
+            "embedding": embedding_info,
+            "run_fingerprint": run_fingerprint,
         })
         export_ai_prompt_pack(run_dir, df, effective_text_col, Xfinal, unlock_res["labels"], unlock_res["dists"], unlock_res["all_centroids"], int(new_meta.protected_cluster_count), "unlock", analysis_info=analysis_info)
         emit_run_summary("unlock", analysis_info)
@@ -4524,7 +7141,7 @@ def main() -> None:
         "gate_ica1": lock_res["gate_ica1_mask"],
         "accepted_existing_extra": lock_res["accepted_extra_mask"],
     }
-    export_run_csv(run_dir, df, keep_cols, Xfinal, lock_res["labels"], lock_res["dists"], args.max_ic_cols, extra_cols=extra_cols, Xica1=(Xpre if int(bundle.ica1_n_components) > 0 else None), include_ica1_cols=args.include_ica1_cols, coordinate_prefix=final_coordinate_prefix(str(bundle.transform_mode)))
+    export_run_csv(run_dir, df, keep_cols, Xfinal, lock_res["labels"], lock_res["dists"], args.max_ic_cols, extra_cols=extra_cols, Xica1=(Xpre if int(bundle.ica1_n_components) > 0 else None), include_ica1_cols=args.include_ica1_cols, coordinate_prefix=final_coordinate_prefix(str(bundle.transform_mode)), output_format=args.output_format)
     analysis_info = compute_run_quality(
         Xfinal=Xfinal,
         labels=lock_res["labels"],
@@ -4546,6 +7163,8 @@ def main() -> None:
         "embedding_model": args.embedding_model,
         "embedding_prefix": embedding_prefix,
         "max_len": int(args.max_len),
+        "embedding_backend": args.embedding_backend,
+        "chunk_tokens": int(args.chunk_tokens),
         "source_baseline": f"{baseline_project}:{ver}",
         "protected_cluster_count": int(meta_raw["protected_cluster_count"]),
         "base_threshold": float(meta_raw["base_threshold"]),
@@ -4562,6 +7181,9 @@ def main() -> None:
         "ica2_status": str(bundle.ica2_status),
         "fallback_level": int(bundle.fallback_level),
         "quality": analysis_info,
+        "embedding": embedding_info,
+        "run_fingerprint": run_fingerprint,
+        "score_file": score_file_record(run_dir, args.output_format, n),
     })
     export_ai_prompt_pack(run_dir, df, effective_text_col, Xfinal, lock_res["labels"], lock_res["dists"], centroids, int(meta_raw["protected_cluster_count"]), "lock", analysis_info=analysis_info)
     emit_run_summary("lock", analysis_info)
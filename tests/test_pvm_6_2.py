@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import importlib.util
+import json
+import sys
 import tempfile
 import unittest
 from pathlib import Path
@@ -24,6 +27,55 @@ class _FakeICA:
         return np.asarray(X[:, : self.components], dtype=np.float32)
 
 
+def _apply_transforms_stepwise(X, bundle):
+    """Reference for the fused transform: apply each affine step in turn."""
+    if X.shape[1] != bundle.embed_dim:
+        raise ValueError("埋め込み次元が baseline と不一致です。embedding model や前処理を確認してください。")
+    safe_scale = np.where(bundle.scaler_scale == 0.0, 1.0, bundle.scaler_scale)
+    Xs = (X - bundle.scaler_mean) / safe_scale
+    Xp_full = (Xs - bundle.pca_mean) @ bundle.pca_components.T
+    Xp = Xp_full[:, : bundle.pca_n_components]
+
+    if bundle.transform_mode == "full_original_pvm":
+        Xi1 = (Xp - bundle.ica1_mean) @ bundle.ica1_components.T
+        Xi2 = (Xi1 - bundle.ica2_mean) @ bundle.ica2_components.T
+        return Xi2[:, : bundle.final_n_components].astype(np.float32)
+
+    if bundle.transform_mode == "ica1_only_pvm":
+        Xi1 = (Xp - bundle.ica1_mean) @ bundle.ica1_components.T
+        return Xi1[:, : bundle.final_n_components].astype(np.float32)
+
+    if bundle.transform_mode == "pca_pvm":
+        return Xp[:, : bundle.final_n_components].astype(np.float32)
+
+    raise ValueError(f"未知の transform_mode です: {bundle.transform_mode}")
+
+
+class _InProcessExecutor:
+    """ProcessPoolExecutor の代わりに同じプロセスで map する。"""
+
+    def __init__(self, *_args, **_kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, items):
+        return map(fn, list(items))
+
+
+def _fake_torch():
+    return SimpleNamespace(
+        cuda=SimpleNamespace(is_available=lambda: False),
+        backends=SimpleNamespace(mps=None),
+        set_num_threads=lambda n: None,
+        get_num_threads=lambda: 1,
+    )
+
+
 class Pvm620Tests(unittest.TestCase):
     def test_input_preparation_preserves_id_and_drops_blank_text(self):
         source = pd.DataFrame({
@@ -226,5 +278,609 @@ class Pvm620Tests(unittest.TestCase):
         self.assertFalse(rows[0].quality_gate_passed)
         self.assertEqual(rows[0].degraded_reason, "forced fallback")
 
+    def test_embedding_cache_only_embeds_unseen_texts_and_evicts_lru(self):
+        def fake_embed(texts, *_args, **_kwargs):
+            return np.asarray([[len(t), 1.0] for t in texts], dtype=np.float32), "cpu"
+
+        with tempfile.TemporaryDirectory() as td:
+            store = Path(td) / "cache.sqlite"
+            with (
+                patch.object(PVM, "ensure_ruri"),
+                patch.object(PVM, "compute_embeddings", side_effect=fake_embed) as embed,
+            ):
+                X1, _, info1 = PVM.embed_texts(["あ", "いい"], "m", 8, 128, "", cache_path=store)
+                X2, device, info2 = PVM.embed_texts(["いい", "ううう", "あ"], "m", 8, 128, "", cache_path=store)
+            self.assertEqual(embed.call_args_list[-1].args[0], ["ううう"])
+            self.assertEqual((info1["cache"]["misses"], info2["cache"]["hits"]), (2, 2))
+            self.assertEqual(device, "cpu")
+            np.testing.assert_allclose(X2[:, 0], [2.0, 3.0, 1.0])
+            self.assertNotEqual(
+                PVM.embedding_cache_key("あ", PVM.embedding_signature("m", "", 128)),
+                PVM.embedding_cache_key("あ", PVM.embedding_signature("m", "", 256)),
+            )
+
+            with PVM.EmbeddingCache(store, max_mb=0) as cache:
+                self.assertEqual(cache.evict(), 3)
+                self.assertEqual(cache.get_many(["missing"]), {})
+
+    def test_embed_texts_embeds_duplicates_once_and_keeps_row_order(self):
+        def fake_embed(texts, *_args, **_kwargs):
+            return np.asarray([[len(t), 1.0] for t in texts], dtype=np.float32), "cpu"
+
+        with (
+            patch.object(PVM, "ensure_ruri"),
+            patch.object(PVM, "compute_embeddings", side_effect=fake_embed) as embed,
+        ):
+            X, _, info = PVM.embed_texts(["特になし", "良い", "特になし", "特になし"], "m", 8, 128, "")
+        self.assertEqual(embed.call_args.args[0], ["特になし", "良い"])
+        np.testing.assert_allclose(X[:, 0], [4.0, 2.0, 4.0, 4.0])
+        self.assertEqual((info["n_unique_texts"], info["duplicate_ratio"]), (2, 0.5))
+
+    def test_embed_threads_alone_stay_in_process_and_restore_torch_threads(self):
+        torch = _fake_torch()
+        state = {"threads": 8, "during": None}
+        torch.set_num_threads = lambda n: state.update(threads=n)
+        torch.get_num_threads = lambda: state["threads"]
+        loaded = SimpleNamespace(device="cpu")
+
+        def fake_embed(texts, *_args, **_kwargs):
+            state["during"] = state["threads"]
+            return np.ones((len(texts), 2), dtype=np.float32), "cpu"
+
+        with (
+            patch.dict(sys.modules, {"torch": torch}),
+            patch.object(PVM, "ensure_ruri"),
+            patch.object(PVM, "compute_embeddings_sharded") as sharded,
+            patch.object(PVM, "compute_embeddings", side_effect=fake_embed) as embed,
+        ):
+            PVM.embed_texts(["a", "b"], "m", 8, 128, "", workers=1, threads=2, loaded=loaded)
+        sharded.assert_not_called()
+        self.assertIs(embed.call_args.kwargs["loaded"], loaded)
+        self.assertEqual((state["during"], state["threads"]), (2, 8))
+
+    def test_prefetch_iter_preserves_order_and_reraises_producer_errors(self):
+        self.assertEqual(list(PVM.prefetch_iter(iter(range(20)), 2)), list(range(20)))
+        self.assertEqual(list(PVM.prefetch_iter(iter(range(3)), 0)), [0, 1, 2])
+
+        def broken():
+            yield 1
+            raise ValueError("tokenizer failed")
+
+        with self.assertRaisesRegex(ValueError, "tokenizer failed"):
+            list(PVM.prefetch_iter(broken(), 1))
+
+    def test_embedding_checkpoint_resumes_only_for_same_input(self):
+        signature = PVM.embedding_signature("m", "", 128)
+        fp = PVM.EmbeddingCheckpoint.make_fingerprint(["a", "b", "c"], signature)
+        with tempfile.TemporaryDirectory() as td:
+            ckpt = PVM.EmbeddingCheckpoint(Path(td), fp, 3, 2)
+            ckpt.embeddings[:2] = [[1.0, 2.0], [3.0, 4.0]]
+            ckpt.done[:2] = 1
+            ckpt.flush()
+            del ckpt
+
+            resumed = PVM.EmbeddingCheckpoint(Path(td), fp, 3, 2)
+            self.assertEqual(resumed.resumed_rows, 2)
+            np.testing.assert_allclose(resumed.embeddings[1], [3.0, 4.0])
+            resumed.embeddings[2] = [5.0, 6.0]
+            resumed.done[2] = 1
+            X, device = PVM.compute_embeddings(
+                ["a", "b", "c"], "m", 8, 128, out=resumed.embeddings, done=resumed.done, backend="torch-int8",
+            )
+            self.assertEqual(device, "cpu")
+            _, device = PVM.compute_embeddings(
+                ["a", "b", "c"], "m", 8, 128, out=resumed.embeddings, done=resumed.done,
+                loaded=SimpleNamespace(device="cuda"),
+            )
+            self.assertEqual(device, "cuda")
+            np.testing.assert_allclose(X[:, 0], [1.0, 3.0, 5.0])
+            del resumed, X
+
+            other = PVM.EmbeddingCheckpoint.make_fingerprint(["a", "b", "d"], signature)
+            fresh = PVM.EmbeddingCheckpoint(Path(td), other, 3, 2)
+            self.assertEqual(fresh.resumed_rows, 0)
+            self.assertFalse(fresh.complete)
+            del fresh
+
+    def test_validate_embedding_backend_reports_cosine_against_fp32(self):
+        def fake_embed(texts, *_args, backend="torch", **_kwargs):
+            tilt = 0.0 if backend == "torch" else 0.1
+            return np.asarray([[1.0, tilt * len(t)] for t in texts], dtype=np.float32), "cpu"
+
+        with patch.object(PVM, "compute_embeddings", side_effect=fake_embed) as embed:
+            report = PVM.validate_embedding_backend(["a", "bb", "ccc"], "m", "torch-int8", 8, 128, "", sample=2)
+        self.assertEqual([c.kwargs["backend"] for c in embed.call_args_list], ["torch", "torch-int8"])
+        self.assertEqual(report["n_sample"], 2)
+        self.assertLess(report["cosine_min"], report["cosine_mean"] + 1e-12)
+        self.assertGreater(report["cosine_min"], 0.9)
+
+    def test_precomputed_embeddings_align_by_id_and_check_settings(self):
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / "emb.npy"
+            np.save(path, np.asarray([[1.0, 0.0], [2.0, 0.0], [3.0, 0.0]], dtype=np.float32))
+            meta = {"embedding_model": "m", "embedding_prefix": "", "max_len": 128, "ids": ["a", "b", "c"]}
+            Path(str(path) + ".json").write_text(json.dumps(meta), encoding="utf-8")
+
+            X, info = PVM.load_precomputed_embeddings(path, ["c", "a"], "m", "", 128)
+            np.testing.assert_allclose(X[:, 0], [3.0, 1.0])
+            self.assertEqual(info["aligned_by"], "ids")
+            with self.assertRaises(SystemExit):
+                PVM.load_precomputed_embeddings(path, ["a"], "m", "", 256)
+            with self.assertRaisesRegex(PVM.PVMUserError, "1 行"):
+                PVM.load_precomputed_embeddings(path, ["a", "z"], "m", "", 128)
+
+    def test_chunk_windows_overlap_and_chunk_settings_guard_compat(self):
+        windows = PVM.split_token_windows(list(range(10)), window=4, overlap=1)
+        self.assertEqual(windows, [[0, 1, 2, 3], [3, 4, 5, 6], [6, 7, 8, 9]])
+        self.assertEqual(PVM.split_token_windows([1, 2], window=4, overlap=1), [[1, 2]])
+
+        legacy = {"embedding_model": "m", "embedding_prefix": "", "max_len": 128}
+        self.assertEqual(PVM._embedding_compat_problems(legacy, "m", "", 128), [])
+        problems = PVM._embedding_compat_problems(legacy, "m", "", 128, chunk_tokens=512, chunk_overlap=64)
+        self.assertEqual(len(problems), 1)
+        self.assertIn("chunk_tokens", problems[0])
+
+    def test_throughput_stats_report_padding_and_batch_percentiles(self):
+        stats = PVM.embedding_throughput_stats(
+            n_docs=4, seq_lengths=[2, 4, 6, 8], padded_tokens=32,
+            batch_seconds=[0.5, 1.5], embed_seconds=2.0, load_seconds=3.0,
+        )
+        self.assertEqual(stats["docs_per_sec"], 2.0)
+        self.assertEqual(stats["real_tokens_per_sec"], 10.0)
+        self.assertEqual(stats["padded_tokens_per_sec"], 16.0)
+        self.assertAlmostEqual(stats["padding_ratio"], 0.375)
+        self.assertEqual((stats["max_seq_len"], stats["median_seq_len"]), (8, 5.0))
+        self.assertEqual(stats["batch_seconds_p50"], 1.0)
+        self.assertEqual(stats["model_load_seconds"], 3.0)
+
+    def test_scoring_service_answers_json_lines_and_reports_bad_requests(self):
+        scorer = SimpleNamespace(
+            project="p", version="v001",
+            score=lambda texts, ids=None: [{"id": i, "cluster": 0} for i in (ids or range(len(texts)))],
+        )
+        ok = PVM._handle_scoring_request(scorer, json.dumps({"texts": ["a", "b"], "ids": ["x", "y"]}).encode("utf-8"))
+        self.assertEqual(ok, {"ok": True, "results": [{"id": "x", "cluster": 0}, {"id": "y", "cluster": 0}]})
+        self.assertEqual(PVM._handle_scoring_request(scorer, b'{"ping": true}\n')["baseline"], "p:v001")
+        self.assertFalse(PVM._handle_scoring_request(scorer, b"not json")["ok"])
+        self.assertIn("texts", PVM._handle_scoring_request(scorer, b'{"texts": "a"}')["error"])
+        bad = PVM._handle_scoring_request(scorer, '{"texts": ["日本"]}'.encode("cp932"))
+        self.assertFalse(bad["ok"])
+        self.assertIn("utf-8", bad["error"])
+
+    def test_token_budget_batches_group_by_length_and_cover_every_row(self):
+        lengths = [3, 10, 4, 9, 2, 30]
+        batches = PVM.plan_token_budget_batches(lengths, batch_tokens=20)
+        self.assertEqual([b.tolist() for b in batches], [[5], [1, 3], [2, 0, 4]])
+        for b in batches[1:]:
+            self.assertLessEqual(max(lengths[i] for i in b) * len(b), 20)
+        self.assertEqual(sorted(np.concatenate(batches).tolist()), list(range(len(lengths))))
+
+    def test_fused_affine_matches_stepwise_transform_for_every_mode(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(40, 8)).astype(np.float32)
+        base = dict(
+            scaler_mean=rng.normal(size=8).astype(np.float32),
+            scaler_scale=np.r_[rng.uniform(0.5, 2.0, size=7), 0.0].astype(np.float32),
+            pca_components=np.linalg.qr(rng.normal(size=(8, 8)))[0].astype(np.float32),
+            pca_mean=rng.normal(size=8).astype(np.float32),
+            pca_n_components=5,
+            ica1_components=rng.normal(size=(4, 5)).astype(np.float32),
+            ica1_mean=rng.normal(size=5).astype(np.float32),
+            ica1_n_components=4,
+            ica2_components=rng.normal(size=(3, 4)).astype(np.float32),
+            ica2_mean=rng.normal(size=4).astype(np.float32),
+            ica2_n_components=3,
+            embed_dim=8,
+        )
+        for mode, final_n in (("full_original_pvm", 3), ("ica1_only_pvm", 4), ("pca_pvm", 5)):
+            bundle = PVM.TransformBundle(**base, transform_mode=mode, final_n_components=final_n)
+            expected = _apply_transforms_stepwise(X, bundle)
+            np.testing.assert_allclose(PVM.apply_transforms(X, bundle), expected, rtol=1e-4, atol=1e-4)
+            pre_ref = expected if mode == "pca_pvm" else _apply_transforms_stepwise(
+                X, PVM.replace(bundle, transform_mode="ica1_only_pvm", final_n_components=4, fused_weight=None, fused_pre_weight=None)
+            )
+            np.testing.assert_allclose(PVM.apply_pre_projection_space(X, bundle), PVM.l2_normalize(pre_ref), rtol=1e-4, atol=1e-4)
+            self.assertEqual(bundle.fused_weight.shape, (8, final_n))
+            Xfinal, Xpre = PVM.apply_transform_spaces(X, bundle)
+            np.testing.assert_allclose(Xfinal, PVM.apply_transforms(X, bundle), rtol=1e-5, atol=1e-5)
+            np.testing.assert_allclose(Xpre, PVM.apply_pre_projection_space(X, bundle), rtol=1e-5, atol=1e-5)
+
+    def test_streaming_lock_matches_whole_input_scores_and_quality(self):
+        rng = np.random.default_rng(1)
+        X = rng.normal(size=(23, 4)).astype(np.float32)
+        bundle = PVM.TransformBundle(
+            scaler_mean=np.zeros(4, np.float32), scaler_scale=np.ones(4, np.float32),
+            pca_components=np.eye(4, dtype=np.float32), pca_mean=np.zeros(4, np.float32), pca_n_components=4,
+            ica1_components=np.zeros((0, 4), np.float32), ica1_mean=np.zeros(4, np.float32), ica1_n_components=0,
+            ica2_components=np.zeros((0, 0), np.float32), ica2_mean=np.zeros(0, np.float32), ica2_n_components=0,
+            embed_dim=4, transform_mode="pca_pvm", final_n_components=4,
+        )
+        centroids = PVM.l2_normalize(rng.normal(size=(3, 4)))
+        assign = lambda Xf, Xp: PVM.gated_lock_assign(Xf, centroids, 3, 0.4, [], 0.9, Xpre=Xp)
+        scorer = SimpleNamespace(bundle=bundle, centroids=centroids, transform=lambda Z: PVM.apply_transform_spaces(Z, bundle), assign_spaces=assign)
+        source = pd.DataFrame({"本文": [f"t{i}" for i in range(23)]})
+        rows = {f"t{i}": X[i] for i in range(23)}
+        embed = lambda texts: (np.stack([rows[t] for t in texts]), {"n_texts": len(texts), "n_unique_texts": len(texts)})
+        frames = (PVM.prepare_input_dataframe(source.iloc[i:i + 10], "本文", None, id_start=i)[0] for i in range(0, 23, 10))
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp) / "scores.csv"
+            streamed = PVM.stream_lock_chunks(scorer, frames, embed, out, None, sample_rows=5, random_state=0)
+            scores = pd.read_csv(out, encoding="utf-8-sig")
+        whole = assign(*PVM.apply_transform_spaces(X, bundle))
+        self.assertEqual((streamed["n"], streamed["chunks"], len(streamed["sample"].keys)), (23, 3, 5))
+        self.assertEqual(scores["id"].tolist(), list(range(23)))
+        np.testing.assert_array_equal(scores["cluster"].to_numpy(), whole["labels"])
+        expected = PVM.compute_run_quality(
+            X, whole["labels"], whole["dists"], centroids, 3, "pca_pvm",
+            gate_mask=whole["gate_mask"], gate_final_mask=whole["gate_final_mask"], gate_ica1_mask=whole["gate_ica1_mask"],
+            accepted_extra_mask=whole["accepted_extra_mask"], base_threshold=0.4, base_dists=whole["base_dists"],
+        )
+        self.assertEqual(streamed["quality"].finalize(3, "pca_pvm", 0.4), expected)
+
+    def test_input_batches_read_only_needed_columns_and_number_rows_globally(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "in.csv"
+            pd.DataFrame({
+                "meta": ["x"] * 5,
+                "本文": ["Ａ  b", "", "c", None, "d"],
+                "score": [1, 2, 3, 4, 5],
+            }).to_csv(path, index=False, encoding="utf-8-sig")
+            batches = list(PVM.iter_input_batches(path, "csv", "本文", None, chunk_rows=2))
+            with patch.object(pd, "read_csv", wraps=pd.read_csv) as read_csv:
+                list(PVM.iter_table_chunks(path, "csv", 2, usecols=["本文"]))
+        self.assertEqual(read_csv.call_args.kwargs["usecols"], ["本文"])
+        self.assertEqual([excluded for _, excluded in batches], [1, 1, 0])
+        merged = pd.concat([df for df, _ in batches], ignore_index=True)
+        self.assertEqual(list(merged.columns), ["text", "id"])
+        self.assertEqual(merged["id"].tolist(), [0, 2, 4])
+        self.assertEqual(merged["text"].tolist(), ["A b", "c", "d"])
+
+    def test_column_autodetection_uses_head_sample_then_reads_chosen_columns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "wide.csv"
+            pd.DataFrame({
+                "code": [f"A{i}" for i in range(30)],
+                "comment": [f"配送について長めの感想 {i}" for i in range(30)],
+                "ID": range(30),
+                "memo": ["x"] * 30,
+            }).to_csv(path, index=False, encoding="utf-8-sig")
+            head = PVM.read_table_head(path, "csv", nrows=5)
+            text_col, id_col = PVM.autodetect_columns(head, None, None)
+            df = PVM.read_table(path, "csv", usecols=[id_col, text_col])
+        self.assertEqual(len(head), 5)
+        self.assertEqual((text_col, id_col), ("comment", "ID"))
+        self.assertEqual(list(df.columns), ["comment", "ID"])
+        self.assertEqual(len(df), 30)
+
+    def test_run_score_writer_appends_csv_and_narrows_columnar_types(self):
+        frame = pd.DataFrame({"id": [1, 2], "text": ["a", "b"], "CP1": [0.5, -0.25], "cluster": [0, 3], "dist": [0.1, 0.2]})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = PVM.run_score_path(Path(tmp), "csv")
+            with PVM.RunScoreWriter(path, "csv") as writer:
+                writer.write(frame)
+                writer.write(frame)
+            self.assertTrue(path.read_bytes().startswith(b"\xef\xbb\xbf"))
+            self.assertEqual(path.read_bytes().count(b"\xef\xbb\xbf"), 1)
+            self.assertEqual(len(pd.read_csv(path, encoding="utf-8-sig")), 4)
+        narrowed = PVM._columnar_score_frame(frame)
+        self.assertEqual((narrowed["CP1"].dtype, narrowed["dist"].dtype, narrowed["cluster"].dtype), (np.float32, np.float32, np.int32))
+        with self.assertRaises(PVM.PVMUserError):
+            PVM.RunScoreWriter(Path("x"), "xlsx")
+
+    def test_large_numeric_ids_survive_every_score_format(self):
+        ids = [16777217.0, np.nan, 2.0 ** 40 + 1]
+        frame = pd.DataFrame({"id": ids, "text": ["a", "b", "c"], "CP1": [0.5, 0.25, 0.0], "cluster": [0, 1, 2], "dist": [0.1, 0.2, 0.3]})
+        narrowed = PVM._columnar_score_frame(frame)
+        self.assertEqual(narrowed["id"].dtype, np.float64)
+        self.assertEqual(narrowed["CP1"].dtype, np.float32)
+        formats = ["csv"] + (["parquet", "arrow"] if importlib.util.find_spec("pyarrow") is not None else [])
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt in formats:
+                path = PVM.run_score_path(Path(tmp), fmt)
+                with PVM.RunScoreWriter(path, fmt) as writer:
+                    writer.write(frame)
+                if fmt == "csv":
+                    got = pd.read_csv(path, encoding="utf-8-sig")["id"]
+                elif fmt == "parquet":
+                    got = pd.read_parquet(path)["id"]
+                else:
+                    got = pd.read_feather(path)["id"]
+                np.testing.assert_array_equal(got.to_numpy(dtype=np.float64), ids)
+
+    def test_vectorized_normalization_matches_normalize_text_on_fuzzed_corpus(self):
+        rng = np.random.default_rng(7)
+        pool = list("ａＺ１ab漢かナｶﾞ ﾟ゙\u0301\t\n\r\x0b\x0c\x1c\x85\xa0\u3000\u2028\u200b\ufeff①㈱")
+        values = ["".join(rng.choice(pool, size=int(rng.integers(0, 10)))) for _ in range(3000)]
+        values += [None, np.nan, 1, 1.0, True, "1", "", " \u3000 "] * 3
+        source = pd.Series(values, dtype=object)
+        expected = [PVM.normalize_text(v) for v in source.where(source.notna(), "").astype(str)]
+        self.assertEqual(PVM.normalize_text_series(source).tolist(), expected)
+
+    def test_identical_run_is_found_by_fingerprint_and_copied(self):
+        args = PVM.build_argparser().parse_args([])
+        fp = PVM.build_run_fingerprint("abc", args, "トピック: ", "p:v001")
+        self.assertEqual(fp, PVM.build_run_fingerprint("abc", args, "トピック: ", "p:v001"))
+        self.assertNotEqual(fp["run_fingerprint"], PVM.build_run_fingerprint("abc", args, "トピック: ", "p:v002")["run_fingerprint"])
+        args.batch = 64  # 実行方式だけの違いは指紋に含めない
+        self.assertEqual(fp, PVM.build_run_fingerprint("abc", args, "トピック: ", "p:v001"))
+        args.pca_var = 0.95
+        self.assertNotEqual(fp, PVM.build_run_fingerprint("abc", args, "トピック: ", "p:v001"))
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            old = PVM.next_run_dir(root, "p")
+            (old / "結果スコア.csv").write_text("id,cluster\n1,0\n", encoding="utf-8")
+            PVM.export_report(old, {"mode": "lock", "run_fingerprint": fp, "score_file": PVM.score_file_record(old, "csv", 1)})
+            PVM.next_run_dir(root, "p_other")
+            self.assertEqual(PVM.find_identical_run(root, "p", fp["run_fingerprint"]), old)
+            self.assertIsNone(PVM.find_identical_run(root, "p", "other"))
+            self.assertIsNone(PVM.find_identical_run(root, "p", fp["run_fingerprint"], "parquet"))
+            broken = PVM.next_run_dir(root, "p")
+            (broken / "結果スコア.csv").write_text("id,cluster\n1,0\n", encoding="utf-8")
+            PVM.export_report(broken, {"mode": "lock", "run_fingerprint": fp, "score_file": PVM.score_file_record(broken, "csv", 1)})
+            (broken / "結果スコア.csv").write_text("id,cl", encoding="utf-8")
+            # 記録より短い（書き切られていない）結果スコアは再利用しない。
+            self.assertEqual(PVM.find_identical_run(root, "p", fp["run_fingerprint"]), old)
+            new = PVM.next_run_dir(root, "p")
+            PVM.reuse_run_outputs(old, new)
+            report = json.loads((new / "結果レポート.json").read_text(encoding="utf-8"))
+            self.assertEqual(report["reused_from"], old.name)
+            self.assertEqual((new / "結果スコア.csv").read_text(encoding="utf-8"), "id,cluster\n1,0\n")
+
+    def test_randomized_pca_grows_until_variance_target_and_matches_full(self):
+        rng = np.random.default_rng(3)
+        latent = rng.normal(size=(400, 12)) * np.linspace(6.0, 1.0, 12)
+        X = (latent @ rng.normal(size=(12, 96)) + 0.05 * rng.normal(size=(400, 96))).astype(np.float32)
+        cache = {}
+        full = PVM.get_pca_base(X, 0.9, 0, cache)
+        randomized_cfg = PVM.PcaConfig(solver="randomized", initial_components=2)
+        fast = PVM.get_pca_base(X, 0.9, 0, cache, pca_config=randomized_cfg)
+        self.assertIsNot(full, fast)
+        self.assertEqual(fast["n_pcs"], full["n_pcs"])
+        self.assertLess(len(fast["explained_variance_ratio"]), len(full["explained_variance_ratio"]))
+        self.assertGreaterEqual(float(np.sum(fast["explained_variance_ratio"])), 0.9)
+        n = len(fast["explained_variance_ratio"])
+        np.testing.assert_allclose(fast["explained_variance_ratio"], full["explained_variance_ratio"][:n], atol=1e-3)
+        np.testing.assert_allclose(np.abs(fast["Xp"]), np.abs(full["Xp"]), atol=1e-2)
+        self.assertEqual(
+            PVM.propose_ica1_dims_from_pca_base(fast, 0.9, 10),
+            PVM.propose_ica1_dims_from_pca_base(full, 0.9, 10),
+        )
+        self.assertIs(PVM.get_pca_base(X, 0.9, 0, cache, pca_config=randomized_cfg), fast)
+
+    def test_incremental_pca_reads_memmap_in_chunks_and_matches_full(self):
+        rng = np.random.default_rng(5)
+        latent = rng.normal(size=(400, 10)) * np.linspace(5.0, 1.0, 10)
+        X = (latent @ rng.normal(size=(10, 64)) + 0.05 * rng.normal(size=(400, 64))).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "emb.npy"
+            np.save(path, X)
+            path.with_name("emb.npy.json").write_text(json.dumps({
+                "embedding_model": "m", "embedding_prefix": "", "max_len": 512,
+            }), encoding="utf-8")
+            X_mm, _ = PVM.load_precomputed_embeddings(path, list(range(400)), "m", "", 512)
+            self.assertIsInstance(X_mm, np.memmap)
+            cfg = PVM.build_pca_config("incremental", batch_rows=50)
+            self.assertEqual(PVM._pca_batch_spans(400, 50, 64)[-1], (320, 400))
+            inc = PVM.get_pca_base(X_mm, 0.9, 0, {}, pca_config=cfg)
+            full = PVM.get_pca_base(X, 0.9, 0, {})
+            self.assertEqual(inc["n_pcs"], full["n_pcs"])
+            self.assertEqual(set(inc["pca_bundle_base"]), set(full["pca_bundle_base"]))
+            self.assertEqual(inc["pca_bundle_base"]["pca_components"].shape, full["pca_bundle_base"]["pca_components"].shape)
+            np.testing.assert_allclose(inc["pca_bundle_base"]["scaler_mean"], full["pca_bundle_base"]["scaler_mean"], atol=1e-5)
+            np.testing.assert_allclose(inc["explained_variance_ratio"][:10], full["explained_variance_ratio"][:10], atol=1e-3)
+            np.testing.assert_allclose(np.abs(inc["Xp"]), np.abs(full["Xp"]), atol=2e-2)
+
+    def test_pca_fit_is_shared_across_pca_var_and_grown_only_when_needed(self):
+        rng = np.random.default_rng(9)
+        latent = rng.normal(size=(300, 20)) * np.geomspace(8.0, 0.5, 20)
+        X = (latent @ rng.normal(size=(20, 48)) + 0.05 * rng.normal(size=(300, 48))).astype(np.float32)
+        cache = {}
+        with patch.object(PVM, "PCA", wraps=PVM.PCA) as pca_cls:
+            bases = [PVM.get_pca_base(X, v, 0, cache) for v in (0.85, 0.90, 0.95)]
+        self.assertEqual(pca_cls.call_count, 1)
+        self.assertEqual([k[0] for k in cache].count("pca_fit"), 1)
+        self.assertLess(bases[0]["n_pcs"], bases[2]["n_pcs"])
+        fresh = PVM.get_pca_base(X, 0.95, 0, {})
+        self.assertEqual(fresh["n_pcs"], bases[2]["n_pcs"])
+        np.testing.assert_allclose(fresh["Xp"], bases[2]["Xp"], atol=1e-5)
+        np.testing.assert_array_equal(bases[2]["Xp"][:, : bases[0]["n_pcs"]], bases[0]["Xp"])
+
+        cfg = PVM.PcaConfig(solver="randomized", initial_components=2)
+        forward, backward = {}, {}
+        ordered = {v: PVM.get_pca_base(X, v, 0, forward, pca_config=cfg) for v in (0.5, 0.95, 0.7)}
+        reverse = {v: PVM.get_pca_base(X, v, 0, backward, pca_config=cfg) for v in (0.7, 0.95, 0.5)}
+        for v in (0.5, 0.7, 0.95):
+            self.assertEqual(ordered[v]["n_pcs"], reverse[v]["n_pcs"])
+            np.testing.assert_array_equal(ordered[v]["explained_variance_ratio"], reverse[v]["explained_variance_ratio"])
+            np.testing.assert_array_equal(ordered[v]["Xp"], reverse[v]["Xp"])
+            np.testing.assert_array_equal(
+                ordered[v]["pca_bundle_base"]["pca_components"], reverse[v]["pca_bundle_base"]["pca_components"],
+            )
+        self.assertLess(len(ordered[0.5]["explained_variance_ratio"]), len(ordered[0.95]["explained_variance_ratio"]))
+        self.assertGreaterEqual(float(np.sum(ordered[0.95]["explained_variance_ratio"])), 0.95)
+        self.assertEqual(ordered[0.95]["n_pcs"], bases[2]["n_pcs"])
+        steps = sorted(k[-1] for k in forward if k[0] == "pca_fit")
+        self.assertEqual(steps, sorted(k[-1] for k in backward if k[0] == "pca_fit"))
+        self.assertEqual(steps, [2 ** i for i in range(1, len(steps) + 1)])
+
+    def test_parallel_ica_retry_returns_same_grid_entry_as_sequential(self):
+        rng = np.random.default_rng(11)
+        X = np.column_stack([rng.laplace(size=200), rng.uniform(-1, 1, size=200), rng.normal(size=200)])
+        X = (X @ rng.normal(size=(3, 3))).astype(np.float32)
+        sequential = PVM.IcaRetryConfig(
+            seed_offsets=(0, 1), algorithms=("parallel",), configs=((1, 1e-12), (500, 1e-4)),
+            allow_dim_fallback=False,
+        )
+        parallel = PVM.replace(sequential, parallel_workers=2)
+        self.assertEqual(PVM.ica_retry_cache_key(sequential), PVM.ica_retry_cache_key(parallel))
+        expected = PVM._fit_ica_with_retries(X, 3, 0, "test", sequential)
+        self.addCleanup(PVM.shutdown_ica_pool)
+        got = PVM._fit_ica_with_retries(X, 3, 0, "test", parallel)
+        self.assertEqual(expected["attempts"], 3)
+        for name in ("n_components", "attempts", "retry_count", "algo", "max_iter", "tol", "seed"):
+            self.assertEqual(got[name], expected[name])
+        # worker は BLAS スレッド数が異なるため、独立成分は許容誤差で比べる。
+        np.testing.assert_allclose(got["S"], expected["S"], atol=1e-5)
+
+    def test_ica_pool_is_shared_across_calls_and_skips_stale_attempts(self):
+        self.addCleanup(PVM.shutdown_ica_pool)
+        rng = np.random.default_rng(11)
+        X = np.column_stack([rng.laplace(size=200), rng.uniform(-1, 1, size=200), rng.normal(size=200)])
+        X = (X @ rng.normal(size=(3, 3))).astype(np.float32)
+        cfg = PVM.IcaRetryConfig(
+            seed_offsets=(0, 1), algorithms=("parallel",), configs=((1, 1e-12), (500, 1e-4)),
+            allow_dim_fallback=False, parallel_workers=2,
+        )
+        first = PVM._fit_ica_with_retries(X, 3, 0, "test", cfg)
+        pool = PVM._ICA_POOL
+        self.assertIsNotNone(pool)
+        # 採用後に残った先行 fit の分だけ世代が進み、共有入力は候補ごとに消える。
+        self.assertEqual(PVM._ICA_POOL_GENERATION.value, 1)
+        self.assertEqual(list(Path(PVM._ICA_POOL_DIR.name).iterdir()), [])
+        second = PVM._fit_ica_with_retries(X, 3, 0, "test", cfg)
+        self.assertIs(PVM._ICA_POOL, pool)
+        self.assertEqual(second["seed"], first["seed"])
+
+        stale = int(PVM._ICA_POOL_GENERATION.value) - 1
+        with PVM._shared_ica_input(X, "stale") as path:
+            ica, S, error = pool.submit(
+                PVM._ica_pool_attempt, path, (3, "parallel", 500, 1e-4, 0), "test", None, stale,
+            ).result(timeout=30)
+        self.assertIsNone(ica)
+        self.assertIn("取り消し", str(error))
+        PVM.shutdown_ica_pool()
+        self.assertIsNone(PVM._ICA_POOL)
+
+    def test_shared_pca_whitening_recovers_same_sources_as_fastica_whitening(self):
+        rng = np.random.default_rng(13)
+        sources = np.column_stack([rng.laplace(size=500), rng.uniform(-1, 1, size=500), rng.exponential(size=500)])
+        X = np.hstack([sources @ rng.normal(size=(3, 12)), 0.01 * rng.normal(size=(500, 12))]).astype(np.float32)
+        cache = {}
+        base = PVM.get_pca_base(X, 0.99, 0, cache)
+        self.assertIs(PVM.get_pca_base(X, 0.99, 5, cache), base)
+        whitening = PVM.PcaWhitening.from_scores(base["Xp"])
+        self.assertIsNotNone(whitening)
+        self.assertIsNone(PVM.PcaWhitening.from_scores(base["Xp"] @ np.triu(np.ones((base["n_pcs"],) * 2, dtype=np.float32))))
+        Xp = base["Xp"]
+        reference = PVM._try_fit_ica(Xp, 3, "parallel", 2000, 1e-4, 0, "test")
+        shared = PVM._try_fit_ica(Xp, 3, "parallel", 2000, 1e-4, 0, "test", whitening)
+        self.assertIsNone(shared[2])
+        ica, S = shared[0], shared[1]
+        np.testing.assert_allclose((Xp - ica.mean_) @ ica.components_.T, S, atol=1e-3)
+        np.testing.assert_allclose(np.std(S, axis=0), 1.0, atol=1e-5)
+        corr = np.abs(np.corrcoef(S.T, reference[1].T)[:3, 3:])
+        np.testing.assert_allclose(np.sort(corr.max(axis=1)), 1.0, atol=1e-3)
+        self.assertEqual(whitening.whiten(Xp, 3).dtype, Xp.dtype)
+        default = PVM.get_stage1_result(X, 0.99, 3, 0, cache)
+        self.assertIsInstance(default["ica1"], PVM.FastICA)
+        self.assertEqual(default["ica1_whitening"], "fastica")
+        shared_cfg = PVM.build_ica_retry_config(shared_whitening=True)
+        self.assertNotEqual(PVM.ica_retry_cache_key(shared_cfg), PVM.ica_retry_cache_key(PVM.DEFAULT_ICA_RETRY))
+        stage1 = PVM.get_stage1_result(X, 0.99, 3, 0, cache, ica_retry_config=shared_cfg)
+        self.assertIsInstance(stage1["ica1"], PVM._PrewhitenedFastICA)
+        self.assertEqual(stage1["ica1_whitening"], "pca_shared")
+
+    def test_sharded_embedding_keeps_row_order_stats_and_checkpoint_rows(self):
+        texts = [str(i) for i in range(10)]
+        calls = []
+
+        def fake_compute(shard_texts, *_args, out=None, done=None, stats=None, **_kwargs):
+            rows = np.array([[float(t), float(len(shard_texts))] for t in shard_texts], dtype=np.float32)
+            calls.append((list(shard_texts), None if out is None else out.shape))
+            if stats is not None:
+                stats["docs"] = len(shard_texts)
+            if out is None:
+                return rows, "cpu"
+            out[:] = rows
+            done[:] = 1
+            return out, "cpu"
+
+        with patch.dict(sys.modules, {"torch": _fake_torch()}), \
+                patch("concurrent.futures.ProcessPoolExecutor", _InProcessExecutor), \
+                patch.object(PVM, "compute_embeddings", side_effect=fake_compute):
+            X, device, stats = PVM.compute_embeddings_sharded(texts, "m", 4, 512, workers=3, threads=2)
+            self.assertEqual(device, "cpu")
+            np.testing.assert_array_equal(X[:, 0], np.arange(10, dtype=np.float32))
+            self.assertEqual([c[0] for c in calls], [texts[:4], texts[4:7], texts[7:]])
+            self.assertEqual([(w["shard"], w["n_docs"], w["threads"]) for w in stats], [(0, 4, 2), (1, 3, 2), (2, 3, 2)])
+            self.assertEqual([w["throughput"] for w in stats], [{"docs": 4}, {"docs": 3}, {"docs": 3}])
+
+            calls.clear()
+            with tempfile.TemporaryDirectory() as tmp:
+                ckpt = PVM.EmbeddingCheckpoint(Path(tmp), "fp", len(texts), 2)
+                X, _, _ = PVM.compute_embeddings_sharded(texts, "m", 4, 512, workers=3, threads=2, checkpoint=ckpt)
+                self.assertEqual([c[1] for c in calls], [(4, 2), (3, 2), (3, 2)])
+                saved = np.load(Path(tmp) / "embeddings.npy")
+                np.testing.assert_array_equal(saved[:, 0], np.arange(10, dtype=np.float32))
+                np.testing.assert_array_equal(saved[:, 1], [4, 4, 4, 4, 3, 3, 3, 3, 3, 3])
+                self.assertTrue(np.all(np.load(Path(tmp) / "done.npy") == 1))
+                np.testing.assert_array_equal(np.asarray(X), saved)
+
+    def test_chunked_mixed_ids_keep_one_string_schema(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "in.csv"
+            path.write_text("id,body\n1,a\n007,b\nx9,c\n,d\n,e\n,f\n", encoding="utf-8")
+            chunks = [df for df, _ in PVM.iter_input_batches(path, "csv", "body", "id", 2)]
+            ids = [df["id"].tolist() for df in chunks]
+            self.assertEqual(ids[0], ["1", "007"])
+            self.assertEqual(ids[1][0], "x9")
+            self.assertTrue(all(pd.isna(v) for v in ids[1][1:] + ids[2]))
+            frames = [
+                PVM._columnar_score_frame(df.assign(cluster=0, dist=0.5)) for df in chunks
+            ]
+            self.assertEqual({str(f["id"].dtype) for f in frames}, {"string"})
+            if importlib.util.find_spec("pyarrow") is not None:
+                out = PVM.run_score_path(Path(tmp), "parquet")
+                with PVM.RunScoreWriter(out, "parquet") as writer:
+                    for df in chunks:
+                        writer.write(df.assign(cluster=0, dist=0.5))
+                self.assertEqual(pd.read_parquet(out)["id"].tolist()[:3], ["1", "007", "x9"])
+
+    def test_chunked_csv_falls_back_to_cp932_after_the_sniffed_prefix(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "in.csv"
+            rows = 60000
+            body = "id,body\n" + "".join(f"{i},text{i:020d}\n" for i in range(rows))
+            path.write_bytes(body.encode("ascii") + f"{rows},日本語\n".encode("cp932"))
+            self.assertGreater(path.stat().st_size, 1 << 20)
+            self.assertEqual(PVM._csv_encoding(path), "utf-8-sig")
+            chunks = list(PVM.iter_table_chunks(path, "csv", 7000, str_cols=["id"]))
+            df = pd.concat(chunks)
+            self.assertEqual(len(df), rows + 1)
+            self.assertEqual(df["id"].tolist(), [str(i) for i in range(rows + 1)])
+            self.assertEqual(df["body"].iloc[-1], "日本語")
+
+    def test_reuse_is_limited_to_lock_against_an_existing_baseline_version(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            infile = root / "in.csv"
+            infile.write_text("id,text\n1,a\n", encoding="utf-8")
+            commit = PVM.build_argparser().parse_args(["--use-plan", "1"])
+            lock = PVM.build_argparser().parse_args([])
+            first = PVM._current_run_fingerprint(root, commit, infile, "p", "")
+            self.assertIsNone(first["baseline"])
+            self.assertTrue(first["input_digest"].startswith("stat:"))
+            reuse = PVM.build_argparser().parse_args(["--reuse-identical-run"])
+            self.assertEqual(
+                PVM._current_run_fingerprint(root, reuse, infile, "p", "")["input_digest"],
+                "sha256:" + PVM.file_sha256(infile),
+            )
+            self.assertIsNone(PVM.find_reusable_run(root, lock, "p", PVM._current_run_fingerprint(root, lock, infile, "p", "")))
+            (PVM.history_root(root, "p") / "v001").mkdir(parents=True)
+            second = PVM._current_run_fingerprint(root, commit, infile, "p", "")
+            self.assertEqual(second["baseline"], "p:v001")
+            (PVM.history_root(root, "p") / "v002").mkdir()
+            third = PVM._current_run_fingerprint(root, commit, infile, "p", "")
+            self.assertNotEqual(second["run_fingerprint"], third["run_fingerprint"])
+
+            lock_fp = PVM._current_run_fingerprint(root, lock, infile, "p", "")
+            for args, fp in ((commit, third), (lock, lock_fp)):
+                run = PVM.next_run_dir(root, "p")
+                (run / "結果スコア.csv").write_text("id,cluster\n1,0\n", encoding="utf-8")
+                PVM.export_report(run, {"run_fingerprint": fp, "score_file": PVM.score_file_record(run, "csv", 1)})
+            self.assertIsNone(PVM.find_reusable_run(root, commit, "p", third))
+            self.assertEqual(PVM.find_reusable_run(root, lock, "p", lock_fp), run)
+
+
 if __name__ == "__main__":
     unittest.main()